@@ -19,6 +19,14 @@ class ExportHelper:
         if data is None:
             return False
 
+        from simulation_backend.TimeSeries import load_receiver_results
+
+        # The curves are stored in binary time series files next to the json; only the ones of the
+        # first response are exported, so only these are read from the memory-mapped files
+        results: List[Dict] = data.get('results') or []
+        if results and results[0].get('responses'):
+            load_receiver_results(json_path, [{'responses': results[0]['responses'][:1]}])
+
         return ExportHelper.__parse_json_data_to_xlsx_file__(data, xlsx_path)
 
     @staticmethod
@@ -121,10 +129,11 @@ class ExportHelper:
             edc_sheet = pd.DataFrame()
 
             # fill in edc_sheet and pressure_sheet
-            time = receiver_results[0]['t']
+            time = max((result['t'] for result in receiver_results), key=len)
             edc_sheet['t'] = time
             for result in receiver_results:
-                edc_sheet[str(result['frequency']) + 'Hz'] = result['data']
+                # A curve stopped early is shorter than the time axis, its last rows are left empty
+                edc_sheet[str(result['frequency']) + 'Hz'] = pd.Series(result['data'], dtype=float)
 
             with pd.ExcelWriter(xlsx_path) as writer:
                 parameter_sheet.to_excel(writer, sheet_name='Parameters', index=False)
@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.signals import worker_process_init
 
 
 def make_celery(app):
@@ -12,4 +13,13 @@ def make_celery(app):
                 return self.run(*args, **kwargs)
 
     celery_app.Task = ContextTask
+
+    @worker_process_init.connect(weak=False)
+    def dispose_db_connections(**kwargs):
+        # A prefork child must not share the database connections inherited from the worker
+        from app.db import db
+
+        with app.app_context():
+            db.engine.dispose(close=False)
+
     return celery_app
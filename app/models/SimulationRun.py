@@ -13,13 +13,16 @@ class SimulationRun(db.Model):
     sources = db.Column(JSON, default=[])
     receivers = db.Column(JSON, default=[])
     taskType = db.Column(db.Enum(TaskType), default=TaskType.BOTH)
+    # Pushed by the solver workers, so polling the status of the runs never reads their files
     percentage = db.Column(db.Integer, default=0)
     settingsPreset = db.Column(db.Enum(Setting), default=Setting.Default)
     layerIdByMaterialId = db.Column(JSON, default={})
     solverSettings = db.Column(JSON, nullable=False)
+    # Hash of the inputs of the solvers, to reuse the result of an identical completed run
+    fingerprint = db.Column(db.String, nullable=True, index=True)
 
-    status = db.Column(db.Enum(Status), default=Status.Created)
+    status = db.Column(db.Enum(Status), default=Status.Created, index=True)
 
     createdAt = db.Column(db.String, default=datetime.now)
-    updatedAt = db.Column(db.String, default=datetime.now, onupdate=datetime.now)
+    updatedAt = db.Column(db.String, default=datetime.now, onupdate=datetime.now, index=True)
     completedAt = db.Column(db.String, nullable=True)
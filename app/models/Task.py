@@ -11,6 +11,8 @@ class Task(db.Model):
     taskType = db.Column(db.Enum(TaskType), default=TaskType.DE)
     status = db.Column(db.Enum(Status), default=Status.Created)
     message = db.Column(db.String, nullable=True)
+    # Pushed by the worker running the task
+    percentage = db.Column(db.Integer, default=0)
 
     createdAt = db.Column(db.String(), default=datetime.now())
     updatedAt = db.Column(db.String(), default=datetime.now())
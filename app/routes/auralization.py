@@ -4,7 +4,12 @@ from flask import request, send_file, send_from_directory
 from flask.views import MethodView
 from flask_smorest import Blueprint
 
-from app.schemas.auralization_schema import AudioFileSchema, AuralizationResponsePlotSchema, AuralizationSchema
+from app.schemas.auralization_schema import (
+    AudioFileSchema,
+    AuralizationResponsePlotQuerySchema,
+    AuralizationResponsePlotSchema,
+    AuralizationSchema,
+)
 from app.services import auralization_service
 
 blp = Blueprint("Auralization", __name__, description="Auralization API")
@@ -61,9 +66,12 @@ class AuralizationImpulseReponseWav(MethodView):
 
 @blp.route("/auralizations/<int:simulation_id>/impulse/plot")
 class AuralizationImpulseReponsePlot(MethodView):
+    @blp.arguments(AuralizationResponsePlotQuerySchema, location="query")
     @blp.response(200, AuralizationResponsePlotSchema)
-    def get(self, simulation_id):
-        plot_data = auralization_service.get_impulse_response_plot(simulation_id)
+    def get(self, query_data, simulation_id):
+        plot_data = auralization_service.get_impulse_response_plot(
+            simulation_id, query_data.get("maxPoints"), query_data.get("tStart"), query_data.get("tEnd")
+        )
         return plot_data
 
 
@@ -5,8 +5,11 @@ from app.schemas.simulation_schema import (
     SimulationByModelQuerySchema,
     SimulationCancelSchema,
     SimulationCreateBodySchema,
+    SimulationResultQuerySchema,
     SimulationRunCreateSchema,
     SimulationRunSchema,
+    SimulationRunStatusQuerySchema,
+    SimulationRunStatusSchema,
     SimulationSchema,
     SimulationUpdateBodySchema,
     SimulationWithRunSchema,
@@ -52,9 +55,15 @@ class SimulationObject(MethodView):
 
 @blp.route("/simulations/<int:simulation_id>/result")
 class SimulationListResult(MethodView):
+    @blp.arguments(SimulationResultQuerySchema, location="query")
     @blp.response(200)
-    def get(self, simulation_id):
-        result = simulation_service.get_simulation_result_by_id(simulation_id)
+    def get(self, query_data, simulation_id):
+        result = simulation_service.get_simulation_result_by_id(
+            simulation_id,
+            query_data.get("maxPoints"),
+            query_data.get("tStart"),
+            query_data.get("tEnd"),
+        )
         return result
 
 
@@ -72,6 +81,15 @@ class SimulationRunList(MethodView):
         return result
 
 
+@blp.route("/simulations/run/status")
+class SimulationRunStatusList(MethodView):
+    @blp.arguments(SimulationRunStatusQuerySchema, location="query", error_status_code=400)
+    @blp.response(200, SimulationRunStatusSchema(many=True))
+    def get(self, query_data):
+        result = simulation_service.get_simulation_runs_status(query_data.get("ids"), query_data.get("since"))
+        return result
+
+
 @blp.route("/simulations/cancel")
 class SimulationCancelObject(MethodView):
     @blp.arguments(SimulationCancelSchema)
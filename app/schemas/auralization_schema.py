@@ -1,4 +1,4 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
 
 from app.types import Status
 
@@ -24,7 +24,14 @@ class AuralizationSchema(Schema):
     updatedAt = fields.String()
 
 
+class AuralizationResponsePlotQuerySchema(Schema):
+    maxPoints = fields.Integer(required=False, validate=validate.Range(min=2))
+    tStart = fields.Float(required=False)
+    tEnd = fields.Float(required=False)
+
+
 class AuralizationResponsePlotSchema(Schema):
     simulationId = fields.Integer()
     fs = fields.Integer()
     impulseResponse = fields.List(fields.Integer())
+    t = fields.List(fields.Float())
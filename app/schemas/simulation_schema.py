@@ -1,4 +1,4 @@
-from marshmallow import EXCLUDE, Schema, fields, post_load
+from marshmallow import EXCLUDE, Schema, fields, post_load, validate
 
 from app.schemas.model_schema import ModelInfoBasicSchema
 from app.types import Setting, Status, TaskType
@@ -47,6 +47,12 @@ class SimulationByModelQuerySchema(Schema):
     modelId = fields.Integer(required=True)
 
 
+class SimulationResultQuerySchema(Schema):
+    maxPoints = fields.Integer(required=False, validate=validate.Range(min=2))
+    tStart = fields.Float(required=False)
+    tEnd = fields.Float(required=False)
+
+
 class SimulationRunCreateSchema(Schema):
     simulationId = fields.Integer()
 
@@ -71,6 +77,20 @@ class SimulationRunSchema(Schema):
     simulation = fields.Nested(SimulationWithModelInfoSchema)
 
 
+class SimulationRunStatusQuerySchema(Schema):
+    ids = fields.List(fields.Integer(), required=False)
+    since = fields.DateTime(required=False)
+
+
+class SimulationRunStatusSchema(Schema):
+    id = fields.Integer()
+    simulationId = fields.Integer()
+    status = fields.Enum(Status, required=True)
+    percentage = fields.Integer(allow_none=True)
+    updatedAt = fields.String()
+    completedAt = fields.String(allow_none=True)
+
+
 class SimulationCancelSchema(Schema):
     simulationId = fields.Integer()
 
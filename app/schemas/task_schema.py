@@ -8,6 +8,7 @@ class TaskSchema(Schema):
     taskType = fields.Enum(TaskType)  # Assuming TaskType is an Enum, change to String for simplicity
     status = fields.Enum(Status)  # Assuming Status is an Enum, change to String for simplicity
     message = fields.String()
+    percentage = fields.Integer(allow_none=True)
     createdAt = fields.Str()
     updatedAt = fields.Str()
     completedAt = fields.Str(allow_none=True)
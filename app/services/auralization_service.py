@@ -1,8 +1,9 @@
-import gc
+import copy
 import json
 import logging
 import os
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 from uuid import uuid4
@@ -24,6 +25,7 @@ from app.models.Export import Export
 from app.models.Model import Model
 from app.models.Simulation import Simulation
 from app.types import Status
+from app.utils.decimation import decimate_min_max
 from config import AuralizationParametersConfig as AuralizationParameters
 from config import CustomExportParametersConfig, DefaultConfig, app_dir
 
@@ -79,7 +81,9 @@ def get_impulse_response_wav_path(simulation_id: int) -> Optional[Path]:
             return None
 
 
-def get_impulse_response_plot(simulation_id: int) -> Optional[dict]:
+def get_impulse_response_plot(
+    simulation_id: int, max_points: Optional[int] = None, t_start: Optional[float] = None, t_end: Optional[float] = None
+) -> Optional[dict]:
     simulation: Optional[Simulation] = Simulation.query.filter_by(id=simulation_id).first()
     if simulation is None:
         abort(404, message="No simulation found with this id.")
@@ -88,22 +92,48 @@ def get_impulse_response_plot(simulation_id: int) -> Optional[dict]:
     else:
         try:
             xlsx_file_path = os.path.join(DefaultConfig.UPLOAD_FOLDER_NAME, simulation.export.name)
-            plot_data = ExportHelper.extract_from_xlsx_to_dict(
-                xlsx_file_path,
-                {CustomExportParametersConfig.impulse_response: [f"{AuralizationParameters.visualization_fs}Hz"]},
-            )
-            return {
-                "impulseResponse": plot_data[CustomExportParametersConfig.impulse_response][
-                    f"{AuralizationParameters.visualization_fs}Hz"
-                ],
-                "fs": AuralizationParameters.visualization_fs,
-                "simulationId": simulation.id,
-            }
+            if max_points is None and t_start is None and t_end is None:
+                # The full resolution curve is read on every request rather than pinned in the cache
+                plot_data = load_impulse_response_plot(xlsx_file_path)
+            else:
+                # The modification time is part of the cache key, so a new export is never served from the cache
+                plot_data = copy.deepcopy(
+                    load_decimated_impulse_response_plot(
+                        xlsx_file_path, os.path.getmtime(xlsx_file_path), max_points, t_start, t_end
+                    )
+                )
+            return {**plot_data, "simulationId": simulation.id}
         except Exception as e:
             abort(400, message=f"Error while getting the impulse response plot: {e}")
             return None
 
 
+def load_impulse_response_plot(xlsx_file_path: str) -> dict:
+    fs = AuralizationParameters.visualization_fs
+    plot_data = ExportHelper.extract_from_xlsx_to_dict(
+        xlsx_file_path,
+        {CustomExportParametersConfig.impulse_response: [f"{fs}Hz"]},
+    )
+    return {"impulseResponse": plot_data[CustomExportParametersConfig.impulse_response][f"{fs}Hz"], "fs": fs}
+
+
+@lru_cache(maxsize=8)
+def load_decimated_impulse_response_plot(
+    xlsx_file_path: str,
+    modified_at: float,
+    max_points: Optional[int],
+    t_start: Optional[float],
+    t_end: Optional[float],
+) -> dict:
+    # Only the decimated curves are cached, the caller gets a copy of the cached dict
+    plot_data = load_impulse_response_plot(xlsx_file_path)
+    fs = plot_data["fs"]
+    t, impulse_response = decimate_min_max(
+        np.arange(len(plot_data["impulseResponse"])) / fs, plot_data["impulseResponse"], max_points, t_start, t_end
+    )
+    return {"impulseResponse": impulse_response.tolist(), "fs": fs, "t": t.tolist()}
+
+
 def upload_audio_file(
     audio_data: Optional[ImmutableDict[str, str]], audio_file: Optional[ImmutableDict[str, FileStorage]]
 ) -> AudioFile:
@@ -249,18 +279,16 @@ def run_auralization(auralizationId: int) -> None:
 
         simulation: Simulation = auralization.simulation
         export: Export = simulation.export
-        pressure_file_name = os.path.join(
-            DefaultConfig.UPLOAD_FOLDER_NAME, export.name.replace(".xlsx", "_pressure.csv")
-        )
+        simulation_file_name = os.path.join(DefaultConfig.UPLOAD_FOLDER_NAME, export.name.replace(".xlsx", ".json"))
 
         auralization.wavFileName = export.name.replace(".xlsx", f"_{input_audio_file.name}.wav")
         wav_output_file_name = os.path.join(DefaultConfig.UPLOAD_FOLDER_NAME, auralization.wavFileName)
 
         logger.debug("signal_file_name: %s", signal_file_name)
-        logger.debug("pressure_file_name: %s", pressure_file_name)
+        logger.debug("simulation_file_name: %s", simulation_file_name)
         logger.debug("wav_output_file_name: %s", wav_output_file_name)
 
-        _, _ = auralization_calculation(signal_file_name, pressure_file_name, wav_output_file_name)
+        _, _ = auralization_calculation(signal_file_name, simulation_file_name, wav_output_file_name)
 
         auralization.status = Status.Completed
 
@@ -276,7 +304,7 @@ def run_auralization(auralizationId: int) -> None:
 
 # TODO: too long code, refactor this function
 def auralization_calculation(
-    signal_file_name: Optional[str], pressure_file_name: str, wav_output_file_name: Optional[str] = None
+    signal_file_name: Optional[str], simulation_file_name: str, wav_output_file_name: Optional[str] = None
 ) -> Tuple[List[int], int]:
     # Load the signal and pressure data
     try:
@@ -288,21 +316,12 @@ def auralization_calculation(
         else:
             data_signal, fs = None, AuralizationParameters.visualization_fs
 
-        data_pressure = np.loadtxt(
-            pressure_file_name, skiprows=1, usecols=range(1, 6), delimiter=','
-        )  # this returns the pressure data
-        center_freq = np.loadtxt(
-            pressure_file_name, usecols=range(1, 6), delimiter=',', dtype=str, max_rows=1
-        )  # this returns the center frequencies of the bands with the suffix "Hz"
+        from simulation_backend.TimeSeries import read_pressure
 
-        center_freq = np.array([np.int32(f[:-2]) for f in center_freq])  # remove "Hz" suffix from the center frequency
+        # this returns the center frequencies of the bands and the energy decay curve in terms of pressure
+        # differentiated, from the binary time series of the simulation (or its csv for older simulations)
+        center_freq, p_rec_off_deriv_band = read_pressure(simulation_file_name)
         nBands = len(center_freq)  # number of bands
-        p_rec_off_deriv_band = (
-            data_pressure.transpose().copy()
-        )  # energy decay curve in terms of pressure differentiated
-
-        del data_pressure  # Delete the data to free up memory
-        gc.collect()  # Force garbage collection
 
     except Exception as e:
         logger.error(f'Error loading files: {e}')
@@ -99,7 +99,11 @@ def upload_dir():
 
 def get_file_related_path(file_id, simulation_id, extension):
     file = get_file_by_id(file_id)
-    file_name, _ = os.path.splitext(os.path.basename(file.fileName))
+    return get_file_name_related_path(file.fileName, simulation_id, extension)
+
+
+def get_file_name_related_path(file_name, simulation_id, extension):
+    file_name, _ = os.path.splitext(os.path.basename(file_name))
 
     if extension == "json":
         return os.path.join(
@@ -1,8 +1,10 @@
 import logging
 import os
 import zipfile
+from datetime import datetime
 
 import rhino3dm
+from celery import shared_task
 from flask_smorest import abort
 
 import config
@@ -16,6 +18,9 @@ from app.types import Status, TaskType
 # Create logger for this module
 logger = logging.getLogger(__name__)
 
+# The stages of the conversion of an uploaded geometry, reported in the message and the percentage of its task
+GEOMETRY_CHECK_STAGES = ("parse", "3dm", "zip", "geo")
+
 
 def get_geometry_by_id(geometry_id):
     results = Geometry.query.filter_by(id=geometry_id).first()
@@ -25,13 +30,14 @@ def get_geometry_by_id(geometry_id):
 def start_geometry_check_task(file_upload_id):
     """
     This function is a wrapper over 3dm mapper. It creates a task and geometry given a file upload id.
-    Then calls the map_to_3dm function to map the given geometry file format to a rhino model.
+    Then queues the map_to_3dm function to map the given geometry file format to a rhino model in the background;
+    the progress of the conversion is polled through GET /geometryCheck/result.
 
     :param file_upload_id: represents an id related to the uploaded file
     :return: Geometry: returns an object of Geometry model corresponding to the uploaded file
     """
     try:
-        task = Task(taskType=TaskType.GeometryCheck, status=Status.Created)
+        task = Task(taskType=TaskType.GeometryCheck, status=Status.Created, percentage=0)
         db.session.add(task)
         db.session.commit()
         geometry = Geometry(inputModelUploadId=file_upload_id, taskId=task.id)
@@ -39,17 +45,11 @@ def start_geometry_check_task(file_upload_id):
         db.session.add(geometry)
         db.session.commit()
 
-        result = map_to_3dm_and_geo(geometry.id)
-        if not result:
-            task.status = Status.Error
-            task.message = "An error is encountered during the geometry processing!"
-            db.session.commit()
-            abort(500, task.message)
-
-        task.status = Status.Completed
-
+        task.status = Status.Queued
         db.session.commit()
 
+        run_geometry_check_task.delay(geometry.id)
+
     except Exception as ex:
         db.session.rollback()
         task.status = Status.Error
@@ -61,6 +61,51 @@ def start_geometry_check_task(file_upload_id):
     return geometry
 
 
+@shared_task
+def run_geometry_check_task(geometry_id: int) -> None:
+    geometry = Geometry.query.filter_by(id=geometry_id).first()
+    if geometry is None:
+        logger.error(f"Geometry with id {geometry_id} not found")
+        return
+    task = Task.query.filter_by(id=geometry.taskId).first()
+
+    try:
+        result = map_to_3dm_and_geo(geometry_id)
+    except Exception as ex:
+        db.session.rollback()
+        logger.error(f"An error is encountered during the geometry processing: {ex}")
+        result = False
+
+    try:
+        if result:
+            task.status = Status.Completed
+            task.message = None
+            task.percentage = 100
+            task.completedAt = datetime.now()
+        else:
+            task.status = Status.Error
+            # The message still names the stage the conversion failed in
+            task.message = f"An error is encountered during the geometry processing! ({task.message})"
+        task.updatedAt = datetime.now()
+        db.session.commit()
+    except Exception as ex:
+        db.session.rollback()
+        logger.error(f"Can not update task status! Error: {ex}")
+
+
+def set_geometry_check_stage(task, stage):
+    stage_index = GEOMETRY_CHECK_STAGES.index(stage)
+    try:
+        task.message = f"{stage} ({stage_index + 1}/{len(GEOMETRY_CHECK_STAGES)})"
+        # The stages before this one are done
+        task.percentage = stage_index * 100 // len(GEOMETRY_CHECK_STAGES)
+        task.updatedAt = datetime.now()
+        db.session.commit()
+    except Exception as ex:
+        db.session.rollback()
+        logger.error(f"Can not update task stage! Error: {ex}")
+
+
 def get_geometry_result(task_id):
     return Geometry.query.filter_by(taskId=task_id).first()
 
@@ -86,6 +131,7 @@ def map_to_3dm_and_geo(geometry_id):
         logger.error(f"Can not update task status! Error: {ex}")
 
     # Use the new process method to handle both cleaning and conversion
+    set_geometry_check_stage(task, "parse")
     conversion_factory = GeometryConversionFactory()
 
     conversion_strategy = conversion_factory.create_strategy(file_extension)
@@ -93,6 +139,7 @@ def map_to_3dm_and_geo(geometry_id):
     if not conversion_strategy.generate_3dm(obj_path, rhino3dm_path):
         return False
 
+    set_geometry_check_stage(task, "3dm")
     if not os.path.exists(rhino3dm_path):
         logger.error("Can not find created a rhino file")
         return False
@@ -105,6 +152,7 @@ def map_to_3dm_and_geo(geometry_id):
         geometry.outputModelId = file3dm.id
 
         # Create a zip file from 3dm
+        set_geometry_check_stage(task, "zip")
         with zipfile.ZipFile(zip_file_path, "w") as zipf:
             zipf.write(rhino3dm_path, arcname=f"{file_name}.3dm")
 
@@ -115,6 +163,7 @@ def map_to_3dm_and_geo(geometry_id):
         return False
 
     if config.FeatureToggle.is_enabled("enable_geo_conversion"):
+        set_geometry_check_stage(task, "geo")
         try:
             if not convert_3dm_to_geo(rhino3dm_path, geo_path):
                 logger.error("Can not generate a geo file")
@@ -2,9 +2,11 @@ import logging
 import os
 import re
 
+from datetime import datetime
+
 import gmsh
 import rhino3dm
-from Diffusion_Module.FiniteVolumeMethod.CreateMeshFVM import generate_mesh
+from celery import shared_task
 from flask_smorest import abort
 
 import config
@@ -158,6 +160,7 @@ def start_mesh_task(model_id):
             Mesh.query.filter_by(id=model_db.meshId).delete()
         task = Task(
             taskType=TaskType.Mesh,
+            percentage=0,
         )
         db.session.add(task)
         db.session.commit()
@@ -172,31 +175,61 @@ def start_mesh_task(model_id):
         logger.error(f"Error in mesh generation (db)! Error: {ex}")
         abort(400, message=f"Error in mesh generation (db)! Error: {ex}")
 
+    # The mesh is generated by a worker, the client follows the status of the task
+    try:
+        task.status = Status.Queued
+        db.session.commit()
+        run_mesh_task.delay(task.id, geo_path, msh_path)
+    except Exception as ex:
+        db.session.rollback()
+        logger.error(f"Error in mesh generation (queue)! Error: {ex}")
+        abort(400, message=f"Error in mesh generation (queue)! Error: {ex}")
+
+    return mesh
+
+
+@shared_task
+def run_mesh_task(task_id: int, geo_path: str, msh_path: str) -> None:
+    from simulation_backend.MeshCache import generate_cached_mesh
+
+    task = Task.query.get(task_id)
+    if task is None:
+        logger.error(f"Mesh task with id {task_id} not found")
+        return
+
     try:
-        generate_mesh(geo_path, msh_path, 1)
+        task.status = Status.InProgress
+        task.message = "Generating the mesh"
+        # gmsh reports no progress, so the mesh is half done while it is being generated
+        task.percentage = 50
+        task.updatedAt = datetime.now()
+        db.session.commit()
+
+        # An unchanged geometry is not meshed again, its mesh is copied from the mesh cache
+        cache_hit = generate_cached_mesh(geo_path, msh_path, 1)
     except Exception as ex:
+        db.session.rollback()
         logger.error(f"Error in mesh generation (msh)! Error: {ex}")
-        abort(400, message=f"Error in mesh generation (msh)! Error: {ex}")
+        task.status = Status.Error
+        task.message = f"Error in mesh generation (msh)! Error: {ex}"
+        task.updatedAt = datetime.now()
+        db.session.commit()
+        return
 
-    if os.path.exists(msh_path):
-        try:
+    try:
+        if os.path.exists(msh_path):
             task.status = Status.Completed
-            db.session.commit()
-        except Exception as ex:
-            db.session.rollback()
-            logger.error(f"Error in mesh generation (db)! Error: {ex}")
-            abort(400, message=f"Error in mesh generation (db)! Error: {ex}")
-    else:
-        try:
+            task.message = "Mesh reused from the mesh cache" if cache_hit else None
+            task.percentage = 100
+            task.completedAt = datetime.now()
+        else:
             task.status = Status.Error
             message = "Possibly you don't have Gmsh installed on your device,"
             message += "or Gmsh has not been initialized!"
             task.message = message
             logger.error("Someone is trying to create mesh but they can't!")
-            db.session.commit()
-        except Exception as ex:
-            db.session.rollback()
-            logger.error(f"Error in mesh generation (db)! Error: {ex}")
-            abort(400, message=f"Error in mesh generation (db)! Error: {ex}")
-
-    return mesh
+        task.updatedAt = datetime.now()
+        db.session.commit()
+    except Exception as ex:
+        db.session.rollback()
+        logger.error(f"Error in mesh generation (db)! Error: {ex}")
@@ -1,20 +1,29 @@
+import copy
+import hashlib
 import json
 import logging
 import os
+import shutil
+import threading
 from datetime import datetime
+from functools import lru_cache
+from importlib.metadata import PackageNotFoundError, version
 from pathlib import Path
 
 import gmsh
-from celery import shared_task  # , current_task
+from celery import chord, shared_task  # , current_task
 from flask_smorest import abort
+from sqlalchemy import func
 from sqlalchemy.orm import joinedload, scoped_session, sessionmaker
+from sqlalchemy.orm.attributes import flag_modified
 
 from app.db import db
 from app.factory.export_factory.ExportHelper import ExportHelper
-from app.models import Export, File, Simulation, SimulationRun, Task
+from app.models import Export, File, Model, Simulation, SimulationRun, Task
 from app.services import file_service, material_service, mesh_service, model_service
 from app.services.auralization_service import auralization_calculation
 from app.types import Status, TaskType
+from app.utils.decimation import decimate_min_max
 from config import CustomExportParametersConfig
 
 # Create logger for this module
@@ -71,8 +80,9 @@ def get_simulation_run():
         .all()
     )
 
-    for simulation_run in result:
-        update_simulation_run_status(simulation_run, simulation_run.simulation)
+    # The status and the percentage of the runs are pushed to the database by the workers,
+    # the statuses of their tasks are rolled up into their sources here
+    update_simulation_runs_status(result)
 
     return result
 
@@ -180,12 +190,125 @@ def create_result_source_object(source, receivers, result_type):
     }
 
 
+def solver_version():
+    try:
+        return version("simulation_backend")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def simulation_fingerprint(simulation, absorption_coefficients, geo_path):
+    # Only the inputs of the solvers are part of the fingerprint, so renaming the simulation or its points
+    # does not change it. Returns None when the geometry file does not exist (yet).
+    if not os.path.exists(geo_path):
+        return None
+
+    geometry_hash = hashlib.sha256()
+    with open(geo_path, "rb") as geo_file:
+        for chunk in iter(lambda: geo_file.read(1 << 20), b""):
+            geometry_hash.update(chunk)
+
+    solver_inputs = {
+        "geometry": geometry_hash.hexdigest(),
+        "absorptionCoefficients": absorption_coefficients,
+        "sources": [
+            [point["x"], point["y"], point["z"]] for point in simulation.sources
+        ],
+        "receivers": [
+            [point["x"], point["y"], point["z"]] for point in simulation.receivers
+        ],
+        "solverSettings": simulation.solverSettings,
+        "settingsPreset": simulation.settingsPreset.value,
+        "taskType": simulation.taskType.value,
+        "solverVersion": solver_version(),
+    }
+    return hashlib.sha256(
+        json.dumps(solver_inputs, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def find_completed_simulation_run(fingerprint):
+    # The most recent completed run with this fingerprint whose result files still exist
+    if fingerprint is None:
+        return None
+
+    # One query for all the candidates: a run whose simulation, model or model file has been deleted is a cache miss
+    candidates = (
+        db.session.query(Simulation.id, File.fileName)
+        .join(SimulationRun, Simulation.simulationRunId == SimulationRun.id)
+        .join(Model, Simulation.modelId == Model.id)
+        .join(File, Model.outputFileId == File.id)
+        .filter(
+            SimulationRun.fingerprint == fingerprint,
+            SimulationRun.status == Status.Completed,
+        )
+        .order_by(SimulationRun.id.desc())
+        .all()
+    )
+    for simulation_id, file_name in candidates:
+        json_path = file_service.get_file_name_related_path(
+            file_name, simulation_id, extension="json"
+        )
+        if os.path.exists(json_path):
+            return json_path
+    return None
+
+
+def clone_simulation_result(cached_json_path, json_path, results_container):
+    from simulation_backend.TimeSeries import (
+        EDC_SUFFIX,
+        FREQUENCIES_SUFFIX,
+        PRESSURE_CSV_SUFFIX,
+        PRESSURE_SUFFIX,
+        TIME_AXIS_SUFFIX,
+        time_series_path,
+    )
+
+    with open(cached_json_path, "r") as json_file:
+        result_container = json.load(json_file)
+    if len(result_container["results"]) != len(results_container):
+        return False
+
+    if cached_json_path != json_path:
+        for suffix in (
+            TIME_AXIS_SUFFIX,
+            FREQUENCIES_SUFFIX,
+            EDC_SUFFIX,
+            PRESSURE_SUFFIX,
+            PRESSURE_CSV_SUFFIX,
+        ):
+            if os.path.exists(time_series_path(cached_json_path, suffix)):
+                shutil.copyfile(
+                    time_series_path(cached_json_path, suffix),
+                    time_series_path(json_path, suffix),
+                )
+        for extension in (".xlsx", ".wav"):
+            if os.path.exists(cached_json_path.replace(".json", extension)):
+                shutil.copyfile(
+                    cached_json_path.replace(".json", extension),
+                    json_path.replace(".json", extension),
+                )
+
+    # The points keep their own labels and ids, only the computed values are reused
+    for cached_result, result in zip(result_container["results"], results_container):
+        for key in ("label", "orderNumber", "sourcePointId"):
+            cached_result[key] = result[key]
+        for cached_response, response in zip(
+            cached_result["responses"], result["responses"]
+        ):
+            for key in ("label", "orderNumber", "pointId"):
+                cached_response[key] = response[key]
+    result_container["task_id"] = -1
+    result_container.pop("subtask_ids", None)
+
+    with open(json_path, "w") as json_result_file:
+        json.dump(result_container, json_result_file, indent=4)
+    return True
+
+
 def start_solver_task(simulation_id):
     simulation = get_simulation_by_id(simulation_id)
 
-    if simulation.simulationRunId:
-        delete_simulation_run(simulation.simulationRunId)
-
     model = model_service.get_model(simulation.modelId)
     json_path = file_service.get_file_related_path(
         model.outputFileId, simulation_id, extension="json"
@@ -196,6 +319,21 @@ def start_solver_task(simulation_id):
     geo_path = file_service.get_file_related_path(
         model.outputFileId, simulation_id, extension="geo"
     )
+
+    absorption_coefficients = {}
+    for layer, material_id in simulation.layerIdByMaterialId.items():
+        material = material_service.get_material_by_id(material_id)
+        # Ignore the lower frequencies in [63, 125, 250, 500, 1000, 2000, 4000]
+        absorption_coefficients[layer] = ", ".join(
+            map(str, material.absorptionCoefficients[1:-1])
+        )
+
+    # Looked up before the previous run is deleted, so pressing "run" again reuses its result
+    fingerprint = simulation_fingerprint(simulation, absorption_coefficients, geo_path)
+    cached_json_path = find_completed_simulation_run(fingerprint)
+
+    if simulation.simulationRunId:
+        delete_simulation_run(simulation.simulationRunId)
     sources_tasks = []
     results_container = []
 
@@ -244,6 +382,7 @@ def start_solver_task(simulation_id):
         layerIdByMaterialId=simulation.layerIdByMaterialId,
         solverSettings=simulation.solverSettings,
         status=Status.Created,
+        fingerprint=fingerprint,
     )
 
     try:
@@ -261,14 +400,19 @@ def start_solver_task(simulation_id):
         logger.error(f"Can not create a new simulation run: {ex}")
         abort(400, message=f"Can not create a new simulation run: {ex}")
 
+    if cached_json_path is not None and clone_simulation_result(
+        cached_json_path, json_path, results_container
+    ):
+        logger.info(f"Reusing the result of {cached_json_path}")
+        return complete_cloned_simulation_run(simulation, new_simulation_run, json_path)
+
     # Run the background task asynchronously
-    absorption_coefficients = {}
-    for layer, material_id in simulation.layerIdByMaterialId.items():
-        material = material_service.get_material_by_id(material_id)
-        # Ignore the lower frequencies in [63, 125, 250, 500, 1000, 2000, 4000]
-        absorption_coefficients[layer] = ", ".join(
-            map(str, material.absorptionCoefficients[1:-1])
-        )
+    from simulation_backend.Cancellation import clear_cancel_request
+    from simulation_backend.Progress import clear_progress
+
+    # A new run must not see the cancellation or the progress of the previous one
+    clear_cancel_request(json_path)
+    clear_progress(json_path)
 
     with open(json_path, "w") as json_result_file:
         json_result_file.write(
@@ -285,10 +429,38 @@ def start_solver_task(simulation_id):
             )
         )
 
+    # One subtask per (source, method) pair, in the order of the results; each one solves its own json file
+    # and meshes the geometry in its own msh file, so the subtasks can run on different workers at the same time
+    for task_index, result in enumerate(results_container):
+        subtask_json_path = solver_subtask_json_path(json_path, task_index)
+        clear_cancel_request(subtask_json_path)
+        clear_progress(subtask_json_path)
+        with open(subtask_json_path, "w") as json_subtask_file:
+            json_subtask_file.write(
+                json.dumps(
+                    {
+                        "absorption_coefficients": absorption_coefficients,
+                        "msh_path": subtask_json_path.replace(".json", ".msh"),
+                        "geo_path": geo_path,
+                        "results": [result],
+                        "should_cancel": False,
+                        "task_id": -1,
+                    },
+                    indent=4,
+                )
+            )
+
     if debug_celery:
-        run_solver(new_simulation_run.id, json_path)
+        subtask_statuses = [
+            run_solver_subtask(new_simulation_run.id, json_path, task_index)
+            for task_index in range(len(results_container))
+        ]
+        merge_solver_results(subtask_statuses, new_simulation_run.id, json_path)
     else:
-        task = run_solver.delay(new_simulation_run.id, json_path)
+        task = chord(
+            run_solver_subtask.s(new_simulation_run.id, json_path, task_index)
+            for task_index in range(len(results_container))
+        )(merge_solver_results.s(new_simulation_run.id, json_path))
 
         result_container = {}
         if json_path is not None:
@@ -296,6 +468,9 @@ def start_solver_task(simulation_id):
                 result_container = json.load(json_file)
 
         result_container["task_id"] = task.id
+        result_container["subtask_ids"] = [
+            subtask.id for subtask in task.parent.results
+        ]
 
         if json_path is not None:
             with open(json_path, "w") as json_task_id:
@@ -318,151 +493,345 @@ def start_solver_task(simulation_id):
         return new_simulation_run
 
 
+def complete_cloned_simulation_run(simulation, simulation_run, json_path):
+    try:
+        for source in simulation_run.sources:
+            for task_status in source["taskStatuses"]:
+                task = Task.query.get(task_status["id"])
+                task.status = Status.Completed
+                task.percentage = 100
+                task.completedAt = datetime.now()
+                task_status["status"] = Status.Completed.value
+                task_status["percentage"] = 100
+            source["percentage"] = 100
+        flag_modified(simulation_run, "sources")
+
+        export_name = Path(json_path).name.replace(".json", ".xlsx")
+        if os.path.exists(json_path.replace(".json", ".xlsx")) and (
+            Export.query.filter_by(name=export_name, simulationId=simulation.id).first()
+            is None
+        ):
+            db.session.add(Export(name=export_name, simulationId=simulation.id))
+
+        simulation_run.percentage = 100
+        simulation_run.status = Status.Completed
+        simulation_run.completedAt = datetime.now()
+        simulation.status = Status.Completed
+        simulation.completedAt = datetime.now()
+        db.session.commit()
+    except Exception as ex:
+        db.session.rollback()
+        logger.error(f"Can not complete the simulation run from a cached result: {ex}")
+        abort(400, message=f"Can not complete the simulation run: {ex}")
+
+    return simulation_run
+
+
+def solver_subtask_json_path(json_path, task_index):
+    return json_path.replace(".json", f"_task{task_index}.json")
+
+
+def remove_solver_subtask_files(json_path, n_subtasks):
+    from simulation_backend.Cancellation import CANCEL_FLAG_EXTENSION
+    from simulation_backend.Progress import PROGRESS_FILE_SUFFIX
+    from simulation_backend.TimeSeries import (
+        EDC_SUFFIX,
+        FREQUENCIES_SUFFIX,
+        PRESSURE_CSV_SUFFIX,
+        PRESSURE_SUFFIX,
+        TIME_AXIS_SUFFIX,
+    )
+
+    # Once merged, the part files of the subtasks are not needed anymore (an opt-in _debug.npz is kept)
+    for task_index in range(n_subtasks):
+        subtask_base = os.path.splitext(
+            solver_subtask_json_path(json_path, task_index)
+        )[0]
+        for suffix in (
+            ".json",
+            ".msh",
+            PROGRESS_FILE_SUFFIX,
+            CANCEL_FLAG_EXTENSION,
+            TIME_AXIS_SUFFIX,
+            FREQUENCIES_SUFFIX,
+            EDC_SUFFIX,
+            PRESSURE_SUFFIX,
+            PRESSURE_CSV_SUFFIX,
+        ):
+            try:
+                os.remove(subtask_base + suffix)
+            except FileNotFoundError:
+                pass
+
+
+def solver_subtask_task_ids(sources):
+    # The ids of the Task rows of the (source, method) pairs, in the order of the results
+    return [
+        task_status["id"]
+        for source in sources
+        for task_status in source["taskStatuses"]
+    ]
+
+
+def update_simulation_run_percentage(session, simulation_run):
+    # The percentage of a run is the average of the percentages of its tasks
+    average_percentage = (
+        session.query(func.avg(func.coalesce(Task.percentage, 0)))
+        .filter(Task.id.in_(solver_subtask_task_ids(simulation_run.sources)))
+        .scalar()
+    )
+    simulation_run.percentage = int(average_percentage or 0)
+
+
 @shared_task
-def run_solver(simulation_run_id: int, json_path: str):
+def run_solver_subtask(simulation_run_id: int, json_path: str, task_index: int):
     from simulation_backend.DGinterface import dg_method
     from simulation_backend.DEinterface import de_method
     from simulation_backend.MyNewMethodInterface import mynewmethod_method
+    from simulation_backend.Cancellation import is_cancel_requested
+    from simulation_backend.Progress import set_progress_listener
 
     from app.db import db
     from app.models import SimulationRun
     from app.types import Status
 
-    # Create logger for this module
-
-    logger.info(f"Running solver task for simulation_run_id: {simulation_run_id}")
+    subtask_json_path = solver_subtask_json_path(json_path, task_index)
+    logger.info(
+        f"Running solver subtask {task_index} for simulation_run_id: {simulation_run_id}"
+    )
 
     # Scoped session factory to ensure proper session management
     session_factory = sessionmaker(bind=db.engine)
     session = scoped_session(session_factory)()  # Create a new session for this thread
 
+    # The subtask never raises, so the chord callback always runs and rolls the statuses up
+    status = Status.Error
+    task = None
     try:
         simulation_run = session.query(SimulationRun).get(simulation_run_id)
         if simulation_run is None:
             logger.error(f"SimulationRun with id {simulation_run_id} not found")
-            return
+            return {"taskIndex": task_index, "status": status.value}
 
-        logger.info(f"SimulationRun found: {simulation_run}")
         simulation = (
             session.query(Simulation)
             .filter_by(simulationRunId=simulation_run.id)
             .first()
         )
+        task = session.query(Task).get(
+            solver_subtask_task_ids(simulation_run.sources)[task_index]
+        )
 
-        if simulation_run:
-            simulation_run.status = Status.Queued
+        if is_cancel_requested(subtask_json_path):
+            status = Status.Cancelled
+            return {"taskIndex": task_index, "status": status.value}
 
-        if simulation:
-            simulation.status = Status.Queued
+        if simulation_run.status in (Status.Created, Status.Queued):
+            simulation_run.status = Status.InProgress
+            simulation.status = Status.InProgress
+        task.status = Status.InProgress
+        task.updatedAt = datetime.now()
         session.commit()
-        logger.info(f"Simulation(run) status updated to {simulation_run.status}")
 
+        with open(subtask_json_path, "r") as json_file:
+            result_container = json.load(json_file)
+
+        taskType = TaskType(result_container["results"][0]["resultType"])
+        logger.info(f"{taskType}")
+
+        # save the simulation solver settings
         try:
-            if simulation_run:
-                simulation_run.status = Status.InProgress
-            simulation.status = Status.InProgress
+            solverSettings = simulation.solverSettings
+            result_container["simulationSettings"] = solverSettings[
+                "simulationSettings"
+            ]
+            result_container["settingsPreset"] = simulation.settingsPreset.value
+
+            with open(subtask_json_path, "w", encoding="utf-8") as file:
+                json.dump(result_container, file, indent=4)
+        except Exception as ex:
+            logger.error(f"Error saving the simulation solver settings: {ex}")
+            raise Exception(f"Error saving the simulation solver settings {ex}")
+
+        # Called in this process each time the method writes its progress file, also
+        # from the thread forwarding the DG progress, hence the lock around the session
+        progress_lock = threading.Lock()
+
+        def push_progress(progress_json_path, percentage, stage):
+            if progress_json_path != subtask_json_path:
+                return
+            with progress_lock:
+                if percentage == task.percentage:
+                    return
+                try:
+                    task.percentage = percentage
+                    task.updatedAt = datetime.now()
+                    update_simulation_run_percentage(session, simulation_run)
+                    session.commit()
+                except Exception as ex:
+                    session.rollback()
+                    logger.warning(
+                        f"Cannot push the progress of subtask {task_index}: {ex}"
+                    )
+
+        set_progress_listener(push_progress)
+
+        match taskType:
+            case TaskType.DE:
+                logger.info("DE method")
+                de_method(json_file_path=subtask_json_path)
+
+            case TaskType.DG:
+                # DG METHOD
+                dg_method(json_file_path=subtask_json_path)
+                logger.info("DG method")
+
+            case TaskType.MyNewMethod:
+                # MyNewMethod METHOD
+                mynewmethod_method(json_file_path=subtask_json_path)
+                logger.info("MyNewMethod")
+
+            case _:
+                raise Exception("The selected tasktype is not valid!")
+
+        if is_cancel_requested(subtask_json_path):
+            status = Status.Cancelled
+        else:
+            status = Status.Completed
+            task.percentage = 100
+            task.completedAt = datetime.now()
+
+    except Exception as ex:
+        session.rollback()
+        logger.error(f"Cannot run the method of subtask {task_index} because: {ex}")
+        if task is not None:
+            task.message = str(ex)
+
+    finally:
+        set_progress_listener(None)
+        if task is not None:
+            task.status = status
+            task.updatedAt = datetime.now()
+            update_simulation_run_percentage(session, simulation_run)
             session.commit()
-            logger.info(f"SimulationRun status updated to {simulation_run.status}")
+        session.close()  # Ensure the session is closed after use
+        logger.info(f"Session closed for solver subtask {task_index}")
 
-            result_container = {}
-            if json_path is not None:
-                with open(json_path, "r") as json_file:
-                    result_container = json.load(json_file)
+    return {"taskIndex": task_index, "status": status.value}
 
-            taskType = TaskType(result_container["results"][0]["resultType"])
-            logger.info(f"{taskType}")
 
-            # save the simulation solver settings
-            try:
-                solverSettings = simulation.solverSettings
-                with open(json_path, "r", encoding="utf-8") as file:
-                    data = json.load(file)
-                data["simulationSettings"] = solverSettings["simulationSettings"]
-                data["settingsPreset"] = simulation.settingsPreset.value
-
-                with open(json_path, "w", encoding="utf-8") as file:
-                    json.dump(data, file, indent=4)
-            except Exception as ex:
-                logger.error(f"Error saving the simulation solver settings: {ex}")
-                raise Exception(f"Error saving the simulation solver settings {ex}")
-
-            match taskType:
-                case TaskType.DE:
-                    logger.info("DE method")
-                    de_method(json_file_path=json_path)
-
-                    if json_path is not None:
-                        with open(json_path, "r") as json_file_to_check:
-                            data = json.load(json_file_to_check)
-
-                        # Update the specified field value
-                        if "should_cancel" in data:
-                            if data["should_cancel"] == True:
-                                logger.info("Cancelled: do not save to xlsx")
-                            else:
-                                logger.info("Saving to xlsx...")
-
-                                # save the simulation result json to xlsx
-                                if not ExportHelper.parse_json_file_to_xlsx_file(
-                                    json_path, json_path.replace(".json", ".xlsx")
-                                ):
-                                    logger.error("Error saving the result to xlsx")
-                                    raise "Error saving the result to xlsx"
-
-                                # db - save the xlsx file path
-                                export = Export(
-                                    name=Path(json_path).name.replace(".json", ".xlsx"),
-                                    simulationId=simulation.id,
-                                )
-                                session.add(export)
-
-                                # auralization: generate impulse response wav file
-                                imp_tot, fs = auralization_calculation(
-                                    None,
-                                    json_path.replace(".json", "_pressure.csv"),
-                                    json_path.replace(".json", ".wav"),
-                                )
-                                # auralization: save the impulse response to xlsx
-                                if not ExportHelper.write_data_to_xlsx_file(
-                                    json_path.replace(".json", ".xlsx"),
-                                    CustomExportParametersConfig.impulse_response,
-                                    {f"{fs}Hz": imp_tot},
-                                ):
-                                    logger.error(
-                                        "Error saving the impulse response to xlsx"
-                                    )
-                                    raise "Error saving the impulse response to xlsx"
-
-                case TaskType.DG:
-                    # DG METHOD
-                    dg_method(json_file_path=json_path)
-                    logger.info("DG method")
-
-                case TaskType.MyNewMethod:
-                    # MyNewMethod METHOD
-                    mynewmethod_method(json_file_path=json_path)
-                    logger.info("MyNewMethod")
-
-                case _:
-                    raise Exception("The selected tasktype is not valid!")
-
-            result_container = {}
-            if json_path is not None:
+@shared_task
+def merge_solver_results(subtask_statuses, simulation_run_id: int, json_path: str):
+    from simulation_backend.Cancellation import is_cancel_requested
+    from simulation_backend.TimeSeries import merge_time_series
+
+    from app.db import db
+    from app.models import SimulationRun
+    from app.types import Status
+
+    logger.info(f"Merging solver results for simulation_run_id: {simulation_run_id}")
+
+    # Scoped session factory to ensure proper session management
+    session_factory = sessionmaker(bind=db.engine)
+    session = scoped_session(session_factory)()  # Create a new session for this thread
+
+    try:
+        simulation_run = session.query(SimulationRun).get(simulation_run_id)
+        if simulation_run is None:
+            logger.error(f"SimulationRun with id {simulation_run_id} not found")
+            return
+
+        simulation = (
+            session.query(Simulation)
+            .filter_by(simulationRunId=simulation_run.id)
+            .first()
+        )
+        statuses = [Status(subtask["status"]) for subtask in subtask_statuses]
+
+        try:
+            if is_cancel_requested(json_path) or Status.Cancelled in statuses:
+                simulation_run.status = Status.Cancelled
+                simulation_run.completedAt = ""
+                simulation.status = Status.Cancelled
+                simulation.completedAt = ""
+            elif Status.Error in statuses:
+                raise Exception("a solver subtask failed")
+            else:
+                simulation_run.status = Status.ProcessingResults
+                simulation.status = Status.ProcessingResults
+                session.commit()
+
+                # Put the result of each subtask back at its place in the simulation json
                 with open(json_path, "r") as json_file:
                     result_container = json.load(json_file)
 
-            if simulation_run:
-                if result_container["should_cancel"]:
-                    simulation_run.status = Status.Cancelled
-                    simulation_run.completedAt = ""
-                    simulation.status = Status.Cancelled
-                    simulation.completedAt = ""
-                else:
-                    simulation_run.status = Status.Completed
-                    simulation_run.completedAt = datetime.now()
-                    simulation.status = Status.Completed
-                    simulation.completedAt = datetime.now()
-
+                subtask_json_paths = [
+                    solver_subtask_json_path(json_path, task_index)
+                    for task_index in range(len(result_container["results"]))
+                ]
+                for task_index, subtask_json_path in enumerate(subtask_json_paths):
+                    with open(subtask_json_path, "r") as json_file:
+                        subtask_container = json.load(json_file)
+                    result_container["results"][task_index] = subtask_container[
+                        "results"
+                    ][0]
+                    result_container["simulationSettings"] = subtask_container.get(
+                        "simulationSettings"
+                    )
+                    result_container["settingsPreset"] = subtask_container.get(
+                        "settingsPreset"
+                    )
+
+                has_time_series = merge_time_series(
+                    json_path, subtask_json_paths, result_container["results"]
+                )
+                with open(json_path, "w") as json_file:
+                    json.dump(result_container, json_file, indent=4)
+
+                if has_time_series:
+                    logger.info("Saving to xlsx...")
+
+                    # save the simulation result json to xlsx
+                    if not ExportHelper.parse_json_file_to_xlsx_file(
+                        json_path, json_path.replace(".json", ".xlsx")
+                    ):
+                        logger.error("Error saving the result to xlsx")
+                        raise Exception("Error saving the result to xlsx")
+
+                    # db - save the xlsx file path
+                    export = Export(
+                        name=Path(json_path).name.replace(".json", ".xlsx"),
+                        simulationId=simulation.id,
+                    )
+                    session.add(export)
+
+                    # auralization: generate impulse response wav file
+                    imp_tot, fs = auralization_calculation(
+                        None,
+                        json_path,
+                        json_path.replace(".json", ".wav"),
+                    )
+                    # auralization: save the impulse response to xlsx
+                    if not ExportHelper.write_data_to_xlsx_file(
+                        json_path.replace(".json", ".xlsx"),
+                        CustomExportParametersConfig.impulse_response,
+                        {f"{fs}Hz": imp_tot},
+                    ):
+                        logger.error("Error saving the impulse response to xlsx")
+                        raise Exception("Error saving the impulse response to xlsx")
+
+                simulation_run.status = Status.Completed
+                simulation_run.percentage = 100
+                simulation_run.completedAt = datetime.now()
+                simulation.status = Status.Completed
+                simulation.completedAt = datetime.now()
+
+            simulation_run.sources = roll_up_task_statuses(
+                simulation_run.sources,
+                session.query(Task)
+                .filter(Task.id.in_(solver_subtask_task_ids(simulation_run.sources)))
+                .all(),
+            )
             simulation_run.updatedAt = datetime.now()
             simulation.updatedAt = datetime.now()
 
@@ -472,7 +841,7 @@ def run_solver(simulation_run_id: int, json_path: str):
             simulation_run.status = Status.Error
             simulation.status = Status.Error
             session.commit()
-            logger.error(f"Cannot run the method because: {ex}")
+            logger.error(f"Cannot merge the results because: {ex}")
 
     except Exception as ex:
         session.rollback()
@@ -481,36 +850,135 @@ def run_solver(simulation_run_id: int, json_path: str):
     finally:
         session.close()  # Ensure the session is closed after use
         logger.info(f"Session closed for simulation_run_id: {simulation_run_id}")
+        remove_solver_subtask_files(json_path, len(subtask_statuses))
 
 
-def get_simulation_result_by_id(simulation_id):
+def get_simulation_result_by_id(
+    simulation_id, max_points=None, t_start=None, t_end=None
+):
     simulation = get_simulation_by_id(simulation_id)
     model = model_service.get_model(simulation.modelId)
     json_path = file_service.get_file_related_path(
         model.outputFileId, simulation_id, extension="json"
     )
 
+    if max_points is None and t_start is None and t_end is None:
+        # The full resolution curves are read on every request rather than pinned in the cache
+        return load_simulation_result(json_path)
+
+    # The modification time is part of the cache key, so a new run of the simulation is never served from the cache
+    return copy.deepcopy(
+        load_decimated_simulation_result(
+            json_path, os.path.getmtime(json_path), max_points, t_start, t_end
+        )
+    )
+
+
+def load_simulation_result(json_path):
     with open(json_path, "r") as json_file:
         result_container = json.load(json_file)
 
-    return result_container["results"]
+    from simulation_backend.TimeSeries import load_receiver_results
+
+    # The curves are read from the binary time series files referenced by the json
+    return load_receiver_results(json_path, result_container["results"])
+
+
+@lru_cache(maxsize=8)
+def load_decimated_simulation_result(
+    json_path, modified_at, max_points, t_start, t_end
+):
+    # Only the decimated curves are cached, the caller gets a copy of the cached results
+    results = load_simulation_result(json_path)
+    for result in results:
+        for response in result.get("responses", []):
+            for receiver_result in response.get("receiverResults", []):
+                if not isinstance(receiver_result, dict) or "t" not in receiver_result:
+                    continue
+                t, data = decimate_min_max(
+                    receiver_result["t"],
+                    receiver_result["data"],
+                    max_points,
+                    t_start,
+                    t_end,
+                )
+                receiver_result["t"] = t.tolist()
+                receiver_result["data"] = data.tolist()
 
+    return results
 
-def update_simulation_run_status(simulation_run, simulation):
-    # TODO: update source percentage later
-    model = model_service.get_model(simulation.modelId)
-    json_path = file_service.get_file_related_path(
-        model.outputFileId, simulation.id, extension="json"
-    )
-    with open(json_path, "r") as json_file:
-        try:
-            result_container = json.load(json_file)
-            simulation_run.percentage = result_container["results"][0]["percentage"]
+
+def roll_up_task_statuses(sources, tasks):
+    # Copies the status and the percentage pushed to the Task rows into the sources of a run
+    tasks_by_id = {task.id: task for task in tasks}
+    sources = copy.deepcopy(sources)
+    for source in sources:
+        for task_status in source["taskStatuses"]:
+            task = tasks_by_id.get(task_status["id"])
+            if task is not None:
+                task_status["status"] = task.status.value
+                task_status["message"] = task.message
+                task_status["percentage"] = task.percentage or 0
+        if source["taskStatuses"]:
+            source["percentage"] = sum(
+                task_status["percentage"] for task_status in source["taskStatuses"]
+            ) // len(source["taskStatuses"])
+    return sources
+
+
+def update_simulation_run_status(simulation_run):
+    update_simulation_runs_status([simulation_run])
+
+
+def update_simulation_runs_status(simulation_runs):
+    try:
+        # The percentages are pushed to the database by the workers, no file is read here;
+        # the tasks of all the runs are read in one query
+        tasks = Task.query.filter(
+            Task.id.in_(
+                [
+                    task_id
+                    for simulation_run in simulation_runs
+                    for task_id in solver_subtask_task_ids(simulation_run.sources)
+                ]
+            )
+        ).all()
+        changed = False
+        for simulation_run in simulation_runs:
+            sources = roll_up_task_statuses(simulation_run.sources, tasks)
+            if sources != simulation_run.sources:
+                simulation_run.sources = sources
+                changed = True
+        if changed:
             db.session.commit()
-        except Exception as ex:
-            db.session.rollback()
-            logger.warning(msg=f"Can not update percentage of the simulation run: {ex}")
-            abort(400, message=f"Can not update percentage of the simulation run: {ex}")
+    except Exception as ex:
+        db.session.rollback()
+        logger.warning(msg=f"Can not update percentage of the simulation run: {ex}")
+        abort(400, message=f"Can not update percentage of the simulation run: {ex}")
+
+
+def get_simulation_runs_status(simulation_run_ids=None, since=None):
+    # A single query on the columns pushed by the workers: only the runs asked for, or changed since a timestamp
+    query = db.session.query(
+        SimulationRun.id,
+        Simulation.id.label("simulationId"),
+        SimulationRun.status,
+        SimulationRun.percentage,
+        SimulationRun.updatedAt,
+        SimulationRun.completedAt,
+    ).join(Simulation, Simulation.simulationRunId == SimulationRun.id)
+
+    if simulation_run_ids:
+        query = query.filter(SimulationRun.id.in_(simulation_run_ids))
+    if since is not None:
+        # updatedAt holds str(datetime.now()), so compare with a naive local time in the same format
+        if since.tzinfo is not None:
+            since = since.astimezone().replace(tzinfo=None)
+        query = query.filter(
+            SimulationRun.updatedAt > since.isoformat(sep=" ", timespec="microseconds")
+        )
+
+    return query.order_by(SimulationRun.updatedAt).all()
 
 
 def get_simulation_run_status_by_id(simulation_run_id):
@@ -525,7 +993,7 @@ def get_simulation_run_status_by_id(simulation_run_id):
     if not simulation_run:
         abort(400, message="Simulation run doesn't exist!")
 
-    update_simulation_run_status(simulation_run, simulation)
+    update_simulation_run_status(simulation_run)
 
     return simulation_run
 
@@ -554,27 +1022,15 @@ def cancel_solver_task(simulation_id):
     taskID = data["task_id"]
     print(f"Canceling task: {taskID}")
 
-    # Use current_app for better connection handling
-    from celery import current_app
-
-    try:
-        # This is more reliable for revoking tasks in Flask
-        current_app.control.revoke(taskID, terminate=True, signal="SIGKILL")
-        logger.info(f"Successfully sent revoke command for task {taskID}")
-    except Exception as e:
-        logger.error(f"Error revoking task {taskID}: {str(e)}")
-        # Continue execution to at least update the flag
-
-    # Update the specified field value
-    if "should_cancel" in data:
-        data["should_cancel"] = True
-    else:
-        data["should_cancel"] = True  # Create the field if it doesn't exist
+    from simulation_backend.Cancellation import request_cancel
 
-    print("should_cancel = " + str(data["should_cancel"]))
+    # The solvers poll these flag files; dg_method forwards its flag into the "should_cancel" key
+    # its library polls, so the json files are only ever rewritten by the workers solving them.
+    # The subtasks are not revoked: a cancelled subtask returns early, so the chord callback
+    # still runs and marks the run as cancelled.
+    request_cancel(json_path)
+    for task_index in range(len(data["results"])):
+        request_cancel(solver_subtask_json_path(json_path, task_index))
     print("json path: " + json_path)
 
-    with open(json_path, "w") as json_result_file:
-        json_result_file.write(json.dumps(data))
-
     return {"message": f"Cancellation request sent for task {taskID}"}
@@ -0,0 +1,40 @@
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def decimate_min_max(
+    t: Sequence[float],
+    data: Sequence[float],
+    max_points: Optional[int] = None,
+    t_start: Optional[float] = None,
+    t_end: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce a curve to at most max_points samples for plotting, within [t_start, t_end].
+
+    The window is split in max_points / 2 buckets and the minimum and maximum sample of each bucket are kept, in time
+    order, so peaks and dips are preserved. Curves that already fit are returned unchanged.
+    """
+    t = np.asarray(t, dtype=float)
+    data = np.asarray(data, dtype=float)
+
+    window = np.ones(len(t), dtype=bool)
+    if t_start is not None:
+        window &= t >= t_start
+    if t_end is not None:
+        window &= t <= t_end
+    t, data = t[window], data[window]
+
+    if max_points is None or len(t) <= max_points:
+        return t, data
+
+    n_buckets = max(max_points // 2, 1)
+    edges = np.linspace(0, len(t), n_buckets + 1).astype(int)
+    keep = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        bucket = data[start:end]
+        keep.extend(sorted({start + int(np.argmin(bucket)), start + int(np.argmax(bucket))}))
+
+    keep = np.asarray(keep, dtype=int)
+    return t[keep], data[keep]
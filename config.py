@@ -1,6 +1,8 @@
 import datetime
 import os
 
+from kombu import Exchange, Queue
+
 basedir = os.path.abspath(os.path.dirname(__file__))
 app_dir = os.path.join(os.path.abspath(os.path.dirname(__file__)), "app")
 
@@ -77,6 +79,27 @@ class DefaultConfig:
     CELERY_CONFIG = {
         "broker_url": "sqla+sqlite:///" + os.path.join(basedir, "celerydb.sqlite"),
         "result_backend": "db+sqlite:///" + os.path.join(basedir, "celerydb.sqlite"),
+        # The CPU-bound solver tasks, the auralization tasks and the light bookkeeping tasks have their own queue,
+        # so each queue can be consumed by a worker with a suitable pool (see entrypoint.sh). A worker started
+        # without -Q consumes all of them.
+        "task_queues": tuple(
+            Queue(name, Exchange(name), routing_key=name, queue_arguments={"x-max-priority": 10})
+            for name in ("default", "solver", "auralization")
+        ),
+        "task_default_queue": "default",
+        "task_default_priority": 5,
+        # Short auralization jobs go before the merge of a finished simulation run on their shared queue
+        # (priorities are honoured by brokers supporting them, e.g. RabbitMQ)
+        "task_routes": {
+            "app.services.simulation_service.run_solver_subtask": {"queue": "solver"},
+            # Meshing and the geometry check of an upload are interactive, so they never wait behind a solve
+            "app.services.mesh_service.run_mesh_task": {"queue": "preprocessing"},
+            "app.services.geometry_service.run_geometry_check_task": {"queue": "preprocessing"},
+            "app.services.simulation_service.merge_solver_results": {"queue": "auralization", "priority": 3},
+            "app.services.auralization_service.run_auralization": {"queue": "auralization", "priority": 9},
+        },
+        # A worker reserves one task at a time, so a short task is never held behind an hour-long solve
+        "worker_prefetch_multiplier": 1,
     }
 
 
@@ -37,9 +37,22 @@ if [ "$APP_ENV" = "local" ] || [ "$APP_ENV" = "production" ]; then
 
     gunicorn -c ./gunicorn/gunicorn_config.py "app:app" --bind 0.0.0.0:5001 &
 
-    # Start Celery worker if needed
-    echo "Starting Celery worker..."
-    celery -A $CELERY_APP worker --loglevel=info -P eventlet &
+    # Start Celery workers if needed: the CPU-bound solver, preprocessing and auralization tasks run in their own processes,
+    # the light bookkeeping tasks in an eventlet pool (see CELERY_CONFIG in config.py for the task routes).
+    # The children of a prefork pool are daemons, which cannot fork the band pool of the DE solver, so the
+    # solver queue is consumed by several solo workers, each running one task at a time in its own process.
+    echo "Starting Celery workers..."
+    i=1
+    while [ "$i" -le "${CELERY_SOLVER_WORKERS:-2}" ]; do
+        celery -A $CELERY_APP worker --loglevel=info -P solo -Q solver -n solver$i@%h &
+        i=$((i + 1))
+    done
+    celery -A $CELERY_APP worker --loglevel=info -P prefork -Q preprocessing \
+        --concurrency=${CELERY_PREPROCESSING_CONCURRENCY:-2} -n preprocessing@%h &
+    celery -A $CELERY_APP worker --loglevel=info -P prefork -Q auralization \
+        --concurrency=${CELERY_AURALIZATION_CONCURRENCY:-2} -n auralization@%h &
+    celery -A $CELERY_APP worker --loglevel=info -P eventlet -Q default \
+        --concurrency=${CELERY_DEFAULT_CONCURRENCY:-20} -n default@%h &
     
     # Start Celery Beat if needed
     if [ "$APP_ENV" = "local" ]; then
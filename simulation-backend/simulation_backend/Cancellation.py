@@ -0,0 +1,74 @@
+import os
+
+
+CANCEL_FLAG_EXTENSION = ".cancel"
+
+
+def cancel_flag_path(json_file_path):
+    """
+    Returns the path of the cancellation flag file of a simulation.
+
+    Parameters
+    ----------
+    json_file_path : str
+        The json file of the simulation.
+
+    Returns
+    ------
+    str
+        The path to the flag file, next to the json file.
+    """
+
+    return os.path.splitext(json_file_path)[0] + CANCEL_FLAG_EXTENSION
+
+
+def request_cancel(json_file_path):
+    """
+    Asks the simulation method working on a json file to stop, by creating its flag file. The flag file is the only cancellation state: the json file is never rewritten here, as a worker may be writing it at the same time.
+
+    Parameters
+    ----------
+    json_file_path : str
+        The json file of the simulation to cancel.
+
+    """
+
+    with open(cancel_flag_path(json_file_path), "w"):
+        pass
+
+
+def is_cancel_requested(json_file_path):
+    """
+    Checks whether the simulation of a json file has been cancelled. This only checks whether the flag file exists, so it is cheap enough to be called from a time loop.
+
+    Parameters
+    ----------
+    json_file_path : str
+        The json file of the simulation.
+
+    Returns
+    ------
+    bool
+        True when the simulation has been cancelled.
+    """
+
+    return json_file_path is not None and os.path.exists(
+        cancel_flag_path(json_file_path)
+    )
+
+
+def clear_cancel_request(json_file_path):
+    """
+    Removes the cancellation flag file of a simulation, if any.
+
+    Parameters
+    ----------
+    json_file_path : str
+        The json file of the simulation.
+
+    """
+
+    try:
+        os.remove(cancel_flag_path(json_file_path))
+    except FileNotFoundError:
+        pass
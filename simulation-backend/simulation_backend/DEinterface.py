@@ -11,24 +11,37 @@ Created on Wed Aug  2 16:12:40 2023
 ###############################################################################
 # Code developed by Ilaria Fichera for the analysis of the FVM method adapted solving the 3D diffusion equation with one intermittent omnidirectional sound source
 # Import modules
+import hashlib
 import itertools
 import json
+import multiprocessing
 import os
-import pickle
 import time
-import types
-import pandas as pd
+import numpy as np
 
+from concurrent.futures import ProcessPoolExecutor, wait
 from math import ceil
 from math import log
 
 import gmsh
+from scipy.sparse import csr_matrix, diags
+from scipy.sparse.linalg import factorized
+from scipy.spatial import cKDTree
+
+try:
+    from scipy.sparse import _sparsetools
+except ImportError:  # private scipy module, fall back to the public product
+    _sparsetools = None
 
 from Diffusion_Module.FiniteVolumeMethod.FunctionRT import t60_decay
 from Diffusion_Module.FiniteVolumeMethod.FunctionClarity import *
 from Diffusion_Module.FiniteVolumeMethod.FunctionDefinition import *
 from Diffusion_Module.FiniteVolumeMethod.FunctionCentreTime import *
-from Diffusion_Module.FiniteVolumeMethod.CreateMeshFVM import generate_mesh
+
+from simulation_backend.Cancellation import is_cancel_requested
+from simulation_backend.MeshCache import generate_cached_mesh, prune_cache
+from simulation_backend.Progress import write_progress
+from simulation_backend.TimeSeries import edc_reference, write_time_series
 
 # Silvin: debugging
 import logging
@@ -36,6 +49,1033 @@ import traceback
 
 logger = logging.getLogger(__name__)
 
+# %%
+###############################################################################
+# MESH GEOMETRY FUNCTIONS
+###############################################################################
+
+
+def node_row_lookup(node_tags):
+    """
+    Builds the lookup array from gmsh node tags to rows of the node coordinates.
+
+    Parameters
+    ----------
+    node_tags : numpy.ndarray
+        Tag of the node of each row of the node coordinates.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array indexed by node tag, giving the row of that node (-1 for the
+        tags that are not in node_tags). Indexing it with an array of tags
+        gives the rows of all of them at once.
+    """
+    node_tags = np.asarray(node_tags, dtype=np.int64)
+    node_rows = -np.ones(node_tags.max() + 1 if len(node_tags) else 0, dtype=np.int64)
+    node_rows[node_tags] = np.arange(len(node_tags))
+    return node_rows
+
+
+def tetrahedron_volumes_centres(vertices):
+    """
+    Computes the volume and the centre of tetrahedrons.
+
+    Parameters
+    ----------
+    vertices : numpy.ndarray
+        (n_tets, 4, 3) coordinates of the four vertices of each tetrahedron.
+
+    Returns
+    -------
+    numpy.ndarray
+        (n_tets,) volume of each tetrahedron.
+    numpy.ndarray
+        (n_tets, 3) coordinates of the centre of each tetrahedron.
+    """
+    vertices = np.asarray(vertices, dtype=float).reshape((-1, 4, 3))
+    v0, v1, v2, v3 = (vertices[:, i] for i in range(4))
+    volumes = (
+        np.abs(np.einsum("ij,ij->i", np.cross(v1 - v3, v2 - v3), v0 - v3)) / 6
+    )  # scalar triple product
+    centres = vertices.mean(axis=1)
+    return volumes, centres
+
+
+def triangle_areas_centres_normals(vertices):
+    """
+    Computes the area, the centre and the unit normal of triangles.
+
+    Parameters
+    ----------
+    vertices : numpy.ndarray
+        (n_triangles, 3, 3) coordinates of the three vertices of each triangle.
+
+    Returns
+    -------
+    numpy.ndarray
+        (n_triangles,) area of each triangle.
+    numpy.ndarray
+        (n_triangles, 3) coordinates of the centre of each triangle.
+    numpy.ndarray
+        (n_triangles, 3) unit normal of each triangle, oriented by the order
+        of its vertices (zero for degenerate triangles).
+    """
+    vertices = np.asarray(vertices, dtype=float).reshape((-1, 3, 3))
+    cross = np.cross(vertices[:, 1] - vertices[:, 0], vertices[:, 2] - vertices[:, 0])
+    double_areas = np.linalg.norm(cross, axis=1)
+    normals = np.divide(
+        cross,
+        double_areas[:, np.newaxis],
+        out=np.zeros_like(cross),
+        where=double_areas[:, np.newaxis] > 0,
+    )
+    return double_areas / 2, vertices.mean(axis=1), normals
+
+
+# %%
+###############################################################################
+# SPARSE OPERATOR FUNCTIONS
+###############################################################################
+
+
+def conductance_matrix(face_tets, face_coords, cell_center):
+    """
+    Builds the sparse interior conductance operator of the finite volume scheme.
+
+    Every interior face couples the two tetrahedrons sharing it with the ratio
+    between the face area and the distance between the two cell centres. The
+    operator is assembled from the face x tetrahedron incidence, so the build
+    cost grows linearly with the number of faces.
+
+    Parameters
+    ----------
+    face_tets : numpy.ndarray
+        (n_faces, 2) indices of the two tetrahedrons sharing each interior face.
+    face_coords : numpy.ndarray
+        (n_faces, 3, 3) coordinates of the three vertices of each interior face.
+    cell_center : numpy.ndarray
+        (n_tets, 3) coordinates of the centre of each tetrahedron.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        Symmetric (n_tets, n_tets) matrix with shared_area / shared_distance
+        for every pair of neighbouring tetrahedrons.
+    numpy.ndarray
+        Sum of each row of the matrix.
+    """
+    n_tets = len(cell_center)
+    face_tets = np.asarray(face_tets, dtype=np.int64).reshape((-1, 2))
+    face_coords = np.asarray(face_coords, dtype=float).reshape((-1, 3, 3))
+
+    shared_area = (
+        np.linalg.norm(
+            np.cross(
+                face_coords[:, 2] - face_coords[:, 0],
+                face_coords[:, 1] - face_coords[:, 0],
+            ),
+            axis=1,
+        )
+        / 2
+    )  # area of each interior face
+    shared_distance = np.linalg.norm(
+        cell_center[face_tets[:, 0]] - cell_center[face_tets[:, 1]], axis=1
+    )  # distance between the centres of the two tetrahedrons sharing the face
+    coupling = shared_area / shared_distance
+
+    # Each face contributes to both (i, j) and (j, i)
+    rows = np.concatenate((face_tets[:, 0], face_tets[:, 1]))
+    cols = np.concatenate((face_tets[:, 1], face_tets[:, 0]))
+    interior_tet = csr_matrix(
+        (np.concatenate((coupling, coupling)), (rows, cols)), shape=(n_tets, n_tets)
+    )
+    interior_tet_sum = np.asarray(interior_tet.sum(axis=1)).ravel()
+
+    return interior_tet, interior_tet_sum
+
+
+def face_adjacency(facenodes):
+    """
+    Extracts the face x tetrahedron incidence from the face nodes of all tetrahedrons.
+
+    The face node triples are sorted and grouped with numpy.unique, so the whole
+    extraction is done with array operations instead of per-face dictionaries.
+
+    Parameters
+    ----------
+    facenodes : numpy.ndarray
+        Flat array of node tags as returned by
+        gmsh.model.mesh.getElementFaceNodes(4, 3): three nodes per face and four
+        faces per tetrahedron, tetrahedrons in the order of voluEl.
+
+    Returns
+    -------
+    numpy.ndarray
+        (n_interior, 2) indices of the two tetrahedrons sharing each interior face.
+    numpy.ndarray
+        (n_interior, 3) sorted node tags of each interior face.
+    numpy.ndarray
+        (n_boundary,) index of the tetrahedron owning each boundary face.
+    numpy.ndarray
+        (n_boundary, 3) sorted node tags of each boundary face.
+    numpy.ndarray
+        (n_tets, 4) neighbour table: 1-based indices of the neighbouring
+        tetrahedrons, padded with zeros for the faces on the boundary.
+    """
+    faces = np.sort(np.asarray(facenodes).reshape((-1, 3)), axis=1)
+    n_tets = len(faces) // 4
+    face_owner = np.arange(len(faces)) // 4  # tetrahedron of each face
+
+    unique_faces, face_id, face_count = np.unique(
+        faces, axis=0, return_inverse=True, return_counts=True
+    )
+    face_id = face_id.ravel()
+
+    # Group the faces of all the tetrahedrons by unique face
+    order = np.argsort(face_id, kind="stable")
+    first = np.cumsum(face_count) - face_count  # position of each group in order
+
+    interior = np.flatnonzero(face_count == 2)
+    first_face = order[first[interior]]
+    second_face = order[first[interior] + 1]
+    face_tets = np.column_stack((face_owner[first_face], face_owner[second_face]))
+    interior_face_nodes = unique_faces[interior]
+
+    boundary = np.flatnonzero(face_count == 1)
+    boundary_tets = face_owner[order[first[boundary]]]
+    boundary_face_nodes = unique_faces[boundary]
+
+    # Neighbour of each face of each tetrahedron (0 when the face is on the boundary)
+    neighbour = np.zeros(len(faces), dtype=np.int64)
+    neighbour[first_face] = face_owner[second_face] + 1
+    neighbour[second_face] = face_owner[first_face] + 1
+    neighbourVolume = neighbour.reshape((n_tets, 4))
+    neighbourVolume = np.take_along_axis(
+        neighbourVolume, np.argsort(neighbourVolume == 0, axis=1, kind="stable"), axis=1
+    )  # neighbours first, zeros for the boundary faces last
+
+    return (
+        face_tets,
+        interior_face_nodes,
+        boundary_tets,
+        boundary_face_nodes,
+        neighbourVolume,
+    )
+
+
+def match_faces(faces, reference):
+    """
+    Finds, for every face, the row of the reference faces made of the same nodes.
+
+    Both sets of faces are keyed by their sorted node tags, packed into a single
+    int64 when the node tags allow it, and joined with one sorted search.
+
+    Parameters
+    ----------
+    faces : numpy.ndarray
+        (n_faces, 3) node tags of the faces to look up, in any order.
+    reference : numpy.ndarray
+        (n_reference, 3) node tags of the reference faces, in any order.
+
+    Returns
+    -------
+    numpy.ndarray
+        (n_faces,) row of the matching reference face, or -1 when the face is
+        not in the reference.
+    """
+    faces = np.sort(np.asarray(faces, dtype=np.int64).reshape((-1, 3)), axis=1)
+    reference = np.sort(np.asarray(reference, dtype=np.int64).reshape((-1, 3)), axis=1)
+    if len(faces) == 0 or len(reference) == 0:
+        return -np.ones(len(faces), dtype=np.int64)
+
+    base = int(max(faces.max(), reference.max())) + 1
+    if base**3 < 2**63:
+        # Pack the three sorted node tags in one integer key
+        face_key = (faces[:, 0] * base + faces[:, 1]) * base + faces[:, 2]
+        reference_key = (reference[:, 0] * base + reference[:, 1]) * base + reference[
+            :, 2
+        ]
+    else:
+        # Node tags too large to pack: number the distinct node triples instead
+        _, key = np.unique(np.vstack((reference, faces)), axis=0, return_inverse=True)
+        key = key.ravel()
+        reference_key = key[: len(reference)]
+        face_key = key[len(reference) :]
+
+    order = np.argsort(reference_key, kind="stable")
+    sorted_key = reference_key[order]
+    position = np.minimum(np.searchsorted(sorted_key, face_key), len(sorted_key) - 1)
+    found = sorted_key[position] == face_key
+
+    return np.where(found, order[position], -1)
+
+
+def boundary_entity_area_matrix(
+    tet_nodes, node_rows, nodecoords, boundary_triangles, triangles_per_entity
+):
+    """
+    Builds the boundary area of each tetrahedron per surface entity.
+
+    Multiplied by the absorption term of each entity, it gives the absorption
+    area of each tetrahedron per band, e.g. ``boundary_entity_area @
+    entity_absorption``.
+
+    Parameters
+    ----------
+    tet_nodes : numpy.ndarray
+        (n_tets, 4) node tags of each tetrahedron.
+    node_rows : numpy.ndarray
+        Lookup array from node tag to row of nodecoords, see node_row_lookup.
+    nodecoords : numpy.ndarray
+        (n_nodes, 3) coordinates of the nodes.
+    boundary_triangles : numpy.ndarray
+        (n_triangles, 3) node tags of the boundary triangles, ordered by
+        surface entity.
+    triangles_per_entity : list
+        Number of boundary triangles of each surface entity.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        (n_tets, n_entities) boundary area of each tetrahedron on each entity.
+    float
+        The total boundary area.
+    """
+    tet_nodes = np.asarray(tet_nodes).reshape((-1, 4))
+
+    # All the faces of all the tetrahedrons (4 per tetrahedron, in tet_nodes order)
+    face_combinations = list(
+        itertools.combinations(range(4), 3)
+    )  # the four node combinations making the faces of a tetrahedron
+    tet_faces = tet_nodes[:, face_combinations].reshape((-1, 3))
+    face_tet = np.repeat(np.arange(len(tet_nodes)), len(face_combinations))
+
+    # Join the tetrahedron faces with the boundary triangles on their sorted nodes
+    surface_idx = match_faces(tet_faces, boundary_triangles)
+    is_boundary = surface_idx >= 0
+
+    face_area, _, _ = triangle_areas_centres_normals(
+        nodecoords[node_rows[tet_faces[is_boundary]]]
+    )  # area of each boundary face
+
+    # Surface entity of each boundary triangle
+    triangle_entity = np.repeat(
+        np.arange(len(triangles_per_entity)), triangles_per_entity
+    )
+
+    # Duplicate entries, i.e. several faces of a tetrahedron on one entity, are summed
+    boundary_entity_area = csr_matrix(
+        (
+            face_area,
+            (face_tet[is_boundary], triangle_entity[surface_idx[is_boundary]]),
+        ),
+        shape=(len(tet_nodes), len(triangles_per_entity)),
+    )
+    return boundary_entity_area, np.sum(face_area)
+
+
+def diffusion_operator(
+    interior_tet, interior_tet_sum, boundary_area, cell_volume, Dx, air_absorption
+):
+    """
+    Builds the sparse operator of the semi-discrete diffusion equation.
+
+    The energy density w of the tetrahedrons follows
+    ``cell_volume * dw/dt = operator @ w + cell_volume * s``, with the
+    diffusion between neighbours, the absorption of the boundary faces and
+    the air absorption. The operator is symmetric, so it can be used in an
+    implicit scheme.
+
+    Parameters
+    ----------
+    interior_tet : scipy.sparse.csr_matrix
+        (n_tets, n_tets) interior conductance matrix.
+    interior_tet_sum : numpy.ndarray
+        (n_tets,) sum of each row of ``interior_tet``.
+    boundary_area : numpy.ndarray
+        (n_tets,) absorption weighted boundary area of each tetrahedron.
+    cell_volume : numpy.ndarray
+        (n_tets,) volume of each tetrahedron.
+    Dx : float
+        Diffusion coefficient.
+    air_absorption : float
+        Air absorption rate c0 * m_atm.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        Symmetric (n_tets, n_tets) operator.
+    """
+    return (
+        Dx * interior_tet
+        - diags(Dx * interior_tet_sum + boundary_area + air_absorption * cell_volume)
+    ).tocsr()
+
+
+def sparse_matmul_into(matrix, dense, out):
+    """
+    Computes the product of a CSR matrix and a dense matrix into a preallocated array.
+
+    The time loop calls this once per step, so the product is written straight
+    into ``out`` instead of allocating a new result array every time. Inputs
+    the in-place kernel cannot take (other dtypes, non-contiguous arrays, or a
+    scipy without it) fall back to the public product, copied into ``out``.
+
+    Parameters
+    ----------
+    matrix : scipy.sparse.csr_matrix
+        (n_rows, n_cols) sparse matrix.
+    dense : numpy.ndarray
+        (n_cols, n_vecs) matrix, preferably C-contiguous float64.
+    out : numpy.ndarray
+        (n_rows, n_vecs) array overwritten with the product, preferably
+        C-contiguous float64.
+
+    Returns
+    -------
+    numpy.ndarray
+        ``out``.
+    """
+    if not (
+        getattr(_sparsetools, "csr_matvecs", None) is not None
+        and matrix.format == "csr"
+        and matrix.data.dtype == np.float64
+        and matrix.indices.dtype == matrix.indptr.dtype
+        and dense.ndim == 2
+        and dense.flags.c_contiguous
+        and dense.dtype == np.float64
+        and out.ndim == 2
+        and out.flags.c_contiguous
+        and out.dtype == np.float64
+        and out.shape == (matrix.shape[0], dense.shape[1])
+        and dense.shape[0] == matrix.shape[1]
+    ):
+        np.copyto(out, matrix @ dense)
+        return out
+
+    n_rows, n_cols = matrix.shape
+    out.fill(0)
+    _sparsetools.csr_matvecs(
+        n_rows,
+        n_cols,
+        out.shape[1],
+        matrix.indptr,
+        matrix.indices,
+        matrix.data,
+        dense.ravel(),
+        out.ravel(),
+    )
+    return out
+
+
+# %%
+###############################################################################
+# POINT LOCATION FUNCTIONS
+###############################################################################
+
+
+def nearest_cell_weights(cell_tree, points, k=4):
+    """
+    Computes the inverse distance weights of the cells closest to some points.
+
+    Parameters
+    ----------
+    cell_tree : scipy.spatial.cKDTree
+        The spatial index of the cell centres.
+    points : array_like
+        The (number of points, 3) coordinates of the points.
+    k : int
+        The number of closest cells of each point.
+
+    Returns
+    ------
+    cells : numpy.ndarray
+        The (number of points, k) indices of the closest cells, closest first.
+    weights : numpy.ndarray
+        The (number of points, k) weights of the cells, summing to 1 per point.
+        A point on a cell centre gets all its weight on that cell.
+    """
+    points = np.asarray(points, dtype=float).reshape((-1, 3))
+    k = min(k, cell_tree.n)
+    dist, cells = cell_tree.query(points, k=k)
+    dist = dist.reshape((len(points), k))
+    cells = cells.reshape((len(points), k))
+
+    on_centre = dist == 0
+    with np.errstate(divide="ignore"):
+        weights = np.where(on_centre.any(axis=1, keepdims=True), on_centre, 1.0 / dist)
+    weights /= np.sum(weights, axis=1, keepdims=True)
+    return cells, weights
+
+
+def points_in_tetrahedra(points, vertices):
+    """
+    Checks whether points are inside tetrahedrons, with barycentric coordinates.
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        The (..., 3) coordinates of the points.
+    vertices : numpy.ndarray
+        The (..., 4, 3) coordinates of the vertices of the tetrahedrons,
+        broadcast against the points.
+
+    Returns
+    ------
+    numpy.ndarray
+        True where the point is inside (or on the boundary of) the tetrahedron.
+    """
+    ori = vertices[..., 0, :]
+    edges = np.swapaxes(vertices[..., 1:, :] - ori[..., np.newaxis, :], -1, -2)
+    bary = np.linalg.solve(edges, (points - ori)[..., np.newaxis])[..., 0]
+    return np.all(bary >= 0, axis=-1) & (np.sum(bary, axis=-1) <= 1)
+
+
+def containing_tetrahedra(cell_tree, points, nodecoords, tet_nodes, k=8):
+    """
+    Finds the tetrahedron containing each point.
+
+    The tetrahedrons with the k closest centres are tested first; the points
+    not found in them are tested against all the tetrahedrons.
+
+    Parameters
+    ----------
+    cell_tree : scipy.spatial.cKDTree
+        The spatial index of the tetrahedron centres.
+    points : array_like
+        The (number of points, 3) coordinates of the points.
+    nodecoords : numpy.ndarray
+        The coordinates of the nodes.
+    tet_nodes : numpy.ndarray
+        The (number of tetrahedrons, 4) rows of nodecoords of the vertices of
+        each tetrahedron.
+    k : int
+        The number of candidate tetrahedrons of each point.
+
+    Returns
+    ------
+    numpy.ndarray
+        The index of the tetrahedron containing each point, -1 when the point
+        is outside the mesh.
+    """
+    points = np.asarray(points, dtype=float).reshape((-1, 3))
+    k = min(k, cell_tree.n)
+    candidates = cell_tree.query(points, k=k)[1].reshape((len(points), k))
+
+    inside = points_in_tetrahedra(
+        points[:, np.newaxis, :], nodecoords[tet_nodes[candidates]]
+    )
+    found = inside.any(axis=1)
+    res = np.where(found, candidates[np.arange(len(points)), inside.argmax(axis=1)], -1)
+
+    for iPoint in np.flatnonzero(~found):
+        inside = points_in_tetrahedra(points[iPoint], nodecoords[tet_nodes])
+        if inside.any():
+            res[iPoint] = np.argmax(inside)
+    return res
+
+
+# %%
+###############################################################################
+# TIME INTEGRATION FUNCTIONS
+###############################################################################
+
+
+def has_decayed(w_rec_now, w_rec_source_off, level):
+    """
+    Checks whether every receiver of every band has decayed below a level.
+
+    Parameters
+    ----------
+    w_rec_now : numpy.ndarray
+        (n_receivers, n_bands) energy density at the receivers now.
+    w_rec_source_off : numpy.ndarray
+        (n_receivers, n_bands) energy density at the receivers when the source
+        stopped.
+    level : float
+        The decay, as a ratio of energy densities.
+
+    Returns
+    -------
+    bool
+        True when every receiver of every band is at or below level times its
+        energy density when the source stopped.
+    """
+    return np.all(w_rec_now <= w_rec_source_off * level)
+
+
+def dufort_frankel_time_loop(
+    interior_tet,
+    beta,
+    cell_volume,
+    Dx,
+    dt,
+    air_absorption,
+    source_weights,
+    source_strength,
+    receiver_weights,
+    progress,
+    early_stop=None,
+):
+    """
+    Integrates the energy density of a group of bands with the explicit DuFort-Frankel scheme.
+
+    Each column of the state matrices is one frequency band; only beta differs
+    between the bands, so all of them are advanced in one sparse product per
+    step, in preallocated buffers.
+
+    Parameters
+    ----------
+    interior_tet : scipy.sparse.csr_matrix
+        (n_tets, n_tets) interior conductance matrix.
+    beta : numpy.ndarray
+        (n_tets, n_bands) beta_zero of each band,
+        dt * (Dx * interior_tet_sum + boundary_area) / cell_volume.
+    cell_volume : numpy.ndarray
+        (n_tets,) volume of each tetrahedron.
+    Dx : float
+        Diffusion coefficient.
+    dt : float
+        Time step [s].
+    air_absorption : float
+        Air absorption rate c0 * m_atm.
+    source_weights : numpy.ndarray
+        (n_tets,) source term of each tetrahedron.
+    source_strength : numpy.ndarray
+        (n_steps,) strength of the source used at each step; its length is the
+        number of steps.
+    receiver_weights : scipy.sparse.csr_matrix
+        (n_receivers, n_tets) interpolation weights of the receivers.
+    progress : callable
+        Called with the step and the number of steps after each step;
+        returning True stops the loop.
+    early_stop : tuple, optional
+        (step, interval, level): after the step the source stops at, the loop
+        stops at the first multiple of interval steps where every receiver has
+        decayed below level times its energy density at that step.
+
+    Returns
+    -------
+    numpy.ndarray
+        (n_tets, n_bands) energy density at the last step.
+    numpy.ndarray
+        (n_steps, n_receivers, n_bands) energy density at the receivers, the
+        sample of step n being at time (n + 1) dt; fewer steps when the loop
+        stopped early.
+    """
+    recording_steps = len(source_strength)
+
+    # Coefficients of the update, computed once per group of bands:
+    # w_new = coeff_old * w_old + coeff_flux * (interior_tet @ w) - coeff_air * w + coeff_source * source
+    coeff_old = (1 - beta) / (1 + beta)
+    coeff_flux = (2 * dt * Dx / cell_volume)[:, np.newaxis] / (1 + beta)
+    coeff_air = (2 * dt * air_absorption) / (1 + beta)
+    coeff_source = (2 * dt * source_weights)[:, np.newaxis] / (1 + beta)
+
+    # Two state buffers used as a ring: the w_old buffer is overwritten with w_new at each step
+    w_old = np.zeros(beta.shape)  # w_old at n-1 level
+    w = np.zeros(beta.shape)  # w at n level
+    w_scratch = np.empty(beta.shape)  # work array for the terms of the update
+
+    w_rec = np.zeros(
+        (recording_steps, receiver_weights.shape[0], beta.shape[1])
+    )  # energy density at each receiver
+
+    for steps in range(0, recording_steps):
+        # Computing w_new (w at n+1 time step) for all the bands of the group at once, in the w_old buffer
+        w_new = w_old
+        np.multiply(w_old, coeff_old, out=w_new)
+        sparse_matmul_into(interior_tet, w, w_scratch)
+        np.multiply(w_scratch, coeff_flux, out=w_scratch)
+        np.add(w_new, w_scratch, out=w_new)
+        if air_absorption != 0:
+            np.multiply(w, coeff_air, out=w_scratch)
+            np.subtract(w_new, w_scratch, out=w_new)
+        if source_strength[steps] != 0:
+            np.multiply(coeff_source, source_strength[steps], out=w_scratch)
+            np.add(w_new, w_scratch, out=w_new)
+        # The absorption term is part of beta
+
+        # Update w before next step
+        w_old = w  # The w at n step becomes the w at n-1 step
+        w = w_new  # The w at n+1 step becomes the w at n step
+
+        # INTERPOLATION WITH N CELL CENTRES OR 4 CELL CENTRES
+        sparse_matmul_into(receiver_weights, w_new, w_rec[steps])
+
+        if progress(steps, recording_steps):
+            logger.debug("Explicit time loop cancelled at step %d", steps)
+            break
+
+        if early_stop is not None:
+            source_off_step, interval, level = early_stop
+            if (
+                steps > source_off_step
+                and (steps - source_off_step) % interval == 0
+                and has_decayed(w_rec[steps], w_rec[source_off_step], level)
+            ):
+                logger.debug("Decay threshold reached at %s s", (steps + 1) * dt)
+                return w, w_rec[: steps + 1]
+
+    return w, w_rec
+
+
+def theta_scheme_time_loop(
+    system_operators,
+    cell_volume,
+    theta,
+    dt_implicit,
+    source_weights,
+    source_strength,
+    receiver_weights,
+    progress,
+    early_stop=None,
+):
+    """
+    Integrates the energy density of a group of bands with an implicit theta scheme.
+
+    ``cell_volume * dw/dt = A w + cell_volume * s`` is solved with one sparse
+    factorization per band: theta = 0.5 is Crank-Nicolson, theta = 1 backward
+    Euler.
+
+    Parameters
+    ----------
+    system_operators : list
+        The (n_tets, n_tets) operator A of each band, see diffusion_operator.
+    cell_volume : numpy.ndarray
+        (n_tets,) volume of each tetrahedron.
+    theta : float
+        The implicitness of the scheme.
+    dt_implicit : float
+        Time step [s].
+    source_weights : numpy.ndarray
+        (n_tets,) source term of each tetrahedron.
+    source_strength : numpy.ndarray
+        (n_steps + 1,) strength of the source at each time level.
+    receiver_weights : scipy.sparse.csr_matrix
+        (n_receivers, n_tets) interpolation weights of the receivers.
+    progress : callable
+        Called with the step and the number of steps after each step;
+        returning True stops the loop.
+    early_stop : tuple, optional
+        (step, level): after the time level the source stops at, the loop stops
+        at the first level where every receiver has decayed below level times
+        its energy density at that time level.
+
+    Returns
+    -------
+    numpy.ndarray
+        (n_tets, n_bands) energy density at the last time level.
+    numpy.ndarray
+        (n_levels, n_receivers, n_bands) energy density at the receivers at the
+        time levels n dt_implicit, from 0 to the last level computed.
+    """
+    implicit_steps = len(source_strength) - 1
+
+    solvers = [
+        factorized((diags(cell_volume) - theta * dt_implicit * system_operator).tocsc())
+        for system_operator in system_operators
+    ]
+    source_volume_weights = dt_implicit * cell_volume * source_weights
+    last_step = implicit_steps
+
+    w = np.zeros((len(cell_volume), len(system_operators)))  # w at n level
+    rhs = np.empty(w.shape)
+    w_rec_implicit = np.zeros(
+        (implicit_steps + 1, receiver_weights.shape[0], len(system_operators))
+    )  # energy density at each receiver, at the implicit time levels
+
+    for steps in range(implicit_steps):
+        # Right hand side (cell_volume + (1 - theta) dt A) w + dt cell_volume s
+        for column, system_operator in enumerate(system_operators):
+            rhs[:, column] = cell_volume * w[:, column] + (1 - theta) * dt_implicit * (
+                system_operator @ w[:, column]
+            )
+        source_now = (
+            theta * source_strength[steps + 1] + (1 - theta) * source_strength[steps]
+        )
+        if source_now != 0:
+            rhs += (source_now * source_volume_weights)[:, np.newaxis]
+
+        for column, solver in enumerate(solvers):
+            w[:, column] = solver(rhs[:, column])
+
+        # INTERPOLATION WITH N CELL CENTRES OR 4 CELL CENTRES
+        sparse_matmul_into(receiver_weights, w, w_rec_implicit[steps + 1])
+
+        if progress(steps, implicit_steps):
+            logger.debug("Implicit time loop cancelled at step %d", steps)
+            break
+
+        if early_stop is not None:
+            source_off_step, level = early_stop
+            if steps + 1 > source_off_step and has_decayed(
+                w_rec_implicit[steps + 1], w_rec_implicit[source_off_step], level
+            ):
+                logger.debug(
+                    "Decay threshold reached at %s s", (steps + 1) * dt_implicit
+                )
+                last_step = steps + 1
+                break
+
+    return w, w_rec_implicit[: last_step + 1]
+
+
+def resample_receivers(w_rec_implicit, dt_implicit, dt, recording_steps):
+    """
+    Resamples the receivers of an implicit time loop to the output time step.
+
+    Parameters
+    ----------
+    w_rec_implicit : numpy.ndarray
+        (n_levels, n_receivers, n_bands) energy density at the receivers at the
+        time levels n dt_implicit.
+    dt_implicit : float
+        Time step of the implicit loop [s].
+    dt : float
+        Output time step [s].
+    recording_steps : int
+        The number of output time steps.
+
+    Returns
+    -------
+    numpy.ndarray
+        (n_steps, n_receivers, n_bands) energy density at the receivers at the
+        times (n + 1) dt, like the explicit scheme, up to the last time level.
+    """
+    t_implicit = np.arange(len(w_rec_implicit)) * dt_implicit
+    t_rec = (np.arange(recording_steps) + 1) * dt
+    t_rec = t_rec[t_rec <= t_implicit[-1]]
+    w_rec = np.empty((len(t_rec),) + w_rec_implicit.shape[1:])
+    for iRec in range(w_rec_implicit.shape[1]):
+        for column in range(w_rec_implicit.shape[2]):
+            w_rec[:, iRec, column] = np.interp(
+                t_rec, t_implicit, w_rec_implicit[:, iRec, column]
+            )
+    return w_rec
+
+
+# %%
+###############################################################################
+# BAND POOL FUNCTIONS
+###############################################################################
+
+# The task run by the processes of the band pool. It is set before the processes are forked, so they
+# inherit it together with the (read-only) operators it uses, which are never pickled.
+band_pool_task = None
+
+
+def band_pool_available():
+    """
+    Checks whether the frequency bands can be solved in a pool of forked processes.
+
+    The child processes of a Celery prefork pool are daemons, which cannot have
+    children, so the solver queue has to be consumed by workers with a pool
+    running the tasks in the worker process itself, e.g. several
+    ``celery worker -P solo -Q solver`` workers (see entrypoint.sh). Elsewhere
+    the bands are solved in one time loop.
+
+    Returns
+    -------
+    bool
+        True when the fork start method exists and the current process is
+        allowed to have children (it is not a daemon process).
+    """
+    return (
+        "fork" in multiprocessing.get_all_start_methods()
+        and not multiprocessing.current_process().daemon
+    )
+
+
+def run_band_pool_task(index):
+    """
+    Runs the task of the band pool in one of its processes.
+
+    Parameters
+    ----------
+    index : int
+        The index of the task to run.
+
+    Returns
+    -------
+    object
+        The result of the task.
+    """
+    return band_pool_task(index)
+
+
+def run_in_band_pool(task, n_tasks, max_workers, on_wait, wait_interval=1.0):
+    """
+    Runs task(0), ..., task(n_tasks - 1) in a pool of forked processes.
+
+    The processes share the memory of the current process copy-on-write, so the
+    task can use closures and large arrays; only its index and its result are
+    pickled.
+
+    Parameters
+    ----------
+    task : callable
+        The task, called with the index of the task.
+    n_tasks : int
+        The number of tasks.
+    max_workers : int
+        The maximum number of processes.
+    on_wait : callable
+        Called every wait_interval seconds while the tasks run; returning True
+        cancels the tasks that did not start yet.
+    wait_interval : float
+        The time between two calls of on_wait [s].
+
+    Returns
+    -------
+    list
+        The results of the tasks, in task order, or None when cancelled.
+    """
+    global band_pool_task
+    band_pool_task = task
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(max_workers, n_tasks),
+            mp_context=multiprocessing.get_context("fork"),
+        ) as pool:
+            futures = [pool.submit(run_band_pool_task, i) for i in range(n_tasks)]
+            pending = set(futures)
+            while pending:
+                _, pending = wait(pending, timeout=wait_interval)
+                if pending and on_wait():
+                    for future in pending:
+                        future.cancel()
+                    return None
+            return [future.result() for future in futures]
+    finally:
+        band_pool_task = None
+
+
+# %%
+###############################################################################
+# OPERATOR CACHE FUNCTIONS
+###############################################################################
+
+OPERATOR_CACHE_VERSION = 2  # to be increased when the content of the cache changes
+OPERATOR_CACHE_FOLDER = "de_operator_cache"
+OPERATOR_CACHE_SIZE = 16  # number of cached meshes, the least recently used are removed
+
+
+def operator_cache_path(msh_file_path, key):
+    """
+    Returns the path of the geometric operator cache of a mesh file.
+
+    The cache is content-addressed: meshes with the same content share one
+    cache file, whatever their file name (e.g. the meshes of the subtasks of a
+    multi-source run).
+
+    Parameters
+    ----------
+    msh_file_path : str
+        The mesh file.
+    key : str
+        The key of the mesh file, see mesh_file_key.
+
+    Returns
+    -------
+    str
+        The path to the cache file, in a folder next to the mesh file.
+    """
+    return os.path.join(
+        os.path.dirname(msh_file_path), OPERATOR_CACHE_FOLDER, key + ".npz"
+    )
+
+
+def mesh_file_key(msh_file_path):
+    """
+    Computes the key of the operator cache of a mesh file.
+
+    The key is the sha256 hash of the content of the mesh file together with
+    the version of the cache, so the cache is rebuilt whenever the mesh or the
+    cached operators change.
+
+    Parameters
+    ----------
+    msh_file_path : str
+        The mesh file.
+
+    Returns
+    -------
+    str
+        The hexadecimal key.
+    """
+    mesh_hash = hashlib.sha256(str(OPERATOR_CACHE_VERSION).encode())
+    with open(msh_file_path, "rb") as msh_file:
+        for chunk in iter(lambda: msh_file.read(1 << 20), b""):
+            mesh_hash.update(chunk)
+    return mesh_hash.hexdigest()
+
+
+def load_operator_cache(cache_path, key):
+    """
+    Loads the geometric operators of a mesh from its cache file.
+
+    Parameters
+    ----------
+    cache_path : str
+        The cache file.
+    key : str
+        The key of the mesh file, see mesh_file_key.
+
+    Returns
+    -------
+    dict or None
+        The cached arrays by name, or None when there is no cache file or it
+        was built for another mesh.
+    """
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with np.load(cache_path) as cache:
+            if str(cache["key"]) != key:
+                return None
+            operators = {name: cache[name] for name in cache.files}
+        # Marks the cache file as recently used, so prune_cache keeps it
+        os.utime(cache_path)
+        return operators
+    except Exception as e:
+        logger.warning("Could not load the operator cache %s: %s", cache_path, e)
+        return None
+
+
+def save_operator_cache(cache_path, key, **operators):
+    """
+    Saves the geometric operators of a mesh to its cache file.
+
+    The file is written next to its final path first and then moved in place,
+    so a concurrent run never loads a partially written cache. The cache folder
+    keeps the OPERATOR_CACHE_SIZE most recently used cache files.
+
+    Parameters
+    ----------
+    cache_path : str
+        The cache file.
+    key : str
+        The key of the mesh file, see mesh_file_key.
+    **operators : numpy.ndarray
+        The arrays to save, by name.
+    """
+    # The temporary file is unique to this process, so concurrent runs saving the
+    # same cache never write to the same file
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp_path, "wb") as cache_file:
+            np.savez(cache_file, key=key, **operators)
+        prune_cache(os.path.dirname(cache_path), OPERATOR_CACHE_SIZE - 1)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        logger.warning("Could not save the operator cache %s: %s", cache_path, e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
 # %%
 ###############################################################################
 # SURFACE MATERIALS FUNCTIONS
@@ -53,26 +1093,16 @@ def de_method(json_file_path=None):
         with open(json_file_path, "r") as json_file:
             result_container = json.load(json_file)
 
-    # Checking whether the 'should_cancel' flag has been set to True by the user
-    # Do not call this function all the time, as it is quite heavy
-    # This function should be called in the main calculation loop
+    # Checking whether the user has cancelled the simulation
+    # This only checks the cancellation flag file, so it can be called in the main calculation loop
     def check_should_cancel(json_file_path_in):
-        try:
-            if json_file_path_in is not None:
-                with open(json_file_path_in, "r") as json_file_to_check:
-                    data = json.load(json_file_to_check)
-
-            # Update the specified field value
-            if "should_cancel" in data:
-                return data["should_cancel"]
-
-        except Exception as e:
-            print("check_should_cancel returned: " + str(e))
-            print(traceback.format_exc())
+        return is_cancel_requested(json_file_path_in)
 
     if check_should_cancel(json_file_path):
         return
 
+    write_progress(json_file_path, 0, "preprocessing")
+
     # %%
     ###############################################################################
     # INPUT VARIABLES
@@ -112,6 +1142,29 @@ def de_method(json_file_path=None):
     # Air absorption coefficient
     m_atm = 0  # air absorption coefficient [1/m]
 
+    # Frequency band integration
+    # Choose "batched" to advance all the frequency bands together, one sparse matrix product per time step;
+    # Choose "per_band" to run the whole time loop once per frequency band
+    band_integration = "batched"
+    band_workers = 1  # number of processes solving groups of bands in parallel
+
+    # Time integration
+    # Choose "dufort_frankel" for the explicit scheme stepping at dt;
+    # Choose "crank_nicolson" or "backward_euler" for the implicit schemes stepping at dt_implicit, resampled to dt
+    integrator = "dufort_frankel"
+    dt_implicit = 1 / 2000  # time discretization of the implicit schemes
+
+    # Early stop of the decay
+    # Choose "yes" to stop the time loop once every receiver has decayed by decay_threshold + early_stop_margin since the source stopped
+    early_stop = "no"
+    decay_threshold = 35  # energy decay threshold [dB]
+    early_stop_margin = 10  # safety margin on the threshold [dB]
+    early_stop_interval = 100  # number of explicit time steps between two checks
+
+    # Debug output
+    # Choose "yes" to save the receiver time series, the final energy density and the timings in a _debug.npz file next to the json file
+    debug_output = "no"
+
     # %%
     ###############################################################################
     # FIXED INPUTS
@@ -157,25 +1210,52 @@ def de_method(json_file_path=None):
             c0 = 343
         else:
             c0 = simulation_settings["de_c0"]
+            band_integration = simulation_settings.get(
+                "de_band_integration", band_integration
+            )
+            band_workers = int(simulation_settings.get("de_band_workers", band_workers))
+            integrator = simulation_settings.get("de_integrator", integrator)
+            dt_implicit = simulation_settings.get("de_dt", dt_implicit)
+            early_stop = simulation_settings.get("de_early_stop", early_stop)
+            debug_output = simulation_settings.get("de_debug_output", debug_output)
+            if simulation_settings["sim_len_type"] == "edt":
+                decay_threshold = simulation_settings["edt"]
+
+        # Every source of the run is solved on the same mesh, all its receivers are sampled from the same field
+        de_results = [
+            result
+            for result in result_container["results"]
+            if result["resultType"] == "DE"
+        ]
 
         coord_source = [
-            result_container["results"][0]["sourceX"],
-            result_container["results"][0]["sourceY"],
-            result_container["results"][0]["sourceZ"],
+            de_results[0]["sourceX"],
+            de_results[0]["sourceY"],
+            de_results[0]["sourceZ"],
         ]
 
         coord_rec = [
-            result_container["results"][0]["responses"][0]["x"],
-            result_container["results"][0]["responses"][0]["y"],
-            result_container["results"][0]["responses"][0]["z"],
+            de_results[0]["responses"][0]["x"],
+            de_results[0]["responses"][0]["y"],
+            de_results[0]["responses"][0]["z"],
         ]
         geo_file_path = result_container["geo_path"]
         msh_file_path = result_container["msh_path"]
-        generate_mesh(
+        generate_cached_mesh(
             geo_file_path, msh_file_path, 1
         )  # TODO: make this dependent on the room dimensions. We don't need an lc of 1 meter at all times..
     else:
         c0 = 343  # adiabatic speed of sound [m.s^-1]
+        de_results = [
+            {
+                "sourceX": coord_source[0],
+                "sourceY": coord_source[1],
+                "sourceZ": coord_source[2],
+                "responses": [
+                    {"x": coord_rec[0], "y": coord_rec[1], "z": coord_rec[2]}
+                ],
+            }
+        ]
 
     mesh = gmsh.open(msh_file_path)  # open the file
 
@@ -222,9 +1302,6 @@ def de_method(json_file_path=None):
         surface_absorption = (
             []
         )  # initialization absorption term (alpha*surfaceofwall) for each wall of the room
-        triangle_face_absorption = (
-            []
-        )  # initialization absorption term for each triangle face at the boundary and per each wall
         absorption_coefficient = {}
 
         for group in vGroupsNames:
@@ -273,24 +1350,57 @@ def de_method(json_file_path=None):
                 )  # absorption term (alpha*surfaceofwall) for each wall of the room
                 surface_absorption = sorted(surface_absorption, key=lambda x: x[0])
 
-        for entity, Abs_term in surface_absorption:
-            triangle_faces, _ = gmsh.model.mesh.getElementsByType(
-                2, entity
-            )  # Get all the triangle faces for the current surface
-            triangle_face_absorption.extend(
-                [Abs_term] * len(triangle_faces)
-            )  # Append the Abs_term value for each triangle face
-
-        return absorption_coefficient, surface_absorption, triangle_face_absorption
+        return absorption_coefficient, surface_absorption
 
     # FUNCTION CALLED HERE
-    absorption_coefficient, surface_absorption, triangle_face_absorption = (
-        surface_materials()
-    )
+    absorption_coefficient, surface_absorption = surface_materials()
     print(
         "Correctly inputted surface materials. Starting initial geometry calculations..."
     )
 
+    # %%
+    ###############################################################################
+    # GEOMETRIC OPERATOR CACHE
+    ###############################################################################
+    # The geometric operators only depend on the mesh: they are reused from the cache when the mesh did not change
+    mesh_key = mesh_file_key(msh_file_path)
+    mesh_operators = load_operator_cache(
+        operator_cache_path(msh_file_path, mesh_key), mesh_key
+    )
+
+    if mesh_operators is not None:
+        print("Loaded the geometric operators from the cache")
+        nodecoords = mesh_operators["nodecoords"]
+        voluEl = mesh_operators["voluEl"]
+        velemNodes = mesh_operators["velemNodes"]
+        cell_center = mesh_operators["cell_center"]
+        cell_volume = mesh_operators["cell_volume"]
+        interior_tet = csr_matrix(
+            (
+                mesh_operators["interior_tet_data"],
+                mesh_operators["interior_tet_indices"],
+                mesh_operators["interior_tet_indptr"],
+            ),
+            shape=(len(voluEl), len(voluEl)),
+        )
+        interior_tet_sum = mesh_operators["interior_tet_sum"]
+        surface_areas = dict(
+            zip(
+                mesh_operators["surface_entities"].tolist(),
+                mesh_operators["surface_entity_areas"].tolist(),
+            )
+        )
+        boundary_entities = mesh_operators["boundary_entities"].tolist()
+        boundary_entity_area = csr_matrix(
+            (
+                mesh_operators["boundary_entity_area_data"],
+                mesh_operators["boundary_entity_area_indices"],
+                mesh_operators["boundary_entity_area_indptr"],
+            ),
+            shape=(len(voluEl), len(boundary_entities)),
+        )
+        total_boundArea = float(mesh_operators["total_boundArea"])
+
     # %%
     ###############################################################################
     # GMSH GET NODES, VOLUME ELEMENTS AND BOUNDARY ELEMENTS
@@ -305,7 +1415,9 @@ def de_method(json_file_path=None):
             (-1, 3)
         )  # coordinates reshaped in a matrix 3xnumber of nodes
 
-        node_indices = {tag: index for (index, tag) in enumerate(nodeTags)}
+        node_indices = node_row_lookup(
+            nodeTags
+        )  # row of nodecoords of each node tag, node_indices[tags] works on arrays of tags
 
         # Element Types
         elemTypes, elemTags, elemNodeTags = gmsh.model.mesh.getElements(dim, tag)
@@ -352,21 +1464,14 @@ def de_method(json_file_path=None):
             eelement = eelement + 1  # scalar number of the edge elements
 
         # Volume Element dictionary + nodes of each volume elements (4 nodes per element)
-        volumeEl_dict = {}  # Initialization Dictionary of volumelements + its nodes
-        for i in range(len(voluEl)):
-            # print(i)
-            volumeEl_dict[voluEl[i]] = velemNodes[
-                i
-            ]  # Dictionary of volumelements + its nodes
+        volumeEl_dict = dict(
+            zip(voluEl, velemNodes)
+        )  # Dictionary of volumelements + its nodes
 
         # Boundary Element dictionary + node per each surface elements (3 nodes per element)
-        boundaryEl_dict = (
-            {}
-        )  # Initialization Dictionary of boundary elements + its nodes
-        for i in range(len(bounEl)):
-            boundaryEl_dict[bounEl[i]] = belemNodes[
-                i
-            ]  # Dictionary of boundary elements + its nodes
+        boundaryEl_dict = dict(
+            zip(bounEl, belemNodes)
+        )  # Dictionary of boundary elements + its nodes
 
         return (
             nodecoords,
@@ -382,18 +1487,19 @@ def de_method(json_file_path=None):
         )
 
     # FUNCTION CALLED HERE
-    (
-        nodecoords,
-        node_indices,
-        bounEl,
-        bounNode,
-        voluEl,
-        voluNode,
-        belemNodes,
-        velemNodes,
-        boundaryEl_dict,
-        volumeEl_dict,
-    ) = get_nodes_elem()
+    if mesh_operators is None:
+        (
+            nodecoords,
+            node_indices,
+            bounEl,
+            bounNode,
+            voluEl,
+            voluNode,
+            belemNodes,
+            velemNodes,
+            boundaryEl_dict,
+            volumeEl_dict,
+        ) = get_nodes_elem()
 
     # %%
     ###############################################################################
@@ -401,54 +1507,16 @@ def de_method(json_file_path=None):
     ###############################################################################
 
     def velem_volume_centre():
-        # Calculation of volume cells and centre of volume
-        vcell_dict = {}  # volume of each element tetrahedron initialization
-        centre_cell = {}  # centre of the element tetrahedron initialization
-        for i in volumeEl_dict.keys():
-            coord_centre_cell = np.zeros(3)
-            centre_cell[i] = []
-            # print(i)
-            vc0 = nodecoords[
-                node_indices[volumeEl_dict[i][0]], :
-            ]  # coordinates of node 0
-            # vc0 = gmsh.model.mesh.getNode(volumeEl_dict[i][0])[0] #Coordinates of the node number zero of the volume element i
-            # print(nc0)
-            vc1 = nodecoords[node_indices[volumeEl_dict[i][1]], :]
-            vc2 = nodecoords[node_indices[volumeEl_dict[i][2]], :]
-            vc3 = nodecoords[node_indices[volumeEl_dict[i][3]], :]
-            # vc1 = gmsh.model.mesh.getNode(volumeEl_dict[i][1])[0] #Coordinates of the node number one of the volume element i
-            # print(nc1)
-            # vc2 = gmsh.model.mesh.getNode(volumeEl_dict[i][2])[0] #Coordinates of the node number two of the volume element i
-            # print(nc2)
-            # vc3 = gmsh.model.mesh.getNode(volumeEl_dict[i][3])[0] #Coordinates of the node number three of the volume element i
-            # print(nc3)
-            for j in range(3):  # three coordinates per each node
-                coord_centre_cell[j] = (
-                    vc0[j] + vc1[j] + vc2[j] + vc3[j]
-                ) / 4  # coordinates of the centre of each volume element
-                centre_cell[i].append(coord_centre_cell[j])
-            vcell_dict[i] = (
-                abs(np.dot(np.cross(vc1 - vc3, vc2 - vc3), vc0 - vc3)) / 6
-            )  # volume of each volume element
-
-        # The dictionary centre cell is modified into an array of floats (list)
-        cell_center = np.array(
-            ()
-        )  # initialization of an array of centre cell coordinates from the centre_cell dictionary
-        for key in centre_cell:
-            cell_center = np.append(cell_center, centre_cell[key])
-        cell_center = cell_center.reshape((-1, 3))
-
-        cell_volume = np.array(
-            ()
-        )  # initialization of an array of cell volumes from the vcell_dict dictionary
-        for key in vcell_dict:
-            cell_volume = np.append(cell_volume, vcell_dict[key])
+        # Calculation of volume cells and centre of volume, for all the tetrahedrons at once (in voluEl order)
+        cell_volume, cell_center = tetrahedron_volumes_centres(
+            nodecoords[node_indices[velemNodes]]
+        )
 
         return cell_center, cell_volume
 
     # FUNCTION CALLED HERE
-    cell_center, cell_volume = velem_volume_centre()
+    if mesh_operators is None:
+        cell_center, cell_volume = velem_volume_centre()
 
     # %%
     ###############################################################################
@@ -456,36 +1524,16 @@ def de_method(json_file_path=None):
     ###############################################################################
     # Calculation of boundary elements area and centre
     def belem_area_centre():
-        barea_dict = {}  # surface of each element boundary initialization
-        centre_area = {}  # centre of the element tetrahedron initialization
-        for i in boundaryEl_dict.keys():
-            coord_centre_area = np.zeros(3)
-            centre_area[i] = []
-            # print(i)
-            bc0 = nodecoords[node_indices[boundaryEl_dict[i][0]], :]
-
-            # bc0 = gmsh.model.mesh.getNode(boundaryEl_dict[i][0])[0]
-            # bnodeCoord_dict[boundaryEl_dict[i][0]] #Coordinates of the node number zero of the volume element i
-            # print(nc0)
-            bc1 = nodecoords[node_indices[boundaryEl_dict[i][1]], :]
-            # gmsh.model.mesh.getNode(boundaryEl_dict[i][1])[0] #Coordinates of the node number one of the volume element i
-            # print(nc1)
-            bc2 = nodecoords[node_indices[boundaryEl_dict[i][2]], :]
-            # gmsh.model.mesh.getNode(boundaryEl_dict[i][2])[0] #Coordinates of the node number two of the volume element i
-            # print(nc2)
-            for j in range(3):
-                coord_centre_area[j] = (
-                    bc0[j] + bc1[j] + bc2[j]
-                ) / 3  # coordinates of the centre of each volume element
-                centre_area[i].append(coord_centre_area[j])
-            barea_dict[i] = (
-                abs(sum(np.cross(bc2 - bc1, bc1 - bc0))) / 2
-            )  # volume of each volume element
-
-        return barea_dict, centre_area
+        # Area, centre and normal of all the boundary elements at once (in bounEl order)
+        barea, centre_area, normal_area = triangle_areas_centres_normals(
+            nodecoords[node_indices[belemNodes]]
+        )
+
+        return barea, centre_area, normal_area
 
     # FUNCTION CALLED HERE
-    barea_dict, centre_area = belem_area_centre()
+    if mesh_operators is None:
+        barea, centre_area, normal_area = belem_area_centre()
 
     # %%
     ###############################################################################
@@ -497,73 +1545,37 @@ def de_method(json_file_path=None):
             4, 3
         )  # 4 is the element type (tetrahedron) and three are the nodes per each face #get all the face tags of all the faces of the tetrahedrons
 
-        # Computing face x tetrahedon incidence
-        faces = []  # initialization of list of tuples of the faces nodes
-        fxt = (
-            {}
-        )  # dictionary with keys as the nodes of each face and values the volume elements of which this face is neighbour
-        for i in range(
-            0, len(facenodes), 3
-        ):  # per each element basically, goes trhough the nodes of each face 3by3
-            # print(i)
-            f = tuple(
-                sorted(facenodes[i : i + 3])
-            )  # nodes of each face put in a tuple from node i to node i plus 3
-            faces.append(f)
-            tet = voluEl[
-                i // 12
-            ]  # volume element number at which the faces are associated?
-            if (
-                not f in fxt
-            ):  # if the face f (with its node) is already in the dictionary, just append the volume element neighbour to
-                fxt[f] = [tet]
-            else:
-                fxt[f].append(tet)
-
-        # Computing neighbors by face
-        txt = (
-            {}
-        )  # dictionary with keys as the tetrahedron tag and values as the tet that are neighbours (the tet at the boundary are not counted)
-        for i in range(0, len(faces)):
-            # print(i)
-            f = faces[i]  # f is a tuple of the nodes of the face into consideration
-            tet = voluEl[i // 4]  # tetrahedron at which the face is neighbour
-            if (
-                not tet in txt
-            ):  # if the tet is not in the dictionary, add it, otherwise append the new tt
-                txt[tet] = []
-            for tt in fxt[f]:
-                if tt != tet:
-                    txt[tet].append(
-                        int(tt - (voluEl[0] - 1))
-                    )  # volumes neighbours to each volume
-        for values in txt.values():
-            while (
-                len(values) < 4
-            ):  # if there are less than 4 tetrahedron neighbours it means that the others are boundary tetrahedrons, therefore add a zero for each tetrahedron missing
-                values.append(0)
-
-        neighbourVolume = np.array(
-            ()
-        )  # initialization of an array with the neighbours tetrahedron per each tetrahedron in order from 0 to the number of tetrahedrons
-        for key in txt:
-            neighbourVolume = np.append(neighbourVolume, txt[key])
-        for item in neighbourVolume:
-            item = int(item)
-
-        neighbourVolume = neighbourVolume.reshape(
-            (-1, 4)
-        )  # reshape the array so that we have the 4 tetrahedrons neighbours of the tetrahedron in consideration
-
-        return fxt, txt, neighbourVolume
+        # Computing face x tetrahedon incidence and neighbors by face
+        (
+            face_tets,
+            interior_face_nodes,
+            boundary_tets,
+            boundary_face_nodes,
+            neighbourVolume,
+        ) = face_adjacency(facenodes)
+
+        return (
+            face_tets,
+            interior_face_nodes,
+            boundary_tets,
+            boundary_face_nodes,
+            neighbourVolume,
+        )
 
     # FUNCTION CALLED HERE
     if check_should_cancel(json_file_path):
         return
-    fxt, txt, neighbourVolume = get_neighbour_faces()
-    print(
-        "Completed initial geometry calculation. Starting internal tetrahedrons calculations..."
-    )
+    if mesh_operators is None:
+        (
+            face_tets,
+            interior_face_nodes,
+            boundary_tets,
+            boundary_face_nodes,
+            neighbourVolume,
+        ) = get_neighbour_faces()
+        print(
+            "Completed initial geometry calculation. Starting internal tetrahedrons calculations..."
+        )
 
     # %%
     ###############################################################################
@@ -572,61 +1584,26 @@ def de_method(json_file_path=None):
     # Interior Tetrahedrons calculations
 
     def interior_tetra():
-        interior_tet = np.zeros(
-            (len(voluEl), len(voluEl))
-        )  # initialization matrix of tetrahedron per tetrahedron
-
-        for i in range(len(voluEl)):  # for each tetrahedron, take its centre
-            # print(i)
-            cell_center_i = cell_center[i]
-            for j in range(len(voluEl)):  # for each tetrahedron, take its centre
-                # cell_center_j = cell_center[j]
-                # print(j)
-                if (
-                    i != j
-                ):  # if the tetrahedrons are not the same one, then check if there are shared nodes in between the two tetrahedron i and j
-                    shared_nodes = np.intersect1d(velemNodes[i], velemNodes[j])
-                    # shared_nodes = []
-                    # count = 0
-                    # for node in velemNodes[i]: #for each node in tetrahedron i
-                    #    print(node)
-                    #    if node in velemNodes[j]: #if each node of the tetrahedron i is in nodelist of tetrahedron j
-                    #        count += 1
-                    #        shared_nodes.append(node) #append the node that it is in common
-                    if (
-                        len(shared_nodes) == 3
-                    ):  # after have done this for all the nodes, if the cound is 3 then calculate the shared area between the tetrahedrons
-                        sc0 = nodecoords[node_indices[shared_nodes[0]], :]
-                        # sc0 = gmsh.model.mesh.getNode(shared_nodes[0])[0] #coordinates of node 0
-                        sc1 = nodecoords[node_indices[shared_nodes[1]], :]
-                        # sc1 = gmsh.model.mesh.getNode(shared_nodes[1])[0] #coordinates of node 1
-                        sc2 = nodecoords[node_indices[shared_nodes[2]], :]
-                        # sc2 = gmsh.model.mesh.getNode(shared_nodes[2])[0] #coordinates of node 2
-                        shared_area = (
-                            np.linalg.norm(np.cross(sc2 - sc0, sc1 - sc0)) / 2
-                        )  # compute shared area
-                        shared_distance = np.linalg.norm(cell_center_i - cell_center[j])
-                        # sqrt((abs(cell_center_i[0] - cell_center_j[0]))**2 + (abs(cell_center_i[1] - cell_center_j[1]))**2 + (abs(cell_center_i[2] - cell_center_j[2]))**2) #distance between volume elements
-                        interior_tet[i, j] = (
-                            shared_area / shared_distance
-                        )  # division between shared area and shared distance
-                    else:
-                        shared_area = 0
-                        interior_tet[i, j] = shared_area
+        # Only the faces shared by two tetrahedrons couple the cells, so the operator
+        # is sparse and can be built directly from the face x tetrahedron incidence
+        face_coords = nodecoords[
+            node_indices[interior_face_nodes]
+        ]  # coordinates of the nodes of each interior face
 
-        interior_tet_sum = np.sum(
-            interior_tet, axis=1
-        )  # sum of interior_tet per columns (so per i element)
+        interior_tet, interior_tet_sum = conductance_matrix(
+            face_tets, face_coords, cell_center
+        )  # sparse matrix of shared area / shared distance between neighbouring tetrahedrons
 
         return interior_tet, interior_tet_sum
 
     # FUNCTION CALLED HERE
     if check_should_cancel(json_file_path):
         return
-    interior_tet, interior_tet_sum = interior_tetra()
-    print(
-        "Completed internal tetrahedrons calculation. Starting boundary tetrahedrons calculations..."
-    )
+    if mesh_operators is None:
+        interior_tet, interior_tet_sum = interior_tetra()
+        print(
+            "Completed internal tetrahedrons calculation. Starting boundary tetrahedrons calculations..."
+        )
 
     # %%
     ###############################################################################
@@ -639,125 +1616,72 @@ def de_method(json_file_path=None):
             face_nodes_per_entity = gmsh.model.mesh.getElementFaceNodes(
                 2, 3, tag=entity
             )
-            surf_area_tot = 0
-            for i in range(
-                0, len(face_nodes_per_entity), 3
-            ):  # per each element basically, goes trhough the nodes of each face 3by3
-                # print(i)
-                f = tuple(sorted(face_nodes_per_entity[i : i + 3]))
-                fc0 = nodecoords[node_indices[f[0]], :]
-                # fc0 = gmsh.model.mesh.getNode(f[0])[0] #coordinates of vertix 0
-                fc1 = nodecoords[node_indices[f[1]], :]
-                fc2 = nodecoords[node_indices[f[2]], :]
-                # fc1 = gmsh.model.mesh.getNode(f[1])[0] #coordinates of vertix 1
-                # fc2 = gmsh.model.mesh.getNode(f[2])[0] #coordinates of vertix 2
-                face_area = 0.5 * np.linalg.norm(
-                    np.cross(fc1 - fc0, fc2 - fc0)
-                )  # Compute the area using half of the cross product's magnitude
-                surf_area_tot += face_area
-                surface_areas[entity] = surf_area_tot
+            if len(face_nodes_per_entity) == 0:
+                continue
+            face_area, _, _ = triangle_areas_centres_normals(
+                nodecoords[node_indices[face_nodes_per_entity]]
+            )  # area of each triangle of the surface
+            surface_areas[entity] = np.sum(face_area)
         return surface_areas
 
     # FUNCTION CALLED HERE
-    surface_areas = surface_area()
+    if mesh_operators is None:
+        surface_areas = surface_area()
 
     # %%
     ###############################################################################
     # CALCULATION OF BOUNDARY ELEMENTS
     ###############################################################################
     # FACE AREA & boundary_areas
+    def boundary_faces():
+        # Surface entity of each boundary triangle: the triangles of bounNode are ordered by entity
+        boundary_entities = [entity for entity, _ in surface_absorption]
+        triangles_per_entity = [
+            len(gmsh.model.mesh.getElementsByType(2, entity)[0])
+            for entity in boundary_entities
+        ]
+        boundary_entity_area, total_boundArea = boundary_entity_area_matrix(
+            velemNodes, node_indices, nodecoords, bounNode, triangles_per_entity
+        )
+        return boundary_entities, boundary_entity_area, total_boundArea
+
     def boundary_triang():
-        total_boundArea = 0  # initialization of total surface area of the room
-        boundary_areas = (
-            []
-        )  # Initialize a list to store boundary_areas values for each tetrahedron
-        import itertools
-
-        face_areas = np.zeros(
-            len(velemNodes)
-        )  # Per each tetrahedron, if there is a face that is on the boundary, include the area, otehrwise zero
-        for idx, element in enumerate(
-            velemNodes
-        ):  # for index and element in the number of tetrahedrons
-            # if idx == 491:
-            tetrahedron_boundary_areas = (
-                0  # initialization tetrahedron face on boundary*its absorption term
-            )
-            total_tetrahedron_boundary_areas = np.zeros(
-                nBands
-            )  # initialization total tetrahedron face on boundary*its absorption term if there are more than one face in the tetrahedron that is on the boundary
-            # print(idx)
-            node_combinations = [
-                list(nodes) for nodes in itertools.combinations(element, 3)
-            ]  # all possible combinations of the nodes of the tetrahedrons (it checks also for the order of the nodes in the same combination)
-            # Check if the nodes are in any order in bounNode
-            is_boundary = False  # variable to say that at the beginning the face in not on a boundary
-            for nodes in node_combinations:  # for each node in each combination
-                for surface_idx, surface in enumerate(
-                    bounNode
-                ):  # for index and surface in the number of nodes
-                    surface_set = sorted(
-                        set(surface)
-                    )  # creates a set of the surface nodes
-                    surface_set_idx = surface_idx
-                    nodes_set = sorted(
-                        set(nodes)
-                    )  # create a set of the node combination of the tetrahedron into consideration
-                    # surface_list = list(surface)
-                    if (
-                        nodes_set == surface_set
-                    ):  # if these are equal, it means that the tetrahedron into consideration has a surface in the boundary and therefore is_boundary gets the value of True.
-                        # print(surface_set)
-                        # print(surface_list)
-                        is_boundary = True
-                        if (
-                            is_boundary
-                        ):  # if the surface is at the boundary, then take the coordinates of each vertix
-                            # Convert the vertices to NumPy arrays for vector operations
-                            bc0 = nodecoords[node_indices[nodes[0]], :]
-                            bc1 = nodecoords[node_indices[nodes[1]], :]
-                            bc2 = nodecoords[node_indices[nodes[2]], :]
-
-                            # bc0 = gmsh.model.mesh.getNode(nodes[0])[0] #coordinates of vertix 0
-                            # bc1 = gmsh.model.mesh.getNode(nodes[1])[0] #coordinates of vertix 1
-                            # bc2 = gmsh.model.mesh.getNode(nodes[2])[0] #coordinates of vertix 2
-
-                            face_area = 0.5 * np.linalg.norm(
-                                np.cross(bc1 - bc0, bc2 - bc0)
-                            )  # Compute the area using half of the cross product's magnitude
-                            # print(face_area)
-
-                            face_areas[idx] = (
-                                face_area  # area of the surface that is on boundary per each tetrahedron
-                            )
-                            total_boundArea += (
-                                face_area  # add to the total boundary area
-                            )
-
-                            if face_area > 0:
-                                # Use the index to access the corresponding absorption area
-                                face_absorption_product = (
-                                    face_area
-                                    * triangle_face_absorption[surface_set_idx]
-                                )  # calculate the product between the area*the correspondent absorption term
-                                # print(face_absorption_product)
-
-                                tetrahedron_boundary_areas += face_absorption_product  # add the calculation to the tetrahedron correspondent
-
-                                total_tetrahedron_boundary_areas = tetrahedron_boundary_areas  # if there are multiple surfaces on the boundary per each tetrahedron, then add also the second and the third one
-
-            boundary_areas.append(
-                np.array(total_tetrahedron_boundary_areas)
-            )  # Append the total boundary_areas for the tetrahedron to the list
-        # print(total_tetrahedron_boundary_areas)
-        boundary_areas = np.array(boundary_areas)
-        boundary_areas = boundary_areas.T
-        return boundary_areas, total_boundArea
+        # Boundary area of each tetrahedron per surface entity times the absorption term of the entity
+        absorption_by_entity = dict(surface_absorption)
+        entity_absorption = np.array(
+            [absorption_by_entity[entity] for entity in boundary_entities], dtype=float
+        )  # absorption term per band of each surface entity
+        boundary_areas = (boundary_entity_area @ entity_absorption).T
+        return boundary_areas
 
     # FUNCTION CALLED HERE
     if check_should_cancel(json_file_path):
         return
-    boundary_areas, total_boundArea = boundary_triang()
+    if mesh_operators is None:
+        boundary_entities, boundary_entity_area, total_boundArea = boundary_faces()
+
+        save_operator_cache(
+            operator_cache_path(msh_file_path, mesh_key),
+            mesh_key,
+            nodecoords=nodecoords,
+            voluEl=voluEl,
+            velemNodes=velemNodes,
+            cell_center=cell_center,
+            cell_volume=cell_volume,
+            interior_tet_data=interior_tet.data,
+            interior_tet_indices=interior_tet.indices,
+            interior_tet_indptr=interior_tet.indptr,
+            interior_tet_sum=interior_tet_sum,
+            surface_entities=np.array(list(surface_areas.keys())),
+            surface_entity_areas=np.array(list(surface_areas.values())),
+            boundary_entities=np.array(boundary_entities),
+            boundary_entity_area_data=boundary_entity_area.data,
+            boundary_entity_area_indices=boundary_entity_area.indices,
+            boundary_entity_area_indptr=boundary_entity_area.indptr,
+            total_boundArea=total_boundArea,
+        )
+
+    boundary_areas = boundary_triang()
     print(
         "Completed boundary tetrahedrons calculation. Starting main diffusion equation calculations over time and frequency..."
     )
@@ -853,12 +1777,19 @@ def de_method(json_file_path=None):
     # FUNCTION CALLED HERE
     Dx, Dy, Dz = diff_coeff()
 
+    # %%
+    ###############################################################################
+    # SPATIAL INDEX OF THE CELL CENTRES
+    ###############################################################################
+    # Used to locate the sources and receivers in the mesh
+    cell_tree = cKDTree(cell_center)
+
     # %%
     ###############################################################################
     # CALCULATION OF SOURCE & RECEIVER DISTANCE
     ###############################################################################
 
-    def dist_source_receiver():
+    def dist_source_receiver(coord_source, coord_rec):
         # distance between source and receiver
         dist_sr = math.sqrt(
             (abs(coord_rec[0] - coord_source[0])) ** 2
@@ -867,14 +1798,11 @@ def de_method(json_file_path=None):
         )  # distance between source and receiver
         return dist_sr
 
-    # FUNCTION CALLED HERE
-    dist_sr = dist_source_receiver()
-
     # %%
     ###############################################################################
     # SOURCE INTERPOLATION
     ###############################################################################
-    def source_interp():
+    def source_interp(coord_source):
         # ORIGINAL
         # Position of source is the centre of a cell so the minimum distance with the centre of a cell has been calculated to understand which cell is the closest
         # dist_source_cc_list = []
@@ -948,109 +1876,27 @@ def de_method(json_file_path=None):
         # Vs = cell_volume[source_idx] #volume of the source = to volume of cells where the volume is
 
         # SOURCE INTERPOLATION CALCULATED WITHIN 4 CENTRE CELL SELECTED (TETRAHEDRON)
-        # Position of source is the centre of a cell so the minimum distance with the centre of a cell has been calculated to understand which cell is the closest
-        dist_source_cc_list = (
-            []
-        )  # initialise the list for all the distances between each cell centre and the source
-        for i in range(len(cell_center)):  # for each tetra
-            dist_source_cc = math.sqrt(
-                np.sum((cell_center[i] - coord_source) ** 2)
-            )  # calculate the distance between its centre cell and the source coordinate
-            dist_source_cc_list.append(dist_source_cc)  # append the distance in a list
-        # source_idx = np.argmin(dist_source_cc_list) #take the minimum distance index; this is where the source will be positioned
-
-        dist_source_cc_list_sorted = sorted(
-            dist_source_cc_list
-        )  # sorted from the minimum to the maximum distance
-        selected_source_cc_list = dist_source_cc_list_sorted[
-            :4
-        ]  # take only the first four element of the sorted list (take the first 4 cell centres closest to the source)
-
-        dist_source_cc_list_sorted_indices = np.argsort(dist_source_cc_list)[
-            :4
-        ]  # takes the indeces of the minimum distances
-        # selected_source_cc_list_indices = dist_source_cc_list_sorted_indices[:4] #does exactly the same as the previous line
+        # The 4 cell centres closest to the source, weighted by their inverse distance
+        cells, weights = nearest_cell_weights(cell_tree, coord_source)
 
         # cl_tet_s stands for cl=closest, tet=tetrahedron, s=to the source
-        cl_tet_s = {}  # initialise dictionary for closest tetrahedrons to the source
-        for i in range(
-            len(dist_source_cc_list_sorted_indices)
-        ):  # for each of the 4 tetra closest to the source
-            idx = selected_source_cc_list[i]  # take its index
-            cl_tet_s[dist_source_cc_list_sorted_indices[i]] = (
-                idx  # put it in a dictionary
-            )
-
-        total_weights_s = (
-            {}
-        )  # initialise weights for each tetrahedron around the actual source position
-        sum_weights_s = 0
-        # Vs = 0
-        for (
-            i,
-            dist,
-        ) in (
-            cl_tet_s.items()
-        ):  # for each key and value in the dictionary (so for each closest tetrahedron to the source)
-            weights = np.divide(
-                1.0, dist
-            )  # calculate the inverse distance weights, so closer to the point means higher weight
-            # print(weights)
-            sum_weights_s += weights
-            # weights /= np.sum(weights)  # Normalize weights to sum to 1
-            total_weights_s[i] = (
-                weights  # put the wweigths (values) to the correspondent closest tetrahedron (keys)
-            )
-            # Vs += cell_volume[i] #volume of the source calculated summing the volumes of all the tetrahedrons involved
-
-        # total_weights_s_values = total_weights_s.values()
-        for i, weight in total_weights_s.items():
-            total_weights_s[i] = weight / sum_weights_s if sum_weights_s != 0 else 0
-
+        total_weights_s = dict(zip(cells[0].tolist(), weights[0]))
         cl_tet_s_keys = (
-            cl_tet_s.keys()
-        )  # take only the keys of the cl_tet_s dictionary (so basically the indexes of the tetrahedrons)
+            total_weights_s.keys()
+        )  # take only the keys of the total_weights_s dictionary (so basically the indexes of the tetrahedrons)
 
         return cl_tet_s_keys, total_weights_s
 
-    # FUNCTION CALLED HERE
-    cl_tet_s_keys, total_weights_s = source_interp()
-
     # %%
     ###############################################################################
     # CALCULATION OF SOURCE VOLUME
     ###############################################################################
 
-    def source_volume():
+    def source_volume(coord_source):
         # To make sure that the source is in the correct tetrahedron position
-        node_ids = velemNodes.T
-        ori = nodecoords[node_ids[0, :] - 1, :]
-        # ori = nodecoords[node_indices[node_ids[:,0],:]]
-        v_tet_s1 = nodecoords[node_ids[1, :] - 1, :] - ori
-        v_tet_s2 = nodecoords[node_ids[2, :] - 1, :] - ori
-        v_tet_s3 = nodecoords[node_ids[3, :] - 1, :] - ori
-        n_tet = len(node_ids.T)
-        v1s = v_tet_s1.T.reshape((3, 1, n_tet))
-        v2s = v_tet_s2.T.reshape((3, 1, n_tet))
-        v3s = v_tet_s3.T.reshape((3, 1, n_tet))
-        mat = np.concatenate((v1s, v2s, v3s), axis=1)
-        inv_mat = np.linalg.inv(mat.T).T
-        # if coord_source.size==3:  # to make rec has a dimension of (N_rec,3)
-        #    rec=rec.reshape((1,3))
-        coord_source_array = np.array(coord_source)
-        if coord_source_array.size == 3:  # to make rec has a dimension of (N_rec,3)
-            coord_source_array = coord_source_array.reshape((1, 3))
-        N_sou = coord_source_array.shape[0]
-        orir = np.repeat(ori[:, :, np.newaxis], N_sou, axis=2)
-        newp = np.einsum("imk,kmj->kij", inv_mat, coord_source_array.T - orir)
-        val = (
-            np.all(newp >= 0, axis=1)
-            & np.all(newp <= 1, axis=1)
-            & (np.sum(newp, axis=1) <= 1)
-        )
-        id_tet, id_p = np.nonzero(val)
-        res = -np.ones(N_sou, dtype=id_tet.dtype)  # Sentinel value
-        res[id_p] = id_tet
+        res = containing_tetrahedra(
+            cell_tree, coord_source, nodecoords, velemNodes - 1
+        )  # -1 when the source is outside the mesh
 
         ###############################################################################
         # #VOLUME CALCULATED WITHIN 4 CENTRE CELL SELECTED (TETRAHEDRON)
@@ -1093,15 +1939,12 @@ def de_method(json_file_path=None):
 
         return Vs
 
-    # FUNCTION CALLED HERE
-    Vs = source_volume()
-
     # %%
     ###############################################################################
     # INITIAL CONDITIONS
     ###############################################################################
     # Initial condition - Source Info (interrupted method)
-    def initial_cond():
+    def initial_cond(Vs):
         w1 = Ws / Vs  # w1 = round(Ws/Vs,4) #power density of the source [Watts/(m^3))]
         sourceon_steps = ceil(
             sourceon_time / dt
@@ -1114,22 +1957,20 @@ def de_method(json_file_path=None):
         )  # This would be equal to s1 if and only if recoding_steps = sourceon_steps
         return source1, sourceon_steps
 
-    # FUNCTION CALLED HERE
-    source1, sourceon_steps = initial_cond()
-
     # %%
     ###############################################################################
     # DEFINITION OF SOURCE MATRIX
     ###############################################################################
-    def source_matrix():
+    def source_matrix(cl_tet_s_keys, total_weights_s):
         # ORIGINAL SOURCE MATRIX
         # s = np.zeros((len(voluEl))) #matrix of zeros for source
         # s[source_idx] = source1[0]
 
         # INTERPOLATION WITH CELL CENTRES - SOURCE MATRIX
+        # Weight of the source in each tetrahedron; it is scaled by source1 at each time step
         s = np.zeros((len(voluEl)))  # matrix of zeros for source
         for tet_s in cl_tet_s_keys:
-            s[tet_s] = source1[0] * total_weights_s[tet_s]
+            s[tet_s] = total_weights_s[tet_s]
 
         # INTERPOLATION WITH VERTICES - SOURCE MATRIX
         # s = np.zeros((len(voluEl))) #matrix of zeros for source
@@ -1138,14 +1979,11 @@ def de_method(json_file_path=None):
 
         return s
 
-    # FUNCTION CALLED HERE
-    s = source_matrix()
-
     # %%
     ###############################################################################
     # RECEIVER INTERPOLATION
     ###############################################################################
-    def receiver_interp():
+    def receiver_interp(coord_rec):
         # ORIGINAL
         # dist_rec_cc_list = []
         # for i in range(len(cell_center)):
@@ -1183,71 +2021,26 @@ def de_method(json_file_path=None):
         # cl_tet_r_keys = cl_tet_r.keys() #take only the keys of the cl_tet_s dictionary (so basically the indexes of the tetrahedrons)
 
         # RECEIVER INTERPOLATION CALCULATED WITHIN 4 CENTRE CELL SELECTED (TETRAHEDRON)
-        # Position of receiver is the centre of a cell so the minimum distance with the centre of a cell has been calculated to understand which cell is the closest
-        dist_rec_cc_list = (
-            []
-        )  # initialise the list for all the distances between each cell centre and the source
-        for i in range(len(cell_center)):  # for each tetra
-            dist_rec_cc = math.sqrt(
-                np.sum((cell_center[i] - coord_rec) ** 2)
-            )  # calculate the distance between its centre cell and the source coordinate
-            dist_rec_cc_list.append(dist_rec_cc)  # append the distance in a list
-        # rec_idx = np.argmin(dist_rec_cc_list) #take the minimum distance index; this is where the source will be positioned
-
-        dist_rec_cc_list_sorted = sorted(
-            dist_rec_cc_list
-        )  # sorted from the minimum to the maximum distance
-        selected_rec_cc_list = dist_rec_cc_list_sorted[
-            :4
-        ]  # take only the first four element of the sorted list (take the first 4 cell centres closest to the source)
-
-        dist_rec_cc_list_sorted_indices = np.argsort(dist_rec_cc_list)[
-            :4
-        ]  # takes the indeces of the minimum distances
-        # selected_rec_cc_list_indices = dist_rec_cc_list_sorted_indices[:4] #does exactly the same as the previous line
-
-        # cl_tet_s stands for cl=closest, tet=tetrahedron, s=to the source
-        cl_tet_r = {}  # initialise dictionary for closest tetrahedrons to the source
-        for i in range(
-            len(dist_rec_cc_list_sorted_indices)
-        ):  # for each of the 4 tetra closest to the source
-            idx = selected_rec_cc_list[i]  # take its index
-            cl_tet_r[dist_rec_cc_list_sorted_indices[i]] = idx  # put it in a dictionary
-
-        total_weights_r = (
-            {}
-        )  # initialise weights for each tetrahedron around the actual source position
-        sum_weights_r = 0
-        # Vs = 0
-        for (
-            i,
-            dist,
-        ) in (
-            cl_tet_r.items()
-        ):  # for each key and value in the dictionary (so for each closest tetrahedron to the source)
-            weights = np.divide(
-                1.0, dist
-            )  # calculate the inverse distance weights, so closer to the point means higher weight
-            # print(weights)
-            sum_weights_r += weights
-            # weights /= np.sum(weights)  # Normalize weights to sum to 1
-            total_weights_r[i] = (
-                weights  # put the wweigths (values) to the correspondent closest tetrahedron (keys)
-            )
-            # Vs += cell_volume[i] #volume of the source calculated summing the volumes of all the tetrahedrons involved
-
-        # total_weights_s_values = total_weights_s.values()
-        for i, weight in total_weights_r.items():
-            total_weights_r[i] = weight / sum_weights_r if sum_weights_r != 0 else 0
+        # The 4 cell centres closest to the receiver, weighted by their inverse distance
+        cells, weights = nearest_cell_weights(cell_tree, coord_rec)
 
+        # cl_tet_r stands for cl=closest, tet=tetrahedron, r=to the receiver
+        total_weights_r = dict(zip(cells[0].tolist(), weights[0]))
         cl_tet_r_keys = (
-            cl_tet_r.keys()
-        )  # take only the keys of the cl_tet_s dictionary (so basically the indexes of the tetrahedrons)
+            total_weights_r.keys()
+        )  # take only the keys of the total_weights_r dictionary (so basically the indexes of the tetrahedrons)
 
         return cl_tet_r_keys, total_weights_r
 
-    # FUNCTION CALLED HERE
-    cl_tet_r_keys, total_weights_r = receiver_interp()
+    # Interpolation weights of all the receivers of a source as a (number of receivers, number of tetrahedrons) matrix
+    def receiver_matrix(coord_recs):
+        cells, weights = nearest_cell_weights(cell_tree, coord_recs)
+        rows = np.repeat(np.arange(len(cells)), cells.shape[1])
+
+        return csr_matrix(
+            (weights.ravel(), (rows, cells.ravel())),
+            shape=(len(coord_recs), len(voluEl)),
+        )
 
     # %%
     ###############################################################################
@@ -1308,11 +2101,7 @@ def de_method(json_file_path=None):
                 + (abs(line_rec[2] - coord_source[2])) ** 2
             )  # distance between source and line_receiver
             dist_x = np.append(dist_x, dist_line_rec_x)  # Append to the NumPy array
-            dist_line_rec_x_cc_list = []
-            for i in range(len(cell_center)):
-                dist_line_rec_x_cc = math.sqrt(np.sum((cell_center[i] - line_rec) ** 2))
-                dist_line_rec_x_cc_list.append(dist_line_rec_x_cc)
-            line_rec_x_idx = np.argmin(dist_line_rec_x_cc_list)
+            line_rec_x_idx = cell_tree.query(line_rec)[1]
             line_rec_x_idx_list.append(line_rec_x_idx)
 
             # RECEIVERS IN A Y LINE
@@ -1327,11 +2116,7 @@ def de_method(json_file_path=None):
                 + (abs(line_rec[2] - coord_source[2])) ** 2
             )  # distance between source and line_receiver
             dist_y = np.append(dist_y, dist_line_rec_y)  # Append to the NumPy array
-            dist_line_rec_y_cc_list = []
-            for i in range(len(cell_center)):
-                dist_line_rec_y_cc = math.sqrt(np.sum((cell_center[i] - line_rec) ** 2))
-                dist_line_rec_y_cc_list.append(dist_line_rec_y_cc)
-            line_rec_y_idx = np.argmin(dist_line_rec_y_cc_list)
+            line_rec_y_idx = cell_tree.query(line_rec)[1]
             line_rec_y_idx_list.append(line_rec_y_idx)
 
             # def interpolate_receiver_position(interior_tet_tet, cell_centers, receiver_position):
@@ -1377,155 +2162,283 @@ def de_method(json_file_path=None):
     # MAIN CALCULATION - COMPUTING ENERGY DENSITY
     ###############################################################################
 
-    def computing_energy_density():
-        w_new_band = []
-        w_rec_band = []
-        w_rec_off_band = []
-        w_rec_off_deriv_band = []
-        p_rec_off_deriv_band = []
-
-        prevPercentDone = 0
+    # Decay of the receivers, as a ratio of energy densities, at which the time loop stops early
+    early_stop_level = 10 ** (-(decay_threshold + early_stop_margin) / 10)
+
+    # Explicit DuFort-Frankel time loop at the output time step dt
+    def explicit_time_loop(bands, s, source1, receiver_weights, progress):
+        idx_w_rec = np.argmin(
+            np.abs(t - sourceon_time)
+        )  # step at which the source stops, from where the decay is monitored for the early stop
+        # Source strength used at each time step
+        if tcalc == "stationarysource":
+            source_strength = np.full(recording_steps, source1[0])
+        else:
+            # The source of step n is the one set at the end of step n-1
+            source_strength = np.concatenate(([source1[0]], source1[:-1]))
+
+        # Each column of the state matrices is one frequency band; only beta_zero differs between bands
+        beta = np.column_stack(
+            [beta_zero_freq[iBand] for iBand in bands]
+        )  # (number of tetrahedrons, number of bands in the group)
+
+        return dufort_frankel_time_loop(
+            interior_tet,
+            beta,
+            cell_volume,
+            Dx,
+            dt,
+            c0 * m_atm,
+            s,
+            source_strength,
+            receiver_weights,
+            progress,
+            early_stop=(
+                (idx_w_rec, early_stop_interval, early_stop_level)
+                if early_stop == "yes" and tcalc == "decay"
+                else None
+            ),
+        )
 
-        for iBand in range(nBands):
+    # Implicit theta-scheme time loop at the time step dt_implicit, resampled to the output time step dt
+    def implicit_time_loop(bands, s, source1, receiver_weights, progress):
+        theta = 0.5 if integrator == "crank_nicolson" else 1.0
+        implicit_steps = ceil(recording_time / dt_implicit)
+
+        # One operator per band of cell_volume * dw/dt = A w + cell_volume * s
+        system_operators = [
+            diffusion_operator(
+                interior_tet,
+                interior_tet_sum,
+                boundary_areas[iBand],
+                cell_volume,
+                Dx,
+                c0 * m_atm,
+            )
+            for iBand in bands
+        ]
 
-            if check_should_cancel(json_file_path):
-                break
+        # Source strength at each implicit time level
+        t_implicit = np.arange(implicit_steps + 1) * dt_implicit
+        if tcalc == "stationarysource":
+            source_strength = np.full(len(t_implicit), source1[0])
+        else:
+            source_strength = np.where(t_implicit < sourceon_time, source1[0], 0)
+
+        idx_w_rec_implicit = np.argmin(np.abs(t_implicit - sourceon_time))
+
+        w, w_rec_implicit = theta_scheme_time_loop(
+            system_operators,
+            cell_volume,
+            theta,
+            dt_implicit,
+            s,
+            source_strength,
+            receiver_weights,
+            progress,
+            early_stop=(
+                (idx_w_rec_implicit, early_stop_level)
+                if early_stop == "yes" and tcalc == "decay"
+                else None
+            ),
+        )
 
-            w_new = np.zeros(len(voluEl))  # unknown w at new time level (n+1)
-            # w_old = np.zeros(len(voluEl))
-            w = w_new  # w at n level
-            w_old = w  # w_old at n-1 level
-            # w[source_idx] = w1 #w (m time step) at source position -> impulse source
+        # Resample the receivers to the output time step; sample n of the explicit scheme is at time (n + 1) dt
+        return w, resample_receivers(w_rec_implicit, dt_implicit, dt, recording_steps)
+
+    def computing_energy_density(s, source1, receiver_weights, iSource):
+        w_new_band = [None] * nBands
+        w_rec_band = [None] * nBands
+        w_rec_off_band = [None] * nBands
+        w_rec_off_deriv_band = [None] * nBands
+        p_rec_off_deriv_band = [None] * nBands
+        rec_steps_band = [None] * nBands  # time steps computed for each band
+
+        idx_w_rec = np.argmin(
+            np.abs(t - sourceon_time)
+        )  # index at which the t array is equal to the sourceon_time; I want the RT to calculate from when the source stops.
+        t_off = t[idx_w_rec:]
+
+        use_band_pool = band_workers > 1 and nBands > 1 and band_pool_available()
+        if band_workers > 1 and nBands > 1 and not use_band_pool:
+            logger.info(
+                "The band pool cannot be started in this process, the bands are "
+                "solved in one time loop"
+            )
+        if band_integration == "per_band":
+            band_groups = [[iBand] for iBand in range(nBands)]  # one time loop per band
+        elif use_band_pool:
+            band_groups = [
+                group.tolist()
+                for group in np.array_split(
+                    np.arange(nBands), min(band_workers, nBands)
+                )
+            ]  # one time loop per process, each for a part of the bands
+        else:
+            band_groups = [list(range(nBands))]  # one time loop for all the bands
 
-            w_rec = np.zeros(recording_steps)  # energy density at the receiver
+        def solve_band_group(bands, progress):
+            if integrator == "dufort_frankel":
+                w_new, w_rec = explicit_time_loop(
+                    bands, s, source1, receiver_weights, progress
+                )
+            else:
+                w_new, w_rec = implicit_time_loop(
+                    bands, s, source1, receiver_weights, progress
+                )
+            return bands, w_new, w_rec
 
-            # Computing w;
-            for steps in range(0, recording_steps):
-                # Compute w at inner mesh points
-                # time_steps = steps*dt #total time for the calculation
+        prevPercentDone = 0
+        group_results = []
 
-                # Computing w_new (w at n+1 time step)
+        if use_band_pool and len(band_groups) > 1:
+            print(
+                f"Solving {len(band_groups)} groups of bands in {min(band_workers, len(band_groups))} processes"
+            )
+            pool_start = time.time()
 
-                w_new = (
-                    np.divide(
-                        (np.multiply(w_old, (1 - beta_zero_freq[iBand]))),
-                        (1 + beta_zero_freq[iBand]),
-                    )
-                    - np.divide((2 * dt * c0 * m_atm * w), (1 + beta_zero_freq[iBand]))
-                    + np.divide(
-                        np.divide((2 * dt * Dx * (interior_tet @ w)), cell_volume),
-                        (1 + beta_zero_freq[iBand]),
-                    )
-                    + np.divide((2 * dt * s), (1 + beta_zero_freq[iBand]))
-                )  # The absorption term is part of beta_zero
-
-                # Update w before next step
-                w_old = w  # The w at n step becomes the w at n-1 step
-                w = w_new  # The w at n+1 step becomes the w at n step
-
-                # w_new_total = 0
-                # w_rec is the energy density at the specific receiver
-                # ORIGINAL
-                # w_rec[steps] = w_new[rec_idx]
-
-                # INTERPOLATION WITH N CELL CENTRES OR 4 CELL CENTRES
-                for tet_r in cl_tet_r_keys:
-                    w_rec[steps] += w_new[tet_r] * total_weights_r[tet_r]
-
-                    # if steps == sourceon_steps:
-                #     #print("Steps for source:",steps)
-                #     w_t0 = w_new
-
-                # if steps == round(1*mean_free_time_step + sourceon_steps + (dist_sr/c0)):
-                #     w_1l = w_new
-
-                # if steps == round(2*mean_free_time_step + sourceon_steps + (dist_sr/c0)):
-                #     w_2l = w_new
-
-                # if steps == round(3*mean_free_time_step + sourceon_steps + (dist_sr/c0)):
-                #     w_3l = w_new
-
-                # if steps == round(5*mean_free_time_step + sourceon_steps + (dist_sr/c0)):
-                #     w_5l = w_new
-
-                if tcalc == "decay":
-                    # INTERPOLATION WITH N CELL CENTRES OR 4 CELL CENTRES
-                    for tet_s in cl_tet_s_keys:
-                        s[tet_s] = source1[steps] * total_weights_s[tet_s]
-                    # ORIGINAL
-                    # s[source_idx] = source1[steps]
-                    # INTERPOLATION WITH VERTICES
-                    # for i in total_weights_s:
-                    #    s[source_idx] = source1[steps] *total_weights_s[i]
-
-                if tcalc == "stationarysource":
-                    # ORIGINAL
-                    # s[source_idx] = source1[0]
-
-                    # INTERPOLATION SOURCE
-                    for tet_s in cl_tet_s_keys:
-                        s[tet_s] = source1[0] * total_weights_s[tet_s]
-
-                idx_w_rec = np.argmin(
-                    np.abs(t - sourceon_time)
-                )  # index at which the t array is equal to the sourceon_time; I want the RT to calculate from when the source stops.
-                w_rec_off = w_rec[idx_w_rec:]
-                p_rec_off = (w_rec[idx_w_rec:]) * rho * c0**2
-                t_off = t[idx_w_rec:]
-
-                # Envelope of Impulse response from the energy density
-                w_rec_off_deriv = w_rec_off  # initialising an array of derivative equal to the w_rec_off -> this will be the impulse response after modifying it
-                w_rec_off_deriv = np.delete(
-                    w_rec_off_deriv, 0
-                )  # delete the first element of the array -> this means shifting the array one step before and therefore do a derivation
-                w_rec_off_deriv = np.append(
-                    w_rec_off_deriv, 0
-                )  # add a zero in the last element of the array -> for derivation and to have the same length as previously
-                # impulse = ((w_rec_off - w_rec_off_deriv))/dt#/(rho*c0**2) #This is the difference between the the energy density and the impulse response
-
-                # Envelope of Impulse response from the pressure
-                p_rec_off_deriv = p_rec_off  # initialising an array of derivative equal to the w_rec_off -> this will be the impulse response after modifying it
-                p_rec_off_deriv = np.delete(
-                    p_rec_off_deriv, 0
-                )  # delete the first element of the array -> this means shifting the array one step before and therefore do a derivation
-                p_rec_off_deriv = np.append(
-                    p_rec_off_deriv, 0
-                )  # add a zero in the last element of the array -> for derivation and to have the same length as previously
-
-                # print(time_steps)
+            # Time steps done by each group of bands, written by the processes and read here for the progress
+            group_steps = multiprocessing.get_context("fork").Array(
+                "d", len(band_groups), lock=False
+            )
+            group_total_steps = multiprocessing.get_context("fork").Array(
+                "d", len(band_groups), lock=False
+            )
 
+            def solve_band_group_in_process(iGroup):
+                prevGroupPercent = 0
+
+                # Returns True when the user has cancelled the simulation
+                def progress(steps, total_steps):
+                    nonlocal prevGroupPercent
+                    group_steps[iGroup] = steps + 1
+                    group_total_steps[iGroup] = total_steps
+                    groupPercent = round(100 * steps / total_steps)
+                    if groupPercent > prevGroupPercent:
+                        prevGroupPercent = groupPercent
+                        # Checking whether the user has cancelled the simulation (only one time per percentage increase)
+                        return check_should_cancel(json_file_path)
+                    return False
+
+                return solve_band_group(band_groups[iGroup], progress)
+
+            # Returns True when the user has cancelled the simulation
+            def pool_progress():
+                nonlocal prevPercentDone
+                if check_should_cancel(json_file_path):
+                    return True
+
+                done = sum(
+                    steps / total_steps
+                    for steps, total_steps in zip(group_steps, group_total_steps)
+                    if total_steps > 0
+                )
                 percentDone = round(
-                    100 * (iBand / nBands + steps / recording_steps * 1 / nBands)
+                    100 * (iSource + done / len(band_groups)) / len(de_results)
                 )
                 if percentDone > prevPercentDone:
-                    # Checking whether the user has cancelled the simulation (only one time per percentage increase)
-                    if check_should_cancel(json_file_path):
-                        print("breaking out of inner loop")
-                        break
-
                     print(str(percentDone) + "% of main calculation completed")
-                    if result_container:
-                        result_container["results"][0]["percentage"] = percentDone
-                        with open(json_file_path, "w") as percentage_update:
-                            percentage_update.write(
-                                json.dumps(result_container, indent=4)
-                            )
-
-                prevPercentDone = percentDone
-
-            w_new_band.append(w_new)
-            w_rec_band.append(w_rec)
-            w_rec_off_band.append(w_rec_off)
-            w_rec_off_deriv_band.append(w_rec_off_deriv)
-            p_rec_off_deriv_band.append(p_rec_off_deriv)
-
-            if check_should_cancel(json_file_path):
-                print("breaking out of outer loop")
-                break
+                    solve_time = time.time() - solve_start
+                    write_progress(
+                        json_file_path,
+                        percentDone,
+                        "solving",
+                        band=[float(freq) for freq in center_freq],
+                        eta=solve_time * (100 - percentDone) / percentDone,
+                        steps_per_second=sum(group_steps) / (time.time() - pool_start),
+                    )
+                    prevPercentDone = percentDone
+                return False
+
+            group_results = (
+                run_in_band_pool(
+                    solve_band_group_in_process,
+                    len(band_groups),
+                    band_workers,
+                    pool_progress,
+                )
+                or []
+            )  # in band order
+        else:
+            for iGroup, bands in enumerate(band_groups):
+                if check_should_cancel(json_file_path):
+                    break
+
+                group_start = time.time()
+
+                # Returns True when the user has cancelled the simulation
+                def progress(steps, total_steps):
+                    nonlocal prevPercentDone
+                    percentDone = round(
+                        100
+                        * (iSource + (iGroup + steps / total_steps) / len(band_groups))
+                        / len(de_results)
+                    )
+                    if percentDone > prevPercentDone:
+                        # Checking whether the user has cancelled the simulation (only one time per percentage increase)
+                        if check_should_cancel(json_file_path):
+                            return True
+
+                        print(str(percentDone) + "% of main calculation completed")
+                        solve_time = time.time() - solve_start
+                        write_progress(
+                            json_file_path,
+                            percentDone,
+                            "solving",
+                            band=[float(center_freq[iBand]) for iBand in bands],
+                            eta=solve_time * (100 - percentDone) / percentDone,
+                            steps_per_second=(steps + 1) / (time.time() - group_start),
+                        )
+
+                    prevPercentDone = percentDone
+                    return False
+
+                group_results.append(solve_band_group(bands, progress))
+
+                if check_should_cancel(json_file_path):
+                    print("breaking out of outer loop")
+                    break
 
         if check_should_cancel(json_file_path):
             print("returning empty data")
-            return [], [], [], [], [], 0, []
+            return [], [], [], [], [], 0, [], []
+
+        # With the early stop the groups of bands can stop at different steps: all of them are
+        # truncated to the longest one, and the shorter ones are zero-padded to the same length
+        # (the post-processing only uses the rec_steps_band computed steps of each band)
+        rec_steps = max(len(w_rec) for bands, w_new, w_rec in group_results)
+        if rec_steps < recording_steps:
+            t_off = t[idx_w_rec:rec_steps]
+
+        for bands, w_new, w_rec in group_results:
+            group_rec_steps = len(w_rec)
+            if len(w_rec) < rec_steps:
+                w_rec = np.concatenate(
+                    (w_rec, np.zeros((rec_steps - len(w_rec),) + w_rec.shape[1:]))
+                )
+
+            # Decay of the receiver once the source stops, computed once the time loop is done
+            w_rec_off = w_rec[idx_w_rec:]
+            p_rec_off = w_rec_off * rho * c0**2
+
+            # Envelope of Impulse response from the energy density
+            w_rec_off_deriv = np.zeros_like(w_rec_off)
+            w_rec_off_deriv[:-1] = w_rec_off[
+                1:
+            ]  # shifting the array one step before and therefore do a derivation, with a zero in the last element to keep the same length
+
+            # Envelope of Impulse response from the pressure
+            p_rec_off_deriv = np.zeros_like(p_rec_off)
+            p_rec_off_deriv[:-1] = p_rec_off[1:]
+
+            # Split the columns of the group back into one array per band, (time steps, number of receivers) for the receivers
+            for column, iBand in enumerate(bands):
+                w_new_band[iBand] = w_new[:, column]
+                w_rec_band[iBand] = w_rec[:, :, column]
+                w_rec_off_band[iBand] = w_rec_off[:, :, column]
+                w_rec_off_deriv_band[iBand] = w_rec_off_deriv[:, :, column]
+                p_rec_off_deriv_band[iBand] = p_rec_off_deriv[:, :, column]
+                rec_steps_band[iBand] = group_rec_steps
 
         return (
             w_new_band,
@@ -1535,35 +2448,17 @@ def de_method(json_file_path=None):
             p_rec_off_deriv_band,
             idx_w_rec,
             t_off,
+            rec_steps_band,
         )
 
-    # FUNCTION CALLED HERE
-    (
-        w_new_band,
-        w_rec_band,
-        w_rec_off_band,
-        w_rec_off_deriv_band,
-        p_rec_off_deriv_band,
-        idx_w_rec,
-        t_off,
-    ) = computing_energy_density()
-
-    if check_should_cancel(json_file_path):
-        print("returning to simulation_service")
-        return
-
-    print("100% of main calculation completed")
-    if result_container:
-        result_container["results"][0]["percentage"] = 100
-        with open(json_file_path, "w") as percentage_update:
-            percentage_update.write(json.dumps(result_container, indent=4))
-
     # %%
     ###############################################################################
     # POST-PROCESS
     ###############################################################################
 
-    def freq_parameters():
+    def freq_parameters(
+        w_new_band, w_rec_band, w_rec_off_band, t_rec, idx_w_rec, dist_sr
+    ):
         w_rec_x_band = []
         w_rec_y_band = []
         spl_stat_x_band = []
@@ -1612,7 +2507,6 @@ def de_method(json_file_path=None):
             spl_r_off = 10 * np.log10(
                 ((abs(w_rec_off_band[iBand])) * rho * (c0**2)) / (pRef**2)
             )
-
             spl_r_t0 = spl_r_off[0]
 
             spl_r_norm = 10 * np.log10(
@@ -1639,13 +2533,13 @@ def de_method(json_file_path=None):
 
             if tcalc == "decay":
                 t20 = t60_decay(
-                    t, sch_db, idx_w_rec, rt="t20"
+                    t_rec, sch_db, idx_w_rec, rt="t20"
                 )  # called function for calculation of t20 [s]
                 t30 = t60_decay(
-                    t, sch_db, idx_w_rec, rt="t30"
+                    t_rec, sch_db, idx_w_rec, rt="t30"
                 )  # called function for calculation of t60 [s]
                 edt = t60_decay(
-                    t, sch_db, idx_w_rec, rt="edt"
+                    t_rec, sch_db, idx_w_rec, rt="edt"
                 )  # called function for calculation of edt [s]
                 # Eq_A = 0.16*V/t60 #equivalent absorption area defined from the RT
                 c80 = clarity(
@@ -1675,7 +2569,6 @@ def de_method(json_file_path=None):
             sch_db_band.append(sch_db)
             spl_r_t0_band.append(spl_r_t0)
 
-        spl_r_off_band = np.array(spl_r_off_band)
         spl_r_t0_band = np.array(spl_r_t0_band)
         t20_band = np.array(t20_band)
         t30_band = np.array(t30_band)
@@ -1702,94 +2595,162 @@ def de_method(json_file_path=None):
             spl_r_t0_band,
         )
 
-    if not check_should_cancel(json_file_path):
+    # %%
+    ###############################################################################
+    # LOOP OVER THE SOURCES
+    ###############################################################################
+    # The mesh, the operators and beta_zero are shared; each source is solved once and all its receivers are sampled from it
+
+    parameter_names = ["edt", "t20", "t30", "c80", "d50", "ts", "spl_t0_freq"]
+    # The time series are written to binary files sharing one time axis, the json file only references them
+    edc_rows = []
+    time_axis = np.zeros(0)
+    pressure_frequencies = []
+    pressure = []
+    # The results are put in the container once all the sources are done
+    response_results = []
+    debug_arrays = {}  # per source arrays of the debug output
+    solve_start = time.time()
+
+    for iSource, result in enumerate(de_results):
+        if check_should_cancel(json_file_path):
+            break
+
+        coord_source = [result["sourceX"], result["sourceY"], result["sourceZ"]]
+        coord_recs = [
+            [response["x"], response["y"], response["z"]]
+            for response in result["responses"]
+        ]
+
+        # FUNCTION CALLED HERE
+        cl_tet_s_keys, total_weights_s = source_interp(coord_source)
+        Vs = source_volume(coord_source)
+        source1, sourceon_steps = initial_cond(Vs)
+        s = source_matrix(cl_tet_s_keys, total_weights_s)
+        receiver_weights = receiver_matrix(coord_recs)
+
+        # FUNCTION CALLED HERE
         (
-            w_rec_x_band,
-            w_rec_y_band,
-            spl_stat_x_band,
-            spl_stat_y_band,
-            spl_r_band,
-            spl_r_off_band,
-            spl_r_norm_band,
-            sch_db_band,
-            t20_band,
-            t30_band,
-            edt_band,
-            c80_band,
-            d50_band,
-            ts_band,
-            spl_r_t0_band,
-        ) = freq_parameters()
+            w_new_band,
+            w_rec_band,
+            w_rec_off_band,
+            w_rec_off_deriv_band,
+            p_rec_off_deriv_band,
+            idx_w_rec,
+            t_off,
+            rec_steps_band,
+        ) = computing_energy_density(s, source1, receiver_weights, iSource)
 
-    # added by @hassan
-    if result_container:
         if check_should_cancel(json_file_path):
-            result_container["results"][0]["responses"][0]["parameters"]["edt"] = []
-            result_container["results"][0]["responses"][0]["parameters"]["t20"] = []
-            result_container["results"][0]["responses"][0]["parameters"]["t30"] = []
-            result_container["results"][0]["responses"][0]["parameters"]["c80"] = []
-            result_container["results"][0]["responses"][0]["parameters"]["d50"] = []
-            result_container["results"][0]["responses"][0]["parameters"]["ts"] = []
-            result_container["results"][0]["responses"][0]["parameters"][
-                "spl_t0_freq"
-            ] = []
-
-            result_container["results"][0]["responses"][0]["receiverResults"] = []
+            print("returning to simulation_service")
+            break
+
+        print("100% of main calculation completed")
+        result["percentage"] = 100
+
+        if debug_output == "yes":
+            debug_arrays[f"source{iSource}_coord"] = np.array(coord_source)
+            debug_arrays[f"source{iSource}_coord_recs"] = np.array(coord_recs)
+            debug_arrays[f"source{iSource}_w_rec"] = np.array(
+                w_rec_band
+            )  # (bands, time steps, receivers)
+            debug_arrays[f"source{iSource}_w_new"] = np.array(
+                w_new_band
+            )  # (bands, tetrahedrons)
+            debug_arrays[f"source{iSource}_t_off"] = t_off
+
+        for iRec, response in enumerate(result["responses"]):
+            # FUNCTION CALLED HERE
+            dist_sr = dist_source_receiver(coord_source, coord_recs[iRec])
+            (
+                w_rec_x_band,
+                w_rec_y_band,
+                spl_stat_x_band,
+                spl_stat_y_band,
+                spl_r_band,
+                spl_r_off_band,
+                spl_r_norm_band,
+                sch_db_band,
+                t20_band,
+                t30_band,
+                edt_band,
+                c80_band,
+                d50_band,
+                ts_band,
+                spl_r_t0_band,
+            ) = freq_parameters(
+                w_new_band,
+                # Only the computed steps of each band: the zero padding after an early stop
+                # never reaches the levels in dB, the decay parameters or the stored curves
+                [
+                    w_rec[:rec_steps, iRec]
+                    for w_rec, rec_steps in zip(w_rec_band, rec_steps_band)
+                ],
+                [
+                    w_rec_off[: rec_steps - idx_w_rec, iRec]
+                    for w_rec_off, rec_steps in zip(w_rec_off_band, rec_steps_band)
+                ],
+                t[: idx_w_rec + len(t_off)],
+                idx_w_rec,
+                dist_sr,
+            )
 
+            # added by @hassan
+            if result_container:
+                parameters = {
+                    "edt": edt_band.tolist(),
+                    "t20": t20_band.tolist(),
+                    "t30": t30_band.tolist(),
+                    "c80": c80_band.tolist(),
+                    "d50": d50_band.tolist(),
+                    "ts": ts_band.tolist(),
+                    "spl_t0_freq": spl_r_t0_band.tolist(),
+                }
+
+                # result_container['frequenci[0]es'] = center_freq
+
+                receiver_results = []
+                for index, edc_detail in enumerate(spl_r_off_band):
+                    edc_rows.append(edc_detail)
+                    receiver_results.append(
+                        edc_reference(
+                            result["frequencies"][index],
+                            len(edc_rows) - 1,
+                            len(edc_detail),
+                        )
+                    )
+                response_results.append((response, parameters, receiver_results))
+                if len(t_off) > len(time_axis):
+                    time_axis = t_off - t_off[0]
+
+                # The pressure used by the auralization is the one of the first source and receiver
+                if iSource == 0 and iRec == 0:
+                    pressure_frequencies = result["frequencies"]
+                    pressure = [
+                        p_rec_off_deriv[:, iRec]
+                        for p_rec_off_deriv in p_rec_off_deriv_band
+                    ]
+
+    if result_container:
+        if check_should_cancel(json_file_path):
+            for result in de_results:
+                for response in result["responses"]:
+                    for parameter_name in parameter_names:
+                        response["parameters"][parameter_name] = []
+                    response["receiverResults"] = []
         else:
-            result_container["results"][0]["responses"][0]["parameters"][
-                "edt"
-            ] = edt_band.tolist()
-            result_container["results"][0]["responses"][0]["parameters"][
-                "t20"
-            ] = t20_band.tolist()
-            result_container["results"][0]["responses"][0]["parameters"][
-                "t30"
-            ] = t30_band.tolist()
-            result_container["results"][0]["responses"][0]["parameters"][
-                "c80"
-            ] = c80_band.tolist()
-            result_container["results"][0]["responses"][0]["parameters"][
-                "d50"
-            ] = d50_band.tolist()
-            result_container["results"][0]["responses"][0]["parameters"][
-                "ts"
-            ] = ts_band.tolist()
-            result_container["results"][0]["responses"][0]["parameters"][
-                "spl_t0_freq"
-            ] = spl_r_t0_band.tolist()
-
-            # result_container['frequenci[0]es'] = center_freq
-
-            df = pd.DataFrame()
-            for index, (edc_detail, pressure_detail) in enumerate(
-                zip(spl_r_off_band, p_rec_off_deriv_band)
-            ):
-                result_container["results"][0]["responses"][0][
-                    "receiverResults"
-                ].append(
-                    {
-                        "data": edc_detail.tolist(),
-                        # "data_pressure": pressure_detail.tolist(),
-                        "t": (t_off - t_off[0]).tolist(),
-                        "frequency": result_container["results"][0]["frequencies"][
-                            index
-                        ],
-                        "type": "edc",
-                    }
-                )
-                if "t" not in df.columns:
-                    df["t"] = (t_off - t_off[0]).tolist()
-                df[str(result_container["results"][0]["frequencies"][index]) + "Hz"] = (
-                    pressure_detail.tolist()
-                )
+            for response, parameters, receiver_results in response_results:
+                response["parameters"].update(parameters)
+                response["receiverResults"] = receiver_results
+            write_time_series(
+                json_file_path, time_axis, pressure_frequencies, edc_rows, pressure
+            )
 
         with open(json_file_path, "w") as new_result_json:
             new_result_json.write(json.dumps(result_container, indent=4))
-        with open(
-            json_file_path.replace(".json", "_pressure.csv"), "w", newline=""
-        ) as pressure_result_csv:
-            df.to_csv(pressure_result_csv, index=False)
+
+        if not check_should_cancel(json_file_path):
+            write_progress(json_file_path, 100, "done")
 
     et = time.time()  # end time
     elapsed_time = et - st
@@ -1798,41 +2759,28 @@ def de_method(json_file_path=None):
     ###############################################################################
     # SAVING
     ###############################################################################
-    # np.save(os.path.join('dt'),dt)
-    # np.save(os.path.join('w_rec_off_band'),w_rec_off_band)
-    # np.save(os.path.join('w_rec_off_deriv_band'),w_rec_off_deriv_band)
-    # np.save(os.path.join('p_rec_off_deriv_band'),p_rec_off_deriv_band)
-    # np.save(os.path.join('t_off'),t_off)
-
-    # Save all variables to a file
-    def save(filename):
-        with open(filename, "wb") as f:
-            # Filter out modules, functions, and other unsupported types
-            filtered_variables = {}
-            for k, v in globals().items():
-                try:
-                    # Check if the object can be pickled
-                    pickle.dumps(v)
-                    # Exclude some types explicitly known to cause issues
-                    if not k.startswith("__") and not isinstance(
-                        v,
-                        (
-                            types.ModuleType,
-                            types.FunctionType,
-                            types.BuiltinFunctionType,
-                            types.LambdaType,
-                            types.MethodType,
-                            types.MappingProxyType,
-                        ),
-                    ):
-                        filtered_variables[k] = v
-                except Exception as e:
-                    print(f"Could not pickle {k}: {str(e)}")
-
-            pickle.dump(filtered_variables, f)
-
-    # To save all current variables
-    save("results.pkl")
+    # The debug output is only written on request, next to the json file of the simulation
+    def save_debug_output(filename):
+        np.savez_compressed(
+            filename,
+            dt=dt,
+            center_freq=np.array(center_freq),
+            cell_center=cell_center,
+            cell_volume=cell_volume,
+            preprocessing_time=solve_start - st,
+            solving_time=et - solve_start,
+            elapsed_time=elapsed_time,
+            **debug_arrays,
+        )
+
+    # FUNCTION CALLED HERE
+    if debug_output == "yes" and debug_arrays:
+        save_debug_output(
+            os.path.splitext(json_file_path)[0] + "_debug.npz"
+            if json_file_path
+            else "results_debug.npz"
+        )
+
     gmsh.finalize()
 
 
@@ -5,8 +5,7 @@ import numpy
 import scipy.io
 import gmsh
 import shutil
-
-from Diffusion_Module.FiniteVolumeMethod.CreateMeshFVM import generate_mesh
+import threading
 
 import json
 
@@ -16,10 +15,21 @@ from math import log, sqrt
 import importlib
 import edg_acoustics
 
+from simulation_backend.Cancellation import is_cancel_requested
+from simulation_backend.MeshCache import generate_cached_mesh
+from simulation_backend.Progress import write_progress
+
 print(edg_acoustics.__file__)
 
 # endregion
 
+# Overall percentages at the phase boundaries of dg_method
+MESH_DONE_PERCENTAGE = 10
+INTEGRATION_DONE_PERCENTAGE = 90
+
+# Seconds between two reads of the json percentage and of the cancellation flag
+PROGRESS_POLL_INTERVAL = 1.0
+
 
 # Absorption term for boundary conditions
 def abs_term(th, c0, abscoeff_list):
@@ -122,8 +132,77 @@ def surface_materials(result_container, c0):
     )
 
 
+def set_json_should_cancel(json_file_path, result_container):
+    """
+    Sets the "should_cancel" key edg_acoustics polls in the json file during its time integration. Only the worker running the simulation writes the key, and the file is replaced atomically.
+
+    Parameters
+    ----------
+    json_file_path : str
+        The json file of the simulation.
+
+    result_container : dict
+        The content of the json file.
+
+    """
+
+    result_container["should_cancel"] = True
+    tmp_path = f"{json_file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as json_file:
+        json.dump(result_container, json_file, indent=4)
+    os.replace(tmp_path, json_file_path)
+
+
+def forward_time_integration_progress(
+    json_file_path, stop_event, interval=PROGRESS_POLL_INTERVAL
+):
+    """
+    Forwards the percentage edg_acoustics writes into the json file during the time integration to the progress file, until stop_event is set. Once the cancellation flag file of the simulation exists, the "should_cancel" key of the json file is set on every read until the time integration stops, so a rewrite of the json file by edg_acoustics cannot drop it.
+
+    Parameters
+    ----------
+    json_file_path : str
+        The json file of the simulation.
+
+    stop_event : threading.Event
+        Set when the time integration is over.
+
+    interval : float, optional
+        The number of seconds between two reads of the json file.
+
+    """
+
+    last_percentage = None
+    while not stop_event.wait(interval):
+        try:
+            with open(json_file_path, "r") as json_file:
+                result_container = json.load(json_file)
+            if is_cancel_requested(json_file_path) and not result_container.get(
+                "should_cancel"
+            ):
+                set_json_should_cancel(json_file_path, result_container)
+            integration_percentage = float(result_container["results"][0]["percentage"])
+        except (OSError, ValueError, TypeError, KeyError, IndexError):
+            # The file is missing, being rewritten or has no percentage yet
+            continue
+
+        percentage = MESH_DONE_PERCENTAGE + int(
+            (INTEGRATION_DONE_PERCENTAGE - MESH_DONE_PERCENTAGE)
+            * min(max(integration_percentage, 0), 100)
+            / 100
+        )
+        if percentage != last_percentage:
+            write_progress(json_file_path, percentage, "solving")
+            last_percentage = percentage
+
+
 def dg_method(json_file_path=None):
 
+    if is_cancel_requested(json_file_path):
+        return
+
+    write_progress(json_file_path, 0, "preprocessing")
+
     result_container = {}
     if json_file_path is not None:
         with open(json_file_path, "r") as json_file:
@@ -149,7 +228,8 @@ def dg_method(json_file_path=None):
         minWavelength = c0 / freq_upper_limit
 
         print("lc = " + str(minWavelength / PPW))
-        generate_mesh(geo_filename, mesh_filename, minWavelength / PPW)
+        generate_cached_mesh(geo_filename, mesh_filename, minWavelength / PPW)
+        write_progress(json_file_path, MESH_DONE_PERCENTAGE, "preprocessing")
 
         test = gmsh.open(mesh_filename)
 
@@ -288,13 +368,35 @@ def dg_method(json_file_path=None):
 
     tsi_time_integrator = edg_acoustics.TSI_TI(sim.RHS_operator, sim.dtscale, CFL, Nt=3)
     sim.init_TimeIntegrator(tsi_time_integrator)
-    sim.time_integration(
-        total_time=impulse_length,
-        delta_step=save_every_Nstep,
-        save_step=temporary_save_Nstep,
-        format="mat",
-        json_file_path=json_file_path,
-    )
+
+    write_progress(json_file_path, MESH_DONE_PERCENTAGE, "solving")
+    stop_forwarding = threading.Event()
+    progress_forwarder = None
+    if json_file_path is not None:
+        progress_forwarder = threading.Thread(
+            target=forward_time_integration_progress,
+            args=(json_file_path, stop_forwarding),
+            daemon=True,
+        )
+        progress_forwarder.start()
+    try:
+        sim.time_integration(
+            total_time=impulse_length,
+            delta_step=save_every_Nstep,
+            save_step=temporary_save_Nstep,
+            format="mat",
+            json_file_path=json_file_path,
+        )
+    finally:
+        stop_forwarding.set()
+        if progress_forwarder is not None:
+            progress_forwarder.join()
+
+    if is_cancel_requested(json_file_path):
+        print("Cancelled!")
+        return
+
+    write_progress(json_file_path, INTEGRATION_DONE_PERCENTAGE, "postprocessing")
 
     results = edg_acoustics.Monopole_postprocessor(sim, 1)
 
@@ -318,6 +420,8 @@ def dg_method(json_file_path=None):
     result_filename = os.path.join(uploads_folder, result_filename)
     results.write_results(result_filename, "mat")
 
+    write_progress(json_file_path, 100, "done")
+
     # load newresult.npy
     # data = numpy.load("./examples/newresult.npz", allow_pickle=True)
     # tempdata = numpy.load("./results_on_the_run.npz", allow_pickle=True)
@@ -0,0 +1,138 @@
+import hashlib
+import os
+import shutil
+
+import gmsh
+from Diffusion_Module.FiniteVolumeMethod.CreateMeshFVM import generate_mesh
+
+
+MESH_CACHE_FOLDER = "mesh_cache"
+MESH_CACHE_SIZE = 32  # number of meshes kept, the least recently used ones are removed
+
+
+def prune_cache(cache_folder, max_entries):
+    """
+    Removes the least recently used files of a cache folder, so it keeps at most max_entries files. A file is used when it is written or when its modification time is updated on a cache hit. Temporary files being written are left alone.
+
+    Parameters
+    ----------
+    cache_folder : str
+        The cache folder.
+
+    max_entries : int
+        The number of files to keep.
+
+    """
+
+    try:
+        entries = [
+            entry
+            for entry in os.scandir(cache_folder)
+            if entry.is_file() and ".tmp" not in entry.name
+        ]
+    except FileNotFoundError:
+        return
+
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[max_entries:]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            # Removed by a concurrent task pruning the same folder
+            pass
+
+
+def mesh_cache_key(geo_file_path, length_of_mesh):
+    """
+    Returns the key of the mesh of a geometry in the mesh cache.
+
+    Parameters
+    ----------
+    geo_file_path : str
+        The geo file of the geometry.
+
+    length_of_mesh : float
+        The characteristic length of the mesh.
+
+    Returns
+    ------
+    str
+        The sha256 of the geo file content, the characteristic length and the gmsh version.
+    """
+
+    key = hashlib.sha256()
+    with open(geo_file_path, "rb") as geo_file:
+        for chunk in iter(lambda: geo_file.read(1 << 20), b""):
+            key.update(chunk)
+    key.update(f"lc={float(length_of_mesh)!r}".encode("utf-8"))
+    key.update(f"gmsh={getattr(gmsh, '__version__', '')}".encode("utf-8"))
+    return key.hexdigest()
+
+
+def cached_mesh_path(geo_file_path, length_of_mesh):
+    """
+    Returns the path of the mesh of a geometry in the mesh cache.
+
+    Parameters
+    ----------
+    geo_file_path : str
+        The geo file of the geometry.
+
+    length_of_mesh : float
+        The characteristic length of the mesh.
+
+    Returns
+    ------
+    str
+        The path to the cached msh file, in a folder next to the geo file.
+    """
+
+    return os.path.join(
+        os.path.dirname(geo_file_path),
+        MESH_CACHE_FOLDER,
+        mesh_cache_key(geo_file_path, length_of_mesh) + ".msh",
+    )
+
+
+def generate_cached_mesh(geo_file_path, msh_file_path, length_of_mesh):
+    """
+    Writes the mesh of a geometry to msh_file_path, generating it only when the mesh cache does not have it yet. The files are replaced atomically, so concurrent tasks meshing the same geometry never read a partially written mesh. The cache keeps the MESH_CACHE_SIZE most recently used meshes.
+
+    Parameters
+    ----------
+    geo_file_path : str
+        The geo file of the geometry.
+
+    msh_file_path : str
+        The msh file to write.
+
+    length_of_mesh : float
+        The characteristic length of the mesh.
+
+    Returns
+    ------
+    bool
+        True when the mesh came from the cache, False when it has been generated.
+    """
+
+    cache_path = cached_mesh_path(geo_file_path, length_of_mesh)
+    try:
+        # Marks the mesh as recently used, so prune_cache keeps it
+        os.utime(cache_path)
+        cache_hit = True
+    except FileNotFoundError:
+        cache_hit = False
+
+    if not cache_hit:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_cache_path = f"{os.path.splitext(cache_path)[0]}.{os.getpid()}.tmp.msh"
+        generate_mesh(geo_file_path, tmp_cache_path, length_of_mesh)
+        prune_cache(os.path.dirname(cache_path), MESH_CACHE_SIZE - 1)
+        os.replace(tmp_cache_path, cache_path)
+
+    if os.path.abspath(cache_path) != os.path.abspath(msh_file_path):
+        tmp_msh_path = f"{os.path.splitext(msh_file_path)[0]}.{os.getpid()}.tmp.msh"
+        shutil.copyfile(cache_path, tmp_msh_path)
+        os.replace(tmp_msh_path, msh_file_path)
+
+    return cache_hit
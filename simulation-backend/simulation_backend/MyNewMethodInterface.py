@@ -3,6 +3,9 @@
 # Import the relevant functions from your package (/submodule)
 from My_New_Method import simulation_method
 
+# Check this (cheap) flag in your simulation loop to stop when the user cancels the simulation
+from simulation_backend.Cancellation import is_cancel_requested
+
 
 # This function will be called from app/services/simulation_service.py 
 # and the main function below
@@ -10,6 +13,10 @@ def mynewmethod_method(json_file_path=None):
 
     print("mynewmethod_method: starting simulation")
 
+    if is_cancel_requested(json_file_path):
+        print("mynewmethod_method: simulation cancelled")
+        return
+
     # Call the appropriate function(s) in your package to simulate
     simulation_method(json_file_path)
 
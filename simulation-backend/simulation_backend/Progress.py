@@ -0,0 +1,148 @@
+import json
+import os
+import threading
+
+
+PROGRESS_FILE_SUFFIX = "_progress.json"
+
+progress_listener = None
+
+# Last percentage passed to the listener per json file, so the progress never goes back
+listener_percentages = {}
+listener_lock = threading.Lock()
+
+
+def progress_path(json_file_path):
+    """
+    Returns the path of the progress file of a simulation.
+
+    Parameters
+    ----------
+    json_file_path : str
+        The json file of the simulation.
+
+    Returns
+    ------
+    str
+        The path to the progress file, next to the json file.
+    """
+
+    return os.path.splitext(json_file_path)[0] + PROGRESS_FILE_SUFFIX
+
+
+def set_progress_listener(listener):
+    """
+    Registers a function called after every write_progress of this process, e.g. to store the progress in a database. The percentages passed to the listener never decrease, even when writes of several threads of a simulation arrive out of order.
+
+    Parameters
+    ----------
+    listener : callable or None
+        Called with the json file, the percentage and the stage of the simulation; None removes the listener.
+
+    """
+
+    global progress_listener
+    with listener_lock:
+        progress_listener = listener
+        listener_percentages.clear()
+
+
+def write_progress(
+    json_file_path,
+    percentage,
+    stage,
+    band=None,
+    eta=None,
+    steps_per_second=None,
+):
+    """
+    Writes the progress of a simulation. The file is replaced atomically, so a reader never sees a partially written record.
+
+    Parameters
+    ----------
+    json_file_path : str
+        The json file of the simulation.
+
+    percentage : int
+        The overall percentage of the simulation.
+
+    stage : str
+        The stage the simulation method is in, e.g. "preprocessing", "solving" or "done".
+
+    band : list, optional
+        The frequencies being computed.
+
+    eta : float, optional
+        The estimated remaining time in seconds.
+
+    steps_per_second : float, optional
+        The number of time steps computed per second.
+
+    """
+
+    if json_file_path is None:
+        return
+
+    path = progress_path(json_file_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as progress_file:
+        json.dump(
+            {
+                "percentage": percentage,
+                "stage": stage,
+                "band": band,
+                "eta": eta,
+                "steps_per_second": steps_per_second,
+            },
+            progress_file,
+        )
+    os.replace(tmp_path, path)
+
+    with listener_lock:
+        listener = progress_listener
+        if listener is None:
+            return
+        percentage = max(
+            percentage, listener_percentages.get(json_file_path, percentage)
+        )
+        listener_percentages[json_file_path] = percentage
+    listener(json_file_path, percentage, stage)
+
+
+def read_progress(json_file_path):
+    """
+    Reads the progress of a simulation.
+
+    Parameters
+    ----------
+    json_file_path : str
+        The json file of the simulation.
+
+    Returns
+    ------
+    dict or None
+        The progress record, or None when the simulation has not written one yet or the file cannot be read.
+    """
+
+    try:
+        with open(progress_path(json_file_path), "r") as progress_file:
+            return json.load(progress_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def clear_progress(json_file_path):
+    """
+    Removes the progress file of a simulation, if any.
+
+    Parameters
+    ----------
+    json_file_path : str
+        The json file of the simulation.
+
+    """
+
+    try:
+        os.remove(progress_path(json_file_path))
+    except FileNotFoundError:
+        pass
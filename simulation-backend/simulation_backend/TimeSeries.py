@@ -0,0 +1,257 @@
+import os
+
+import numpy as np
+
+
+TIME_AXIS_SUFFIX = "_t.npy"
+FREQUENCIES_SUFFIX = "_frequencies.npy"
+EDC_SUFFIX = "_edc.npy"
+PRESSURE_SUFFIX = "_pressure.npy"
+PRESSURE_CSV_SUFFIX = "_pressure.csv"
+
+
+def time_series_path(json_file_path, suffix):
+    """
+    Returns the path of a time series file of a simulation.
+
+    Parameters
+    ----------
+    json_file_path : str
+        The json file of the simulation.
+
+    suffix : str
+        The suffix of the time series file, e.g. EDC_SUFFIX.
+
+    Returns
+    ------
+    str
+        The path to the time series file, next to the json file.
+    """
+
+    return os.path.splitext(json_file_path)[0] + suffix
+
+
+def write_time_series(json_file_path, t, frequencies, edc_rows, pressure):
+    """
+    Writes the time series of a simulation as float32 .npy files sharing one time axis. The json file only keeps the row of each series, see edc_reference.
+
+    Parameters
+    ----------
+    json_file_path : str
+        The json file of the simulation.
+
+    t : array_like
+        The time axis shared by all the series, starting at 0.
+
+    frequencies : list
+        The frequency of each row of the pressure.
+
+    edc_rows : list
+        The energy decay curves; a curve shorter than the time axis is padded with NaN.
+
+    pressure : array_like
+        The (number of frequencies, number of time steps) pressure envelope used by the auralization.
+
+    """
+
+    t = np.asarray(t, dtype=np.float32)
+    edc = np.full((len(edc_rows), len(t)), np.nan, dtype=np.float32)
+    for row, edc_row in enumerate(edc_rows):
+        edc[row, : len(edc_row)] = edc_row
+
+    np.save(time_series_path(json_file_path, TIME_AXIS_SUFFIX), t)
+    np.save(
+        time_series_path(json_file_path, FREQUENCIES_SUFFIX),
+        np.asarray(frequencies, dtype=np.float32),
+    )
+    np.save(time_series_path(json_file_path, EDC_SUFFIX), edc)
+    np.save(
+        time_series_path(json_file_path, PRESSURE_SUFFIX),
+        np.asarray(pressure, dtype=np.float32),
+    )
+
+
+def edc_reference(frequency, row, length):
+    """
+    Returns the receiver result stored in the json file for an energy decay curve written by write_time_series.
+
+    Parameters
+    ----------
+    frequency : int
+        The frequency of the curve.
+
+    row : int
+        The row of the curve in the edc file.
+
+    length : int
+        The number of time steps of the curve.
+
+    Returns
+    ------
+    dict
+        The receiver result referencing the curve.
+    """
+
+    return {"frequency": frequency, "type": "edc", "row": row, "length": length}
+
+
+def read_edc(json_file_path, row, length=None):
+    """
+    Reads one energy decay curve of a simulation. The files are memory-mapped, so only the requested curve is read.
+
+    Parameters
+    ----------
+    json_file_path : str
+        The json file of the simulation.
+
+    row : int
+        The row of the curve in the edc file.
+
+    length : int, optional
+        The number of time steps of the curve, the whole time axis by default.
+
+    Returns
+    ------
+    tuple
+        The time axis and the curve, as numpy arrays.
+    """
+
+    t = np.load(time_series_path(json_file_path, TIME_AXIS_SUFFIX), mmap_mode="r")
+    edc = np.load(time_series_path(json_file_path, EDC_SUFFIX), mmap_mode="r")
+    length = len(t) if length is None else length
+    return np.array(t[:length]), np.array(edc[row, :length])
+
+
+def load_receiver_results(json_file_path, results):
+    """
+    Puts the data of the receiver results referencing the time series files back into the results, in place. Receiver results holding their data in the json file are left as they are.
+
+    Parameters
+    ----------
+    json_file_path : str
+        The json file of the simulation.
+
+    results : list
+        The results of the json file of the simulation.
+
+    Returns
+    ------
+    list
+        The results.
+    """
+
+    for result in results:
+        for response in result.get("responses", []):
+            receiver_results = response.get("receiverResults")
+            if not isinstance(receiver_results, list):
+                continue
+            for index, receiver_result in enumerate(receiver_results):
+                if (
+                    not isinstance(receiver_result, dict)
+                    or "row" not in receiver_result
+                ):
+                    continue
+                t, data = read_edc(
+                    json_file_path, receiver_result["row"], receiver_result["length"]
+                )
+                receiver_results[index] = {
+                    "data": data.tolist(),
+                    "t": t.tolist(),
+                    "frequency": receiver_result["frequency"],
+                    "type": receiver_result["type"],
+                }
+    return results
+
+
+def read_pressure(json_file_path):
+    """
+    Reads the pressure envelope of a simulation, from its .npy file or, for older simulations, from its csv file.
+
+    Parameters
+    ----------
+    json_file_path : str
+        The json file of the simulation.
+
+    Returns
+    ------
+    tuple
+        The frequencies and the (number of frequencies, number of time steps) pressure envelope, as numpy arrays.
+    """
+
+    pressure_path = time_series_path(json_file_path, PRESSURE_SUFFIX)
+    if os.path.exists(pressure_path):
+        frequencies = np.load(time_series_path(json_file_path, FREQUENCIES_SUFFIX))
+        pressure = np.load(pressure_path, mmap_mode="r")
+        return frequencies.astype(np.int32), np.asarray(pressure, dtype=float)
+
+    pressure_csv_path = time_series_path(json_file_path, PRESSURE_CSV_SUFFIX)
+    frequencies = np.loadtxt(
+        pressure_csv_path, usecols=range(1, 6), delimiter=",", dtype=str, max_rows=1
+    )  # the header holds the frequencies with the suffix "Hz"
+    pressure = np.loadtxt(
+        pressure_csv_path, skiprows=1, usecols=range(1, 6), delimiter=","
+    )
+    frequencies = np.array([np.int32(f[:-2]) for f in frequencies])
+    return frequencies, pressure.transpose().copy()
+
+
+def merge_time_series(json_file_path, part_json_file_paths, results):
+    """
+    Merges the time series of a simulation solved in parts, one json file per part, into the time series of the simulation. The receiver results referencing the files of a part are changed in place to reference the merged files.
+
+    Parameters
+    ----------
+    json_file_path : str
+        The json file of the simulation.
+
+    part_json_file_paths : list
+        The json file of each part.
+
+    results : list
+        The results of the parts, results[i] coming from part i.
+
+    Returns
+    ------
+    bool
+        True when the time series have been written, False when no part had any.
+    """
+
+    t = np.zeros(0)
+    edc_rows = []
+    frequencies = []
+    pressure = None
+
+    for part_json_file_path, result in zip(part_json_file_paths, results):
+        for response in result.get("responses", []):
+            receiver_results = response.get("receiverResults")
+            if not isinstance(receiver_results, list):
+                continue
+            for receiver_result in receiver_results:
+                if (
+                    not isinstance(receiver_result, dict)
+                    or "row" not in receiver_result
+                ):
+                    continue
+                part_t, edc_row = read_edc(
+                    part_json_file_path,
+                    receiver_result["row"],
+                    receiver_result["length"],
+                )
+                if len(part_t) > len(t):
+                    t = part_t
+                edc_rows.append(edc_row)
+                receiver_result["row"] = len(edc_rows) - 1
+
+        # The pressure used by the auralization is the one of the first part that has one
+        if pressure is None and os.path.exists(
+            time_series_path(part_json_file_path, PRESSURE_SUFFIX)
+        ):
+            frequencies, pressure = read_pressure(part_json_file_path)
+
+    if not edc_rows:
+        return False
+
+    write_time_series(
+        json_file_path, t, frequencies, edc_rows, [] if pressure is None else pressure
+    )
+    return True
@@ -1,5 +1,24 @@
 from .DEinterface import de_method
 from .DGinterface import dg_method
 from .MyNewMethodInterface import mynewmethod_method
+from .Cancellation import (
+    request_cancel,
+    is_cancel_requested,
+    clear_cancel_request,
+)
+from .MeshCache import generate_cached_mesh
+from .Progress import (
+    write_progress,
+    read_progress,
+    clear_progress,
+    set_progress_listener,
+)
+from .TimeSeries import (
+    write_time_series,
+    read_edc,
+    load_receiver_results,
+    read_pressure,
+    merge_time_series,
+)
 
 from .headless_backend.HelperFunctions import *
\ No newline at end of file
@@ -0,0 +1,118 @@
+import itertools
+
+import numpy as np
+
+
+def cube_mesh(tag_offset=10):
+    """
+    Returns the unit cube split in six tetrahedrons around its diagonal.
+
+    Parameters
+    ----------
+    tag_offset : int
+        The tag of the first node, so the tags are not the rows of the coordinates.
+
+    Returns
+    ------
+    node_tags : numpy.ndarray
+        The (8,) tags of the nodes.
+    nodecoords : numpy.ndarray
+        The (8, 3) coordinates of the nodes.
+    tet_nodes : numpy.ndarray
+        The (6, 4) node tags of each tetrahedron.
+    """
+    nodecoords = np.array(
+        [[corner & 1, (corner >> 1) & 1, (corner >> 2) & 1] for corner in range(8)],
+        dtype=float,
+    )
+    tets = []
+    for axes in itertools.permutations(range(3)):
+        corner = 0
+        tet = [corner]
+        for axis in axes:
+            corner |= 1 << axis
+            tet.append(corner)
+        tets.append(tet)
+    node_tags = tag_offset + np.arange(8)
+    return node_tags, nodecoords, node_tags[np.array(tets)]
+
+
+def two_tet_mesh():
+    """
+    Returns two tetrahedrons sharing one face.
+
+    Returns
+    ------
+    node_tags : numpy.ndarray
+        The (5,) tags of the nodes.
+    nodecoords : numpy.ndarray
+        The (5, 3) coordinates of the nodes.
+    tet_nodes : numpy.ndarray
+        The (2, 4) node tags of each tetrahedron.
+    """
+    nodecoords = np.array(
+        [[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1], [0.5, 0.5, -1]], dtype=float
+    )
+    node_tags = np.arange(1, 6)
+    return node_tags, nodecoords, np.array([[1, 2, 3, 4], [2, 1, 3, 5]])
+
+
+def element_face_nodes(tet_nodes):
+    """
+    Returns the face nodes of tetrahedrons like gmsh.model.mesh.getElementFaceNodes(4, 3).
+
+    Parameters
+    ----------
+    tet_nodes : numpy.ndarray
+        The (n_tets, 4) node tags of each tetrahedron.
+
+    Returns
+    ------
+    numpy.ndarray
+        The flat node tags, three per face and four faces per tetrahedron.
+    """
+    return np.array(
+        [face for tet in tet_nodes for face in itertools.combinations(tet, 3)]
+    ).ravel()
+
+
+def cube_surface_entities(tag_offset=10):
+    """
+    Returns the boundary triangles of cube_mesh grouped in surface entities, one per side of the cube, like the
+    triangles of the surface entities of a gmsh model with one material per side.
+
+    Parameters
+    ----------
+    tag_offset : int
+        The tag of the first node, see cube_mesh.
+
+    Returns
+    ------
+    boundary_triangles : numpy.ndarray
+        The (12, 3) node tags of the boundary triangles, ordered by entity, with their nodes in another order than in
+        the tetrahedrons.
+    triangles_per_entity : list
+        The number of triangles of each entity, the last entity having none.
+    """
+    node_tags, nodecoords, tet_nodes = cube_mesh(tag_offset)
+    corner = {tag: coords for tag, coords in zip(node_tags, nodecoords)}
+    triangles = [
+        face
+        for tet in tet_nodes
+        for face in itertools.combinations(tet, 3)
+        if any(
+            len({corner[node][axis] for node in face}) == 1 for axis in range(3)
+        )  # the three nodes of a face on a side of the cube share one coordinate
+    ]
+
+    def side(face):
+        axis = next(
+            axis for axis in range(3) if len({corner[node][axis] for node in face}) == 1
+        )
+        return 2 * axis + int(corner[face[0]][axis])
+
+    triangles.sort(key=side)
+    triangles_per_entity = [
+        sum(side(face) == entity for face in triangles) for entity in range(6)
+    ] + [0]
+    return np.array([face[::-1] for face in triangles]), triangles_per_entity
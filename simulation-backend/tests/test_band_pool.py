@@ -0,0 +1,76 @@
+import multiprocessing
+import os
+import time
+import unittest
+
+import numpy as np
+
+from simulation_backend import DEinterface
+
+
+def daemon_band_pool_available(queue):
+    queue.put(DEinterface.band_pool_available())
+
+
+@unittest.skipUnless(
+    DEinterface.band_pool_available(), "the band pool needs the fork start method"
+)
+class BandPoolTests(unittest.TestCase):
+    def test_run_in_band_pool(self):
+        """
+        Test that the tasks of the band pool run in forked processes, with closures over large arrays, and return in task order.
+        """
+        # Given: A task which is a closure over an array, like the time loop of a band group
+        operator = np.arange(1_000_000, dtype=np.float64)
+
+        def task(index):
+            return index, float(operator[index::4].sum()), os.getpid()
+
+        # When: Running four tasks in two processes
+        results = DEinterface.run_in_band_pool(
+            task, 4, 2, on_wait=lambda: False, wait_interval=0.01
+        )
+
+        # Then: The results are the ones of the loop, in task order, computed in child processes
+        self.assertEqual(
+            [result[:2] for result in results],
+            [(index, float(operator[index::4].sum())) for index in range(4)],
+        )
+        self.assertNotIn(os.getpid(), {result[2] for result in results})
+        self.assertIsNone(DEinterface.band_pool_task)
+
+    def test_run_in_band_pool_cancelled(self):
+        """
+        Test that the band pool stops and returns None when on_wait asks for a cancellation.
+        """
+
+        # Given: Tasks slower than the wait interval
+        def task(index):
+            time.sleep(0.5)
+            return index
+
+        # When: Cancelling at the first wait
+        results = DEinterface.run_in_band_pool(
+            task, 8, 1, on_wait=lambda: True, wait_interval=0.01
+        )
+
+        # Then: No results are returned
+        self.assertIsNone(results)
+
+    def test_band_pool_unavailable_in_daemon_process(self):
+        """
+        Test that the band pool is not available in a daemon process, like the children of a Celery prefork pool.
+        """
+        queue = multiprocessing.get_context("fork").Queue()
+        process = multiprocessing.get_context("fork").Process(
+            target=daemon_band_pool_available, args=(queue,), daemon=True
+        )
+        process.start()
+        available = queue.get(timeout=10)
+        process.join()
+
+        self.assertFalse(available)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import unittest
+
+from simulation_backend.Cancellation import (
+    cancel_flag_path,
+    clear_cancel_request,
+    is_cancel_requested,
+    request_cancel,
+)
+
+
+class CancellationTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.temp_dir.name, "room_1.json")
+        with open(self.json_path, "w") as json_file:
+            json.dump({"results": [], "should_cancel": False}, json_file)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_request_and_clear_cancel_round_trip(self):
+        """
+        Test that a cancellation request is seen until it is cleared, and that clearing twice is harmless.
+        """
+        # Given: A simulation that has not been cancelled
+        self.assertFalse(is_cancel_requested(self.json_path))
+
+        # When: The simulation is cancelled
+        request_cancel(self.json_path)
+
+        # Then: The flag file exists and the request is seen
+        self.assertTrue(os.path.exists(cancel_flag_path(self.json_path)))
+        self.assertTrue(is_cancel_requested(self.json_path))
+
+        # When: The request is cleared, twice
+        clear_cancel_request(self.json_path)
+        clear_cancel_request(self.json_path)
+
+        # Then: The request is no longer seen
+        self.assertFalse(is_cancel_requested(self.json_path))
+
+    def test_request_cancel_leaves_json_untouched(self):
+        """
+        Test that cancelling only creates the flag file and never rewrites the json file a worker may be writing.
+        """
+        # Given: A json file being written by a worker
+        with open(self.json_path, "w") as json_file:
+            json_file.write('{"results": [')
+        modified_at = os.path.getmtime(self.json_path)
+
+        # When: The simulation is cancelled and the request cleared
+        request_cancel(self.json_path)
+        self.assertTrue(is_cancel_requested(self.json_path))
+        clear_cancel_request(self.json_path)
+
+        # Then: The json file is unchanged
+        with open(self.json_path, "r") as json_file:
+            self.assertEqual(json_file.read(), '{"results": [')
+        self.assertEqual(os.path.getmtime(self.json_path), modified_at)
+
+    def test_no_json_file_is_never_cancelled(self):
+        """
+        Test that a simulation run without a json file is never seen as cancelled.
+        """
+        self.assertFalse(is_cancel_requested(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from simulation_backend import MeshCache
+
+
+def fake_generate_mesh(geo_file_path, msh_file_path, length_of_mesh):
+    # Writes a mesh depending on the geometry and the characteristic length, like gmsh
+    with open(geo_file_path, "r") as geo_file:
+        geometry = geo_file.read()
+    with open(msh_file_path, "w") as msh_file:
+        msh_file.write(f"{geometry} lc={length_of_mesh}")
+
+
+class MeshCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.geo_path = os.path.join(self.temp_dir.name, "room.geo")
+        self.msh_path = os.path.join(self.temp_dir.name, "room_1.msh")
+        with open(self.geo_path, "w") as geo_file:
+            geo_file.write("Point(1) = {0, 0, 0, 1.0};")
+
+        generate_mesh_patch = patch.object(
+            MeshCache, "generate_mesh", side_effect=fake_generate_mesh
+        )
+        self.generate_mesh = generate_mesh_patch.start()
+        self.addCleanup(generate_mesh_patch.stop)
+        version_patch = patch.object(
+            MeshCache.gmsh, "__version__", "4.13.1", create=True
+        )
+        version_patch.start()
+        self.addCleanup(version_patch.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_mesh(self):
+        with open(self.msh_path, "r") as msh_file:
+            return msh_file.read()
+
+    def test_unchanged_geometry_hits(self):
+        """
+        Test that an unchanged geometry, characteristic length and gmsh version is copied from the cache instead of being meshed again.
+        """
+        # Given: A geometry meshed once
+        self.assertFalse(
+            MeshCache.generate_cached_mesh(self.geo_path, self.msh_path, 1)
+        )
+        os.remove(self.msh_path)
+
+        # When: Meshing it again
+        cache_hit = MeshCache.generate_cached_mesh(self.geo_path, self.msh_path, 1.0)
+
+        # Then: The mesh comes from the cache
+        self.assertTrue(cache_hit)
+        self.assertEqual(self.generate_mesh.call_count, 1)
+        self.assertEqual(self.read_mesh(), "Point(1) = {0, 0, 0, 1.0}; lc=1")
+        self.assertEqual(
+            os.listdir(os.path.join(self.temp_dir.name, MeshCache.MESH_CACHE_FOLDER)),
+            [os.path.basename(MeshCache.cached_mesh_path(self.geo_path, 1))],
+        )
+
+    def test_changed_geometry_length_or_version_misses(self):
+        """
+        Test that a change of the geometry, of the characteristic length or of the gmsh version meshes the geometry again.
+        """
+        # Given: A geometry meshed once
+        MeshCache.generate_cached_mesh(self.geo_path, self.msh_path, 1)
+
+        # When: The characteristic length changes
+        self.assertFalse(
+            MeshCache.generate_cached_mesh(self.geo_path, self.msh_path, 0.5)
+        )
+        self.assertEqual(self.read_mesh(), "Point(1) = {0, 0, 0, 1.0}; lc=0.5")
+
+        # When: The content of the geometry changes
+        with open(self.geo_path, "w") as geo_file:
+            geo_file.write("Point(1) = {0, 0, 1, 1.0};")
+        self.assertFalse(
+            MeshCache.generate_cached_mesh(self.geo_path, self.msh_path, 1)
+        )
+        self.assertEqual(self.read_mesh(), "Point(1) = {0, 0, 1, 1.0}; lc=1")
+
+        # When: The gmsh version changes
+        with patch.object(MeshCache.gmsh, "__version__", "4.14.0", create=True):
+            self.assertFalse(
+                MeshCache.generate_cached_mesh(self.geo_path, self.msh_path, 1)
+            )
+
+        # Then: Every change has been meshed, and the unchanged one hits again
+        self.assertEqual(self.generate_mesh.call_count, 4)
+        self.assertTrue(MeshCache.generate_cached_mesh(self.geo_path, self.msh_path, 1))
+        self.assertEqual(self.generate_mesh.call_count, 4)
+
+    def test_least_recently_used_meshes_are_removed(self):
+        """
+        Test that the cache keeps the most recently used meshes only, a hit counting as a use.
+        """
+        # Given: A cache of two meshes, the first one used last
+        with patch.object(MeshCache, "MESH_CACHE_SIZE", 2):
+            for age, length_of_mesh in ((30, 1), (20, 0.5)):
+                MeshCache.generate_cached_mesh(
+                    self.geo_path, self.msh_path, length_of_mesh
+                )
+                cache_path = MeshCache.cached_mesh_path(self.geo_path, length_of_mesh)
+                os.utime(cache_path, (0, os.path.getmtime(cache_path) - age))
+            self.assertTrue(
+                MeshCache.generate_cached_mesh(self.geo_path, self.msh_path, 1)
+            )
+
+            # When: A third mesh is generated
+            MeshCache.generate_cached_mesh(self.geo_path, self.msh_path, 0.25)
+
+        # Then: The least recently used mesh has been removed
+        self.assertEqual(
+            sorted(
+                os.listdir(
+                    os.path.join(self.temp_dir.name, MeshCache.MESH_CACHE_FOLDER)
+                )
+            ),
+            sorted(
+                os.path.basename(MeshCache.cached_mesh_path(self.geo_path, lc))
+                for lc in (1, 0.25)
+            ),
+        )
+        self.assertFalse(
+            MeshCache.generate_cached_mesh(self.geo_path, self.msh_path, 0.5)
+        )
+
+    def test_prune_cache_missing_folder(self):
+        """
+        Test that pruning a cache folder that does not exist yet does nothing.
+        """
+        MeshCache.prune_cache(os.path.join(self.temp_dir.name, "missing"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
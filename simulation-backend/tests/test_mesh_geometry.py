@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+
+from meshes import cube_mesh, element_face_nodes, two_tet_mesh
+from simulation_backend import DEinterface
+
+
+class MeshGeometryTests(unittest.TestCase):
+    def test_node_row_lookup(self):
+        """
+        Test that the lookup array gives the row of each node tag, and -1 for the missing tags.
+        """
+        node_tags = np.array([12, 3, 7])
+
+        node_rows = DEinterface.node_row_lookup(node_tags)
+
+        np.testing.assert_array_equal(node_rows[[3, 7, 12]], [1, 2, 0])
+        self.assertEqual(node_rows[5], -1)
+
+    def test_tetrahedron_volumes_centres(self):
+        """
+        Test that the vectorised volumes and centres are the ones of the loop over the tetrahedrons.
+        """
+        for node_tags, nodecoords, tet_nodes in (two_tet_mesh(), cube_mesh()):
+            node_rows = DEinterface.node_row_lookup(node_tags)
+
+            cell_volume, cell_center = DEinterface.tetrahedron_volumes_centres(
+                nodecoords[node_rows[tet_nodes]]
+            )
+
+            # Loop over the tetrahedrons, as velem_volume_centre used to do
+            for tet, volume, centre in zip(tet_nodes, cell_volume, cell_center):
+                vc0, vc1, vc2, vc3 = (nodecoords[node_rows[node]] for node in tet)
+                self.assertAlmostEqual(
+                    volume, abs(np.dot(np.cross(vc1 - vc3, vc2 - vc3), vc0 - vc3)) / 6
+                )
+                np.testing.assert_allclose(centre, (vc0 + vc1 + vc2 + vc3) / 4)
+        self.assertAlmostEqual(np.sum(cell_volume), 1)
+
+    def test_triangle_areas_centres_normals(self):
+        """
+        Test that the vectorised areas, centres and normals of the boundary triangles are the ones of the loop.
+        """
+        for node_tags, nodecoords, tet_nodes in (two_tet_mesh(), cube_mesh()):
+            node_rows = DEinterface.node_row_lookup(node_tags)
+            _, _, _, boundary_face_nodes, _ = DEinterface.face_adjacency(
+                element_face_nodes(tet_nodes)
+            )
+
+            barea, centre_area, normal_area = (
+                DEinterface.triangle_areas_centres_normals(
+                    nodecoords[node_rows[boundary_face_nodes]]
+                )
+            )
+
+            # Loop over the triangles
+            for nodes, area, centre, normal in zip(
+                boundary_face_nodes, barea, centre_area, normal_area
+            ):
+                bc0, bc1, bc2 = (nodecoords[node_rows[node]] for node in nodes)
+                cross = np.cross(bc1 - bc0, bc2 - bc0)
+                self.assertAlmostEqual(area, 0.5 * np.linalg.norm(cross))
+                np.testing.assert_allclose(centre, (bc0 + bc1 + bc2) / 3)
+                np.testing.assert_allclose(normal, cross / np.linalg.norm(cross))
+        self.assertAlmostEqual(np.sum(barea), 6)
+
+        # A degenerate triangle has no area and a zero normal
+        barea, _, normal_area = DEinterface.triangle_areas_centres_normals(
+            np.array([[[0, 0, 0], [1, 1, 1], [2, 2, 2]]])
+        )
+        self.assertEqual(barea[0], 0)
+        np.testing.assert_array_equal(normal_area, [[0, 0, 0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
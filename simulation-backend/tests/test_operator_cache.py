@@ -0,0 +1,172 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from simulation_backend import DEinterface
+
+
+class OperatorCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.msh_path = os.path.join(self.temp_dir.name, "room_1.msh")
+        with open(self.msh_path, "w") as msh_file:
+            msh_file.write("$MeshFormat\n4.1 0 8\n$EndMeshFormat\n")
+        self.operators = {
+            "nodecoords": np.random.default_rng(0).random((5, 3)),
+            "velemNodes": np.arange(8, dtype=np.uint64).reshape(2, 4),
+            "interior_tet_indptr": np.array([0, 1, 2], dtype=np.int32),
+            "surface_entities": np.array([11, 12]),
+        }
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def cache_path(self, key):
+        return DEinterface.operator_cache_path(self.msh_path, key)
+
+    def test_save_then_load_round_trips_every_array(self):
+        """
+        Test that every saved operator is loaded back with its values and dtype.
+        """
+        # Given: The operators of a mesh saved in the cache
+        key = DEinterface.mesh_file_key(self.msh_path)
+        DEinterface.save_operator_cache(self.cache_path(key), key, **self.operators)
+
+        # When: Loading the cache of the same mesh
+        loaded = DEinterface.load_operator_cache(self.cache_path(key), key)
+
+        # Then: Every array is loaded back unchanged
+        self.assertEqual(set(loaded), set(self.operators) | {"key"})
+        for name, array in self.operators.items():
+            self.assertEqual(loaded[name].dtype, array.dtype)
+            np.testing.assert_array_equal(loaded[name], array)
+
+    def test_other_mesh_or_cache_version_misses(self):
+        """
+        Test that the cache of a mesh is not used for a mesh with other content or by another cache version.
+        """
+        # Given: The operators of a mesh saved in the cache
+        key = DEinterface.mesh_file_key(self.msh_path)
+        DEinterface.save_operator_cache(self.cache_path(key), key, **self.operators)
+
+        # When: The mesh file changes
+        with open(self.msh_path, "a") as msh_file:
+            msh_file.write("$Nodes\n$EndNodes\n")
+        changed_key = DEinterface.mesh_file_key(self.msh_path)
+
+        # Then: Its key and cache path change, so the cache misses
+        self.assertNotEqual(changed_key, key)
+        self.assertIsNone(
+            DEinterface.load_operator_cache(self.cache_path(changed_key), changed_key)
+        )
+
+        # When: The version of the cache changes
+        with patch.object(
+            DEinterface,
+            "OPERATOR_CACHE_VERSION",
+            DEinterface.OPERATOR_CACHE_VERSION + 1,
+        ):
+            versioned_key = DEinterface.mesh_file_key(self.msh_path)
+
+        # Then: The key changes as well
+        self.assertNotIn(versioned_key, (key, changed_key))
+
+        # Then: A cache file saved under another key is not used either
+        self.assertIsNone(
+            DEinterface.load_operator_cache(self.cache_path(key), "other")
+        )
+
+    def test_truncated_or_corrupt_cache_is_rebuilt(self):
+        """
+        Test that a truncated or corrupt cache file is not used, so de_method rebuilds the operators.
+        """
+        # Given: A saved cache file
+        key = DEinterface.mesh_file_key(self.msh_path)
+        cache_path = self.cache_path(key)
+        DEinterface.save_operator_cache(cache_path, key, **self.operators)
+        with open(cache_path, "rb") as cache_file:
+            content = cache_file.read()
+
+        # When: The file is truncated
+        with open(cache_path, "wb") as cache_file:
+            cache_file.write(content[: len(content) // 2])
+
+        # Then: The cache misses
+        with self.assertLogs(DEinterface.logger, level="WARNING"):
+            self.assertIsNone(DEinterface.load_operator_cache(cache_path, key))
+
+        # When: The file is not an npz archive at all
+        with open(cache_path, "wb") as cache_file:
+            cache_file.write(b"not a cache")
+
+        # Then: The cache misses
+        with self.assertLogs(DEinterface.logger, level="WARNING"):
+            self.assertIsNone(DEinterface.load_operator_cache(cache_path, key))
+
+    def test_save_goes_through_replace(self):
+        """
+        Test that the cache is written to a temporary file moved in place, and that a failed write leaves no file behind.
+        """
+        key = DEinterface.mesh_file_key(self.msh_path)
+        cache_path = self.cache_path(key)
+
+        # When: Saving the cache
+        with patch.object(
+            DEinterface.os, "replace", wraps=DEinterface.os.replace
+        ) as replace:
+            DEinterface.save_operator_cache(cache_path, key, **self.operators)
+
+        # Then: The file has been moved in place and no temporary file is left
+        replace.assert_called_once()
+        self.assertEqual(replace.call_args.args[1], cache_path)
+        self.assertEqual(os.listdir(os.path.dirname(cache_path)), [key + ".npz"])
+
+        # When: Writing the cache of another mesh fails halfway
+        other_path = self.cache_path("other")
+
+        def failing_savez(cache_file, **arrays):
+            cache_file.write(b"PK")
+            raise OSError("No space left on device")
+
+        with patch.object(DEinterface.np, "savez", side_effect=failing_savez):
+            with self.assertLogs(DEinterface.logger, level="WARNING"):
+                DEinterface.save_operator_cache(other_path, "other", **self.operators)
+
+        # Then: Neither a partial cache nor a temporary file is left
+        self.assertEqual(os.listdir(os.path.dirname(cache_path)), [key + ".npz"])
+
+    def test_least_recently_used_caches_are_removed(self):
+        """
+        Test that the cache folder keeps the most recently used cache files only, a load counting as a use.
+        """
+        # Given: The caches of two meshes, the first one loaded last
+        with patch.object(DEinterface, "OPERATOR_CACHE_SIZE", 2):
+            for age, key in ((30, "first"), (20, "second")):
+                DEinterface.save_operator_cache(
+                    self.cache_path(key), key, **self.operators
+                )
+                os.utime(
+                    self.cache_path(key),
+                    (0, os.path.getmtime(self.cache_path(key)) - age),
+                )
+            self.assertIsNotNone(
+                DEinterface.load_operator_cache(self.cache_path("first"), "first")
+            )
+
+            # When: The cache of a third mesh is saved
+            DEinterface.save_operator_cache(
+                self.cache_path("third"), "third", **self.operators
+            )
+
+        # Then: The least recently used cache file has been removed
+        self.assertEqual(
+            sorted(os.listdir(os.path.dirname(self.cache_path("first")))),
+            ["first.npz", "third.npz"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
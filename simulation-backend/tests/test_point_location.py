@@ -0,0 +1,72 @@
+import unittest
+
+import numpy as np
+from scipy.spatial import Delaunay, cKDTree
+
+from meshes import cube_mesh
+from simulation_backend import DEinterface
+
+
+def baseline_nearest_cell_weights(cell_center, point):
+    # Sorted distances to all the cell centres, as source_interp used to do
+    dist = [np.sqrt(np.sum((centre - point) ** 2)) for centre in cell_center]
+    cells = np.argsort(dist)[:4]
+    weights = np.array([1.0 / dist[cell] for cell in cells])
+    return cells, weights / np.sum(weights)
+
+
+class PointLocationTests(unittest.TestCase):
+    def test_nearest_cell_weights(self):
+        """
+        Test that the KD-tree inverse distance weights are the ones of the sorted distances, and that a point on a centre gets all the weight.
+        """
+        # Given: The cell centres of the cube mesh and points inside it
+        node_tags, nodecoords, tet_nodes = cube_mesh()
+        node_rows = DEinterface.node_row_lookup(node_tags)
+        _, cell_center = DEinterface.tetrahedron_volumes_centres(
+            nodecoords[node_rows[tet_nodes]]
+        )
+        points = np.random.default_rng(0).random((20, 3))
+
+        # When: Computing the weights of the four closest cells
+        cells, weights = DEinterface.nearest_cell_weights(cKDTree(cell_center), points)
+
+        # Then: They are the ones of the loop over all the cells
+        for point, point_cells, point_weights in zip(points, cells, weights):
+            expected_cells, expected_weights = baseline_nearest_cell_weights(
+                cell_center, point
+            )
+            np.testing.assert_array_equal(point_cells, expected_cells)
+            np.testing.assert_allclose(point_weights, expected_weights, rtol=1e-12)
+
+        cells, weights = DEinterface.nearest_cell_weights(
+            cKDTree(cell_center), cell_center[2]
+        )
+        self.assertEqual(cells[0, 0], 2)
+        np.testing.assert_array_equal(weights, [[1, 0, 0, 0]])
+
+    def test_containing_tetrahedra(self):
+        """
+        Test that the tetrahedron containing each point is the simplex of scipy's Delaunay, with -1 outside the mesh.
+        """
+        # Given: A Delaunay mesh of the cube and points inside and outside it
+        rng = np.random.default_rng(0)
+        _, corners, _ = cube_mesh()
+        nodecoords = np.vstack((corners, rng.random((30, 3))))
+        delaunay = Delaunay(nodecoords)
+        tet_nodes = delaunay.simplices
+        cell_tree = cKDTree(nodecoords[tet_nodes].mean(axis=1))
+        points = np.vstack((rng.random((200, 3)), [[1.5, 0.5, 0.5], [-0.1, 0, 0]]))
+
+        for k in (8, 2):
+            # When: Locating the points, with enough candidates and with too few of them
+            tets = DEinterface.containing_tetrahedra(
+                cell_tree, points, nodecoords, tet_nodes, k=k
+            )
+
+            # Then: Each point is in the simplex scipy finds
+            np.testing.assert_array_equal(tets, delaunay.find_simplex(points))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from simulation_backend.Progress import (
+    clear_progress,
+    progress_path,
+    read_progress,
+    set_progress_listener,
+    write_progress,
+)
+
+
+class ProgressTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.temp_dir.name, "room_1.json")
+
+    def tearDown(self):
+        set_progress_listener(None)
+        self.temp_dir.cleanup()
+
+    def test_write_progress_is_read_back_without_tmp_file(self):
+        """
+        Test that a progress record is read back as written, and that the write leaves no temporary file behind.
+        """
+        # When: Writing the progress twice
+        write_progress(self.json_path, 10, "preprocessing")
+        write_progress(
+            self.json_path, 42, "solving", band=[125.0], eta=3.5, steps_per_second=80.0
+        )
+
+        # Then: The last record is read back and only the progress file is left next to the json file
+        self.assertEqual(
+            read_progress(self.json_path),
+            {
+                "percentage": 42,
+                "stage": "solving",
+                "band": [125.0],
+                "eta": 3.5,
+                "steps_per_second": 80.0,
+            },
+        )
+        self.assertEqual(
+            os.listdir(self.temp_dir.name),
+            [os.path.basename(progress_path(self.json_path))],
+        )
+
+    def test_read_progress_missing_or_corrupt_file(self):
+        """
+        Test that a missing or corrupt progress file is read as no progress.
+        """
+        # Given: No progress file
+        self.assertIsNone(read_progress(self.json_path))
+
+        # Given: A corrupt progress file
+        with open(progress_path(self.json_path), "w") as progress_file:
+            progress_file.write('{"percentage": 4')
+
+        # Then: It is read as no progress, and can be removed
+        self.assertIsNone(read_progress(self.json_path))
+        clear_progress(self.json_path)
+        clear_progress(self.json_path)
+        self.assertFalse(os.path.exists(progress_path(self.json_path)))
+
+    def test_progress_listener_percentages_are_monotonic(self):
+        """
+        Test that the listener never sees the percentage of a simulation go back, even when the writes arrive out of order.
+        """
+        # Given: A listener recording the percentages of two simulations
+        other_json_path = os.path.join(self.temp_dir.name, "room_2.json")
+        received = []
+        lock = threading.Lock()
+
+        def listener(json_file_path, percentage, stage):
+            with lock:
+                received.append((json_file_path, percentage, stage))
+
+        set_progress_listener(listener)
+
+        # When: Writing percentages out of order
+        for percentage in (10, 30, 20, 50, 40):
+            write_progress(self.json_path, percentage, "solving")
+        write_progress(other_json_path, 5, "solving")
+
+        # Then: The listener sees non-decreasing percentages per simulation, while the file keeps the last write
+        self.assertEqual(
+            [percentage for path, percentage, _ in received if path == self.json_path],
+            [10, 30, 30, 50, 50],
+        )
+        self.assertEqual(received[-1], (other_json_path, 5, "solving"))
+        self.assertEqual(read_progress(self.json_path)["percentage"], 40)
+
+        # When: A new listener is registered, e.g. for the next run of the simulation
+        received.clear()
+        set_progress_listener(listener)
+        write_progress(self.json_path, 0, "preprocessing")
+
+        # Then: The percentage starts over
+        self.assertEqual(received, [(self.json_path, 0, "preprocessing")])
+
+    def test_no_json_file_writes_nothing(self):
+        """
+        Test that the progress of a simulation run without a json file is neither written nor passed to the listener.
+        """
+        received = []
+        set_progress_listener(lambda *args: received.append(args))
+
+        write_progress(None, 50, "solving")
+
+        self.assertEqual(received, [])
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
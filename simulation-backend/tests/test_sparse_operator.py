@@ -0,0 +1,275 @@
+import itertools
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from meshes import cube_mesh, cube_surface_entities, element_face_nodes, two_tet_mesh
+from simulation_backend import DEinterface
+
+
+def baseline_interior_tet(nodecoords, node_rows, tet_nodes, cell_center):
+    # Dense loop over all the pairs of tetrahedrons, as de_method used to build it
+    n_tets = len(tet_nodes)
+    interior_tet = np.zeros((n_tets, n_tets))
+    for i in range(n_tets):
+        for j in range(n_tets):
+            shared_nodes = np.intersect1d(tet_nodes[i], tet_nodes[j])
+            if i != j and len(shared_nodes) == 3:
+                sc0, sc1, sc2 = (nodecoords[node_rows[node]] for node in shared_nodes)
+                shared_area = np.linalg.norm(np.cross(sc2 - sc0, sc1 - sc0)) / 2
+                shared_distance = np.linalg.norm(cell_center[i] - cell_center[j])
+                interior_tet[i, j] = shared_area / shared_distance
+    return interior_tet, np.sum(interior_tet, axis=1)
+
+
+def baseline_face_incidence(facenodes, voluEl):
+    # Face x tetrahedron dictionaries and neighbour table, as get_neighbour_faces used to build them
+    faces = []
+    fxt = {}
+    for i in range(0, len(facenodes), 3):
+        f = tuple(sorted(facenodes[i : i + 3]))
+        faces.append(f)
+        fxt.setdefault(f, []).append(voluEl[i // 12])
+
+    txt = {}
+    for i, f in enumerate(faces):
+        tet = voluEl[i // 4]
+        txt.setdefault(tet, [])
+        for tt in fxt[f]:
+            if tt != tet:
+                txt[tet].append(int(tt - (voluEl[0] - 1)))
+    for values in txt.values():
+        while len(values) < 4:
+            values.append(0)
+
+    return fxt, np.array([txt[key] for key in txt], dtype=float).reshape((-1, 4))
+
+
+def baseline_match_faces(faces, reference):
+    # Sorted node comparison with every reference face, as boundary_triang used to do
+    matches = []
+    for nodes in faces:
+        match = -1
+        for surface_idx, surface in enumerate(reference):
+            if sorted(set(nodes)) == sorted(set(surface)):
+                match = surface_idx
+        matches.append(match)
+    return np.array(matches)
+
+
+def baseline_boundary_areas(
+    nodecoords, node_rows, tet_nodes, boundary_triangles, triangle_face_absorption
+):
+    # Loop over the faces of each tetrahedron, as boundary_triang used to do
+    boundary_areas = []
+    total_boundArea = 0
+    for element in tet_nodes:
+        tetrahedron_boundary_areas = np.zeros(len(triangle_face_absorption[0]))
+        for nodes in itertools.combinations(element, 3):
+            for surface_idx, surface in enumerate(boundary_triangles):
+                if sorted(set(nodes)) == sorted(set(surface)):
+                    bc0, bc1, bc2 = (nodecoords[node_rows[node]] for node in nodes)
+                    face_area = 0.5 * np.linalg.norm(np.cross(bc1 - bc0, bc2 - bc0))
+                    total_boundArea += face_area
+                    tetrahedron_boundary_areas += (
+                        face_area * triangle_face_absorption[surface_idx]
+                    )
+        boundary_areas.append(tetrahedron_boundary_areas)
+    return np.array(boundary_areas).T, total_boundArea
+
+
+def mesh_operands(mesh):
+    node_tags, nodecoords, tet_nodes = mesh
+    node_rows = {tag: row for row, tag in enumerate(node_tags)}
+    cell_center = np.array(
+        [[nodecoords[node_rows[node]] for node in tet] for tet in tet_nodes]
+    ).mean(axis=1)
+    return nodecoords, node_rows, tet_nodes, cell_center
+
+
+class SparseOperatorTests(unittest.TestCase):
+    def test_conductance_matrix(self):
+        """
+        Test that the sparse conductance operator built from the interior faces equals the dense pairwise matrix.
+        """
+        for mesh in (two_tet_mesh(), cube_mesh()):
+            # Given: The interior faces of a mesh, found by comparing all the pairs of tetrahedrons
+            nodecoords, node_rows, tet_nodes, cell_center = mesh_operands(mesh)
+            face_tets = [
+                (i, j)
+                for i in range(len(tet_nodes))
+                for j in range(i + 1, len(tet_nodes))
+                if len(np.intersect1d(tet_nodes[i], tet_nodes[j])) == 3
+            ]
+            face_coords = [
+                [
+                    nodecoords[node_rows[node]]
+                    for node in np.intersect1d(tet_nodes[i], tet_nodes[j])
+                ]
+                for i, j in face_tets
+            ]
+
+            # When: Building the sparse operator
+            interior_tet, interior_tet_sum = DEinterface.conductance_matrix(
+                face_tets, face_coords, cell_center
+            )
+
+            # Then: It is the dense matrix of the pairwise loop
+            expected, expected_sum = baseline_interior_tet(
+                nodecoords, node_rows, tet_nodes, cell_center
+            )
+            np.testing.assert_allclose(interior_tet.toarray(), expected, rtol=1e-12)
+            np.testing.assert_allclose(interior_tet_sum, expected_sum, rtol=1e-12)
+            self.assertEqual(interior_tet.nnz, 2 * len(face_tets))
+
+    def test_face_adjacency(self):
+        """
+        Test that the vectorised face incidence gives the faces and the neighbour table of the dictionary loops.
+        """
+        for mesh in (two_tet_mesh(), cube_mesh()):
+            # Given: The face nodes of the tetrahedrons, numbered from an element tag other than 1
+            _, _, tet_nodes = mesh
+            facenodes = element_face_nodes(tet_nodes)
+            voluEl = np.arange(len(tet_nodes)) + 101
+
+            # When: Extracting the face incidence
+            (
+                face_tets,
+                interior_face_nodes,
+                boundary_tets,
+                boundary_face_nodes,
+                neighbourVolume,
+            ) = DEinterface.face_adjacency(facenodes)
+
+            # Then: The faces and their tetrahedrons are the ones of the dictionaries, and so is the neighbour table
+            fxt, expected_neighbours = baseline_face_incidence(facenodes, voluEl)
+            interior = {
+                face: sorted(int(tet - voluEl[0]) for tet in tets)
+                for face, tets in fxt.items()
+                if len(tets) == 2
+            }
+            boundary = {
+                face: int(tets[0] - voluEl[0])
+                for face, tets in fxt.items()
+                if len(tets) == 1
+            }
+            self.assertEqual(
+                {
+                    tuple(face): sorted(tets.tolist())
+                    for face, tets in zip(interior_face_nodes, face_tets)
+                },
+                interior,
+            )
+            self.assertEqual(
+                {
+                    tuple(face): tet
+                    for face, tet in zip(boundary_face_nodes, boundary_tets)
+                },
+                boundary,
+            )
+            np.testing.assert_array_equal(neighbourVolume, expected_neighbours)
+
+    def test_match_faces(self):
+        """
+        Test that the keyed join of the faces gives the reference row of the sorted node comparison, also for node tags too large to pack.
+        """
+        rng = np.random.default_rng(0)
+        for tag_offset in (10, 3_000_000):
+            # Given: The faces of all the tetrahedrons and the boundary triangles, in another order and node order
+            _, _, tet_nodes = cube_mesh(tag_offset)
+            faces = element_face_nodes(tet_nodes).reshape((-1, 3))
+            _, _, _, boundary_face_nodes, _ = DEinterface.face_adjacency(faces)
+            reference = rng.permuted(rng.permutation(boundary_face_nodes), axis=1)
+
+            # When: Matching the faces with the boundary triangles
+            surface_idx = DEinterface.match_faces(faces, reference)
+
+            # Then: Each boundary face finds its triangle and the interior faces none
+            np.testing.assert_array_equal(
+                surface_idx, baseline_match_faces(faces, reference)
+            )
+            self.assertEqual(np.count_nonzero(surface_idx >= 0), 12)
+
+        np.testing.assert_array_equal(
+            DEinterface.match_faces(faces, np.empty((0, 3))), -np.ones(len(faces))
+        )
+
+    def test_boundary_entity_area_matrix(self):
+        """
+        Test that the per-entity boundary area times the absorption of the entities gives the absorption area of the per-tetrahedron loop, with one material per side of the cube.
+        """
+        # Given: The cube with a material per side and an entity without triangles
+        node_tags, nodecoords, tet_nodes = cube_mesh()
+        node_rows = {tag: row for row, tag in enumerate(node_tags)}
+        boundary_triangles, triangles_per_entity = cube_surface_entities()
+        entity_absorption = np.random.default_rng(0).random(
+            (len(triangles_per_entity), 5)
+        )  # absorption term per band of each entity
+        triangle_face_absorption = np.repeat(
+            entity_absorption, triangles_per_entity, axis=0
+        )  # absorption term of each triangle, as surface_materials builds it
+
+        # When: Building the boundary area per entity and the absorption area
+        boundary_entity_area, total_boundArea = DEinterface.boundary_entity_area_matrix(
+            tet_nodes,
+            DEinterface.node_row_lookup(node_tags),
+            nodecoords,
+            boundary_triangles,
+            triangles_per_entity,
+        )
+        boundary_areas = (boundary_entity_area @ entity_absorption).T
+
+        # Then: They are the ones of the loop over the faces of each tetrahedron
+        expected_areas, expected_total = baseline_boundary_areas(
+            nodecoords,
+            node_rows,
+            tet_nodes,
+            boundary_triangles,
+            triangle_face_absorption,
+        )
+        np.testing.assert_allclose(boundary_areas, expected_areas, rtol=1e-12)
+        self.assertAlmostEqual(total_boundArea, expected_total)
+        self.assertAlmostEqual(total_boundArea, 6)
+        np.testing.assert_allclose(
+            np.asarray(boundary_entity_area.sum(axis=0)).ravel(),
+            [1, 1, 1, 1, 1, 1, 0],
+        )
+
+    def test_sparse_matmul_into(self):
+        """
+        Test that the in-place product equals the sparse product, for arrays the kernel takes and for the ones it does not.
+        """
+        # Given: A sparse operator and state matrices of several layouts and dtypes
+        nodecoords, node_rows, tet_nodes, cell_center = mesh_operands(cube_mesh())
+        matrix = csr_matrix(
+            baseline_interior_tet(nodecoords, node_rows, tet_nodes, cell_center)[0]
+        )
+        dense = np.random.default_rng(0).random((len(tet_nodes), 3))
+        expected = matrix @ dense
+        cases = [
+            (dense, np.full((6, 3), np.nan)),
+            (dense, np.full((3, 6), np.nan).T),
+            (dense, np.full((6, 3), np.nan, dtype=np.float32)),
+            (np.asfortranarray(dense), np.full((6, 3), np.nan)),
+            (dense.astype(np.float32), np.full((6, 3), np.nan)),
+        ]
+
+        for operand, out in cases:
+            # When: Computing the product into the output array
+            result = DEinterface.sparse_matmul_into(matrix, operand, out)
+
+            # Then: The output array holds the product
+            self.assertIs(result, out)
+            np.testing.assert_allclose(out, expected, rtol=1e-6)
+
+        # Without the private scipy kernel, the public product is used
+        out = np.full((6, 3), np.nan)
+        with patch.object(DEinterface, "_sparsetools", None):
+            DEinterface.sparse_matmul_into(matrix, dense, out)
+        np.testing.assert_allclose(out, expected, rtol=1e-12)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+import unittest
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from meshes import element_face_nodes, two_tet_mesh
+from simulation_backend import DEinterface
+
+C0 = 343.0
+DT = 1e-5
+SOURCE_ON_STEPS = 1000
+RECORDING_STEPS = 4000
+
+
+class TimeIntegrationTests(unittest.TestCase):
+    def setUp(self):
+        # Two tetrahedrons sharing a face, the source in the first one and the receiver in the second one
+        node_tags, nodecoords, tet_nodes = two_tet_mesh()
+        node_rows = DEinterface.node_row_lookup(node_tags)
+        self.cell_volume, cell_center = DEinterface.tetrahedron_volumes_centres(
+            nodecoords[node_rows[tet_nodes]]
+        )
+        face_tets, interior_face_nodes, _, _, _ = DEinterface.face_adjacency(
+            element_face_nodes(tet_nodes)
+        )
+        self.interior_tet, self.interior_tet_sum = DEinterface.conductance_matrix(
+            face_tets, nodecoords[node_rows[interior_face_nodes]], cell_center
+        )
+        self.Dx = C0 * 0.5 / 3
+        self.air_absorption = C0 * 0.001
+        # Absorption weighted boundary area of each tetrahedron, for two bands
+        self.boundary_areas = [np.array([20.0, 30.0]), np.array([60.0, 10.0])]
+        self.source_weights = np.array([1.0 / self.cell_volume[0], 0.0])
+        self.receiver_weights = csr_matrix(np.array([[0.0, 1.0]]))
+
+    def explicit(self, early_stop=None):
+        beta = np.column_stack(
+            [
+                DT
+                * (self.Dx * self.interior_tet_sum + boundary_area)
+                / self.cell_volume
+                for boundary_area in self.boundary_areas
+            ]
+        )
+        source_strength = np.where(np.arange(RECORDING_STEPS) < SOURCE_ON_STEPS, 1.0, 0)
+        return DEinterface.dufort_frankel_time_loop(
+            self.interior_tet,
+            beta,
+            self.cell_volume,
+            self.Dx,
+            DT,
+            self.air_absorption,
+            self.source_weights,
+            source_strength,
+            self.receiver_weights,
+            lambda steps, total_steps: False,
+            early_stop=early_stop,
+        )
+
+    def implicit(self, theta, dt_implicit, early_stop=None):
+        system_operators = [
+            DEinterface.diffusion_operator(
+                self.interior_tet,
+                self.interior_tet_sum,
+                boundary_area,
+                self.cell_volume,
+                self.Dx,
+                self.air_absorption,
+            )
+            for boundary_area in self.boundary_areas
+        ]
+        implicit_steps = round(RECORDING_STEPS * DT / dt_implicit)
+        t_implicit = np.arange(implicit_steps + 1) * dt_implicit
+        source_strength = np.where(t_implicit < SOURCE_ON_STEPS * DT, 1.0, 0)
+        w, w_rec_implicit = DEinterface.theta_scheme_time_loop(
+            system_operators,
+            self.cell_volume,
+            theta,
+            dt_implicit,
+            self.source_weights,
+            source_strength,
+            self.receiver_weights,
+            lambda steps, total_steps: False,
+            early_stop=early_stop,
+        )
+        return w, DEinterface.resample_receivers(
+            w_rec_implicit, dt_implicit, DT, RECORDING_STEPS
+        )
+
+    def test_diffusion_operator(self):
+        """
+        Test that the operator of the implicit schemes is the dense diffusion, boundary and air absorption operator.
+        """
+        for boundary_area in self.boundary_areas:
+            operator = DEinterface.diffusion_operator(
+                self.interior_tet,
+                self.interior_tet_sum,
+                boundary_area,
+                self.cell_volume,
+                self.Dx,
+                self.air_absorption,
+            )
+
+            expected = self.Dx * self.interior_tet.toarray() - np.diag(
+                self.Dx * self.interior_tet.toarray().sum(axis=1)
+                + boundary_area
+                + self.air_absorption * self.cell_volume
+            )
+            np.testing.assert_allclose(operator.toarray(), expected, rtol=1e-12)
+            np.testing.assert_allclose(operator.toarray(), operator.toarray().T)
+
+    def test_implicit_integrators_match_explicit_scheme(self):
+        """
+        Test that the Crank-Nicolson and backward Euler loops give the receiver curves of the explicit scheme.
+        """
+        # Given: The explicit scheme at a small time step
+        _, w_rec_explicit = self.explicit()
+        peak = w_rec_explicit.max(axis=0)
+
+        for theta, dt_implicit, tolerance in ((0.5, 4 * DT, 5e-3), (1.0, DT, 5e-3)):
+            # When: Integrating with the implicit scheme
+            _, w_rec = self.implicit(theta, dt_implicit)
+
+            # Then: The receivers follow the explicit scheme, at the same output times
+            self.assertEqual(w_rec.shape, w_rec_explicit.shape)
+            self.assertLess(
+                np.max(np.abs(w_rec - w_rec_explicit) / peak), tolerance, msg=theta
+            )
+
+    def test_early_stop(self):
+        """
+        Test that the early stop cuts the explicit and implicit loops once every receiver has decayed by the level, and nothing before.
+        """
+        # Given: The full loops and a level of 15 dB below the energy density when the source stops
+        level = 10 ** (-15 / 10)
+        interval = 100
+        _, w_rec_explicit = self.explicit()
+        _, w_rec_implicit = self.implicit(0.5, DT)
+
+        # When: Stopping the loops early
+        _, w_rec_explicit_stopped = self.explicit(
+            early_stop=(SOURCE_ON_STEPS, interval, level)
+        )
+        _, w_rec_implicit_stopped = self.implicit(
+            0.5, DT, early_stop=(SOURCE_ON_STEPS, level)
+        )
+
+        # Then: The stopped loops are the start of the full ones, up to the first check below the level
+        source_off = w_rec_explicit[SOURCE_ON_STEPS]
+        stop = len(w_rec_explicit_stopped) - 1
+        self.assertLess(stop, RECORDING_STEPS - 1)
+        self.assertEqual((stop - SOURCE_ON_STEPS) % interval, 0)
+        np.testing.assert_array_equal(
+            w_rec_explicit_stopped, w_rec_explicit[: stop + 1]
+        )
+        self.assertTrue(np.all(w_rec_explicit[stop] <= source_off * level))
+        self.assertFalse(np.all(w_rec_explicit[stop - interval] <= source_off * level))
+
+        # The implicit loop checks every time level; its sample n is the level n + 1, as DT is the output step
+        source_off = w_rec_implicit[SOURCE_ON_STEPS - 1]
+        stop = len(w_rec_implicit_stopped) - 1
+        self.assertLess(stop, RECORDING_STEPS - 1)
+        np.testing.assert_allclose(
+            w_rec_implicit_stopped, w_rec_implicit[: stop + 1], rtol=1e-12
+        )
+        self.assertTrue(np.all(w_rec_implicit[stop] <= source_off * level))
+        self.assertFalse(np.all(w_rec_implicit[stop - 1] <= source_off * level))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from simulation_backend.TimeSeries import (
+    edc_reference,
+    load_receiver_results,
+    read_edc,
+    write_time_series,
+)
+
+
+class TimeSeriesTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.temp_dir.name, "room_1.json")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_curves_stopped_early_are_read_without_padding(self):
+        """
+        Test that a curve shorter than the time axis, e.g. of a band stopped early, is read at its own length, without the NaN padding.
+        """
+        # Given: Two curves sharing the time axis of the longer one
+        t = np.arange(5) * 0.1
+        edc_rows = [np.array([90.0, 80, 70, 60, 50]), np.array([90.0, 75, 60])]
+        write_time_series(self.json_path, t, [125, 250], edc_rows, np.zeros((2, 5)))
+        results = [
+            {
+                "responses": [
+                    {
+                        "receiverResults": [
+                            edc_reference(125, 0, len(edc_rows[0])),
+                            edc_reference(250, 1, len(edc_rows[1])),
+                        ]
+                    }
+                ]
+            }
+        ]
+
+        # When: Reading the curves back
+        t_short, edc_short = read_edc(self.json_path, 1, len(edc_rows[1]))
+        load_receiver_results(self.json_path, results)
+
+        # Then: Each curve has its own length and only finite values, so it can be dumped to json
+        np.testing.assert_array_equal(edc_short, edc_rows[1])
+        np.testing.assert_allclose(t_short, t[:3], rtol=1e-6)
+        receiver_results = results[0]["responses"][0]["receiverResults"]
+        self.assertEqual([len(result["data"]) for result in receiver_results], [5, 3])
+        self.assertEqual([len(result["t"]) for result in receiver_results], [5, 3])
+        json.dumps(results, allow_nan=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from app.factory.export_factory.ExportHelper import ExportHelper
+
+
+class ExportHelperUnitTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.temp_dir.name, "room_1.json")
+        self.xlsx_path = os.path.join(self.temp_dir.name, "room_1.xlsx")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_parse_json_file_to_xlsx_file_reads_only_exported_curves(self):
+        """
+        Test that the xlsx export only reads the curves of the first response, and leaves the end of a shorter curve
+        empty.
+        """
+        from simulation_backend import TimeSeries
+
+        # Given: Two sources with their curves in the time series files, one curve stopped early
+        t = np.arange(4) * 0.1
+        edc_rows = [[90, 80, 70, 60], [90, 70], [50, 40, 30, 20], [50, 30, 10, 0]]
+        TimeSeries.write_time_series(self.json_path, t, [125, 250], edc_rows, np.zeros((2, 4)))
+        parameters = {"edt": [1.0, 1.1], "t30": [1.2, 1.3]}
+        results = [
+            {
+                "responses": [
+                    {
+                        "parameters": parameters,
+                        "receiverResults": [
+                            TimeSeries.edc_reference(frequency, row, len(edc_rows[row]))
+                            for frequency, row in ((125, first_row), (250, first_row + 1))
+                        ],
+                    }
+                ]
+            }
+            for first_row in (0, 2)
+        ]
+        with open(self.json_path, "w") as json_file:
+            json.dump({"results": results}, json_file)
+
+        # When: Exporting the results
+        with patch.object(TimeSeries, "read_edc", wraps=TimeSeries.read_edc) as read_edc:
+            exported = ExportHelper.parse_json_file_to_xlsx_file(self.json_path, self.xlsx_path)
+
+        # Then: Only the two curves of the first response are read, and exported with the longest time axis
+        self.assertTrue(exported)
+        self.assertEqual(sorted(call.args[1] for call in read_edc.call_args_list), [0, 1])
+        edc_sheet = pd.read_excel(self.xlsx_path, sheet_name="EDC")
+        np.testing.assert_allclose(edc_sheet["t"], t, rtol=1e-6)
+        self.assertEqual(edc_sheet["125Hz"].tolist(), [90, 80, 70, 60])
+        self.assertEqual(edc_sheet["250Hz"].tolist()[:2], [90, 70])
+        self.assertTrue(edc_sheet["250Hz"][2:].isna().all())
+
+
+if __name__ == "__main__":
+    unittest.main()
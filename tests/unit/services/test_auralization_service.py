@@ -1,3 +1,4 @@
+import os
 import shutil
 import unittest
 from io import BytesIO
@@ -146,6 +147,79 @@ class UsersUnitTests(BaseTestCase):
             self.db.session.commit()
             self.assertRaises(HTTPException, auralization_service.get_impulse_response_plot, simulation_id)
 
+    def test_get_impulse_response_plot_decimated(self):
+        """
+        Test that the impulse response plot is decimated to maxPoints within [tStart, tEnd].
+        """
+        with self.app.app_context():
+            simulation: Simulation = Simulation(name="test", solverSettings={}, modelId=1, status=Status.Completed)
+            self.db.session.add(simulation)
+            self.db.session.commit()
+            simulation_id = simulation.id
+
+            export: Export = Export(name="test.xlsx", simulationId=simulation_id)
+            self.db.session.add(export)
+            self.db.session.commit()
+
+            test_file_path = Path('tests', 'unit', 'services', 'data', 'test.xlsx')
+            temp_destination = Path(DefaultConfig.UPLOAD_FOLDER_NAME)
+            temp_destination.mkdir(parents=True, exist_ok=True)
+            temp_file_path = Path(shutil.copy(test_file_path, temp_destination))
+
+            full_plot = auralization_service.get_impulse_response_plot(simulation_id)
+            impulse_response_plot = auralization_service.get_impulse_response_plot(
+                simulation_id, max_points=100, t_start=0.01, t_end=0.5
+            )
+
+            self.assertLessEqual(len(impulse_response_plot['impulseResponse']), 100)
+            self.assertEqual(len(impulse_response_plot['t']), len(impulse_response_plot['impulseResponse']))
+            self.assertGreaterEqual(min(impulse_response_plot['t']), 0.01)
+            self.assertLessEqual(max(impulse_response_plot['t']), 0.5)
+            self.assertNotIn('t', full_plot)
+
+            temp_file_path.unlink()
+
+    def test_get_impulse_response_plot_decimated_cache(self):
+        """
+        Test that the cached decimated plot is returned as a copy and refreshed when the export is rewritten.
+        """
+        with self.app.app_context():
+            simulation: Simulation = Simulation(name="test", solverSettings={}, modelId=1, status=Status.Completed)
+            self.db.session.add(simulation)
+            self.db.session.commit()
+            simulation_id = simulation.id
+
+            export: Export = Export(name="test.xlsx", simulationId=simulation_id)
+            self.db.session.add(export)
+            self.db.session.commit()
+
+            test_file_path = Path('tests', 'unit', 'services', 'data', 'test.xlsx')
+            temp_destination = Path(DefaultConfig.UPLOAD_FOLDER_NAME)
+            temp_destination.mkdir(parents=True, exist_ok=True)
+            temp_file_path = Path(shutil.copy(test_file_path, temp_destination))
+            auralization_service.load_decimated_impulse_response_plot.cache_clear()
+
+            # Given: a decimated plot mutated by the caller
+            first_plot = auralization_service.get_impulse_response_plot(simulation_id, max_points=100)
+            expected_impulse_response = list(first_plot['impulseResponse'])
+            first_plot['impulseResponse'].clear()
+
+            # When: the same plot is requested again
+            second_plot = auralization_service.get_impulse_response_plot(simulation_id, max_points=100)
+
+            # Then: the cached plot is not affected by the mutation
+            self.assertEqual(second_plot['impulseResponse'], expected_impulse_response)
+            self.assertEqual(auralization_service.load_decimated_impulse_response_plot.cache_info().hits, 1)
+
+            # When: the export is rewritten
+            os.utime(temp_file_path, (temp_file_path.stat().st_atime, temp_file_path.stat().st_mtime + 10))
+            auralization_service.get_impulse_response_plot(simulation_id, max_points=100)
+
+            # Then: the plot is read again from the new file
+            self.assertEqual(auralization_service.load_decimated_impulse_response_plot.cache_info().misses, 2)
+
+            temp_file_path.unlink()
+
     def test_upload_audio_file(self):
         """
         Test that audio file is correctly uploaded.
@@ -0,0 +1,98 @@
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from app.models import File, Geometry, Task
+from app.services import geometry_service
+from app.types import Status, TaskType
+from tests.unit import BaseTestCase
+
+
+class GeometryServiceUnitTests(BaseTestCase):
+    def setUp(self):
+        """
+        Set up method to initialize variables and preconditions.
+        """
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.temp_dir.name, "room.obj"), "w") as obj_file:
+            obj_file.write("v 0 0 0")
+        with self.app.app_context():
+            upload = File(fileName="room.obj")
+            task = Task(taskType=TaskType.GeometryCheck, status=Status.Queued)
+            self.db.session.add_all([upload, task])
+            self.db.session.commit()
+            geometry = Geometry(inputModelUploadId=upload.id, taskId=task.id)
+            self.db.session.add(geometry)
+            self.db.session.commit()
+            self.task_id = task.id
+            self.geometry_id = geometry.id
+
+    def tearDown(self):
+        super().tearDown()
+        self.temp_dir.cleanup()
+
+    def run_geometry_check_task(self, generate_3dm=True, convert_3dm_to_geo=True):
+        # Runs the task with the conversion replaced, recording the message of the task after every stage
+        messages = []
+        set_geometry_check_stage = geometry_service.set_geometry_check_stage
+
+        def record_stage(task, stage):
+            set_geometry_check_stage(task, stage)
+            task = self.db.session.get(Task, self.task_id)
+            messages.append((task.message, task.percentage))
+
+        def fake_generate_3dm(obj_path, rhino3dm_path):
+            with open(rhino3dm_path, "w") as rhino3dm_file:
+                rhino3dm_file.write("3dm")
+            return generate_3dm
+
+        strategy = MagicMock()
+        strategy.generate_3dm.side_effect = fake_generate_3dm
+        factory = MagicMock()
+        factory.return_value.create_strategy.return_value = strategy
+
+        with patch.object(geometry_service.config.DefaultConfig, "UPLOAD_FOLDER", self.temp_dir.name), patch.object(
+            geometry_service, "GeometryConversionFactory", factory
+        ), patch.object(geometry_service, "convert_3dm_to_geo", return_value=convert_3dm_to_geo), patch.object(
+            geometry_service, "set_geometry_check_stage", side_effect=record_stage
+        ), patch.object(
+            geometry_service.config.FeatureToggle, "enable_geo_conversion", True
+        ):
+            geometry_service.run_geometry_check_task(self.geometry_id)
+
+        self.db.session.expire_all()
+        return messages, self.db.session.get(Task, self.task_id)
+
+    def test_run_geometry_check_task_completes(self):
+        """
+        Test that the geometry check reports each conversion stage and its percentage in its task and completes.
+        """
+        with self.app.app_context():
+            messages, task = self.run_geometry_check_task()
+
+            self.assertEqual(messages, [("parse (1/4)", 0), ("3dm (2/4)", 25), ("zip (3/4)", 50), ("geo (4/4)", 75)])
+            self.assertEqual(task.status, Status.Completed)
+            self.assertEqual(task.percentage, 100)
+            self.assertIsNone(task.message)
+            self.assertIsNotNone(task.completedAt)
+            self.assertTrue(os.path.exists(os.path.join(self.temp_dir.name, "room.zip")))
+            self.assertIsNotNone(self.db.session.get(Geometry, self.geometry_id).outputModelId)
+
+    def test_run_geometry_check_task_error_names_stage(self):
+        """
+        Test that a failed geometry check ends in error with the stage the conversion failed in.
+        """
+        with self.app.app_context():
+            messages, task = self.run_geometry_check_task(convert_3dm_to_geo=False)
+
+            self.assertEqual(messages[-1], ("geo (4/4)", 75))
+            self.assertEqual(task.status, Status.Error)
+            self.assertEqual(task.percentage, 75)
+            self.assertEqual(task.message, "An error is encountered during the geometry processing! (geo (4/4))")
+
+            messages, task = self.run_geometry_check_task(generate_3dm=False)
+
+            self.assertEqual(messages, [("parse (1/4)", 0)])
+            self.assertEqual(task.status, Status.Error)
+            self.assertIn("(parse (1/4))", task.message)
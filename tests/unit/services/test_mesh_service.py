@@ -0,0 +1,103 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+from app.models import Task
+from app.services import mesh_service
+from app.types import Status, TaskType
+from tests.unit import BaseTestCase
+
+
+class MeshServiceUnitTests(BaseTestCase):
+    def setUp(self):
+        """
+        Set up method to initialize variables and preconditions.
+        """
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.geo_path = os.path.join(self.temp_dir.name, "room.geo")
+        self.msh_path = os.path.join(self.temp_dir.name, "room.msh")
+        with self.app.app_context():
+            task = Task(taskType=TaskType.Mesh, status=Status.Queued)
+            self.db.session.add(task)
+            self.db.session.commit()
+            self.task_id = task.id
+
+    def tearDown(self):
+        super().tearDown()
+        self.temp_dir.cleanup()
+
+    def run_mesh_task(self, generate_cached_mesh):
+        # Runs the task with the mesh cache replaced, recording the task while the mesh is generated
+        seen = []
+
+        def side_effect(geo_path, msh_path, length_of_mesh):
+            task = self.db.session.get(Task, self.task_id)
+            seen.append((task.status, task.message, task.percentage))
+            return generate_cached_mesh(geo_path, msh_path, length_of_mesh)
+
+        with patch("simulation_backend.MeshCache.generate_cached_mesh", side_effect=side_effect):
+            mesh_service.run_mesh_task(self.task_id, self.geo_path, self.msh_path)
+        self.db.session.expire_all()
+        return seen, self.db.session.get(Task, self.task_id)
+
+    def write_mesh(self, cache_hit):
+        def generate_cached_mesh(geo_path, msh_path, length_of_mesh):
+            with open(msh_path, "w") as msh_file:
+                msh_file.write("$MeshFormat")
+            return cache_hit
+
+        return generate_cached_mesh
+
+    def test_run_mesh_task_generates_mesh(self):
+        """
+        Test that the mesh task goes from in progress to completed around the generation of the mesh, with its
+        percentage.
+        """
+        with self.app.app_context():
+            seen, task = self.run_mesh_task(self.write_mesh(cache_hit=False))
+
+            self.assertEqual(seen, [(Status.InProgress, "Generating the mesh", 50)])
+            self.assertEqual(task.status, Status.Completed)
+            self.assertEqual(task.percentage, 100)
+            self.assertIsNone(task.message)
+            self.assertIsNotNone(task.completedAt)
+
+    def test_run_mesh_task_reuses_cached_mesh(self):
+        """
+        Test that the message of the mesh task says when the mesh comes from the mesh cache.
+        """
+        with self.app.app_context():
+            _, task = self.run_mesh_task(self.write_mesh(cache_hit=True))
+
+            self.assertEqual(task.status, Status.Completed)
+            self.assertEqual(task.message, "Mesh reused from the mesh cache")
+
+    def test_run_mesh_task_errors(self):
+        """
+        Test that the mesh task ends in error when the mesh generation fails or writes no mesh.
+        """
+        with self.app.app_context():
+
+            def failing_generate_cached_mesh(geo_path, msh_path, length_of_mesh):
+                raise RuntimeError("Invalid geometry")
+
+            _, task = self.run_mesh_task(failing_generate_cached_mesh)
+
+            self.assertEqual(task.status, Status.Error)
+            self.assertIn("Invalid geometry", task.message)
+            self.assertEqual(task.percentage, 50)
+
+            _, task = self.run_mesh_task(lambda geo_path, msh_path, length_of_mesh: False)
+
+            self.assertEqual(task.status, Status.Error)
+            self.assertIn("Gmsh", task.message)
+
+    def test_run_mesh_task_missing_task(self):
+        """
+        Test that a mesh task that no longer exists is skipped.
+        """
+        with self.app.app_context(), patch("simulation_backend.MeshCache.generate_cached_mesh") as generate:
+            mesh_service.run_mesh_task(self.task_id + 1, self.geo_path, self.msh_path)
+
+            generate.assert_not_called()
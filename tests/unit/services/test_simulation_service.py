@@ -0,0 +1,423 @@
+import copy
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from app.models.File import File
+from app.models.Model import Model
+from app.models.Simulation import Simulation
+from app.models.SimulationRun import SimulationRun
+from app.models.Task import Task
+from app.services import simulation_service
+from app.types import Setting, Status, TaskType
+from tests.unit import BaseTestCase
+
+
+class SimulationServiceUnitTests(BaseTestCase):
+    def setUp(self):
+        """
+        Set up method to initialize variables and preconditions.
+        """
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.geo_path = os.path.join(self.temp_dir.name, "room.geo")
+        with open(self.geo_path, "w") as geo_file:
+            geo_file.write("Point(1) = {0, 0, 0, 1.0};")
+
+        self.simulation = Simulation(
+            name="test",
+            modelId=1,
+            sources=[{"id": "s1", "label": "Source 1", "orderNumber": 1, "x": 1.0, "y": 2.0, "z": 1.5}],
+            receivers=[{"id": "r1", "label": "Receiver 1", "orderNumber": 1, "x": 3.0, "y": 2.0, "z": 1.5}],
+            taskType=TaskType.DE,
+            settingsPreset=Setting.Default,
+            solverSettings={"simulationSettings": {"de_ir_length": 0.5}},
+        )
+        self.absorption_coefficients = {"layer": "0.1, 0.2, 0.3, 0.4, 0.5"}
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        super().tearDown()
+
+    def test_simulation_fingerprint_ignores_labels(self):
+        """
+        Test that renaming the simulation or its points does not change the fingerprint.
+        """
+        fingerprint = simulation_service.simulation_fingerprint(
+            self.simulation, self.absorption_coefficients, self.geo_path
+        )
+
+        self.simulation.name = "renamed"
+        self.simulation.sources = [dict(self.simulation.sources[0], label="Speaker")]
+
+        self.assertEqual(
+            fingerprint,
+            simulation_service.simulation_fingerprint(self.simulation, self.absorption_coefficients, self.geo_path),
+        )
+
+    def test_simulation_fingerprint_changes_with_solver_inputs(self):
+        """
+        Test that the fingerprint changes with the geometry, the materials, the points and the settings.
+        """
+        fingerprints = {
+            simulation_service.simulation_fingerprint(self.simulation, self.absorption_coefficients, self.geo_path)
+        }
+
+        fingerprints.add(
+            simulation_service.simulation_fingerprint(
+                self.simulation, {"layer": "0.5, 0.5, 0.5, 0.5, 0.5"}, self.geo_path
+            )
+        )
+
+        self.simulation.receivers = [dict(self.simulation.receivers[0], x=4.0)]
+        fingerprints.add(
+            simulation_service.simulation_fingerprint(self.simulation, self.absorption_coefficients, self.geo_path)
+        )
+
+        self.simulation.solverSettings = {"simulationSettings": {"de_ir_length": 1.0}}
+        fingerprints.add(
+            simulation_service.simulation_fingerprint(self.simulation, self.absorption_coefficients, self.geo_path)
+        )
+
+        with open(self.geo_path, "a") as geo_file:
+            geo_file.write("Point(2) = {1, 0, 0, 1.0};")
+        fingerprints.add(
+            simulation_service.simulation_fingerprint(self.simulation, self.absorption_coefficients, self.geo_path)
+        )
+
+        self.assertEqual(len(fingerprints), 5)
+        self.assertIsNone(
+            simulation_service.simulation_fingerprint(
+                self.simulation, self.absorption_coefficients, os.path.join(self.temp_dir.name, "missing.geo")
+            )
+        )
+
+    def test_clone_simulation_result(self):
+        """
+        Test that a cloned result has the files and the values of the cached result, with the labels of the new run.
+        """
+        # Given: A completed result with its time series
+        cached_json_path = os.path.join(self.temp_dir.name, "room_1.json")
+        json_path = os.path.join(self.temp_dir.name, "room_2.json")
+        results_container = [
+            simulation_service.create_result_source_object(
+                self.simulation.sources[0], self.simulation.receivers, TaskType.DE.value
+            )
+        ]
+        cached_results = copy.deepcopy(results_container)
+        cached_results[0]["label"] = "Old source"
+        cached_results[0]["responses"][0]["parameters"]["t30"] = [1.2]
+        with open(cached_json_path, "w") as json_file:
+            json.dump({"results": cached_results, "task_id": "abc", "subtask_ids": ["def"]}, json_file)
+        np.save(cached_json_path.replace(".json", "_edc.npy"), np.ones((1, 3), dtype=np.float32))
+
+        # When: Cloning it into the new run
+        cloned = simulation_service.clone_simulation_result(cached_json_path, json_path, results_container)
+
+        # Then: The values and files are reused, the labels are the new ones
+        self.assertTrue(cloned)
+        with open(json_path, "r") as json_file:
+            result_container = json.load(json_file)
+        self.assertEqual(result_container["results"][0]["label"], "Source 1")
+        self.assertEqual(result_container["results"][0]["responses"][0]["parameters"]["t30"], [1.2])
+        self.assertEqual(result_container["task_id"], -1)
+        self.assertNotIn("subtask_ids", result_container)
+        self.assertTrue(os.path.exists(json_path.replace(".json", "_edc.npy")))
+
+    def test_find_completed_simulation_run(self):
+        """
+        Test that the most recent completed run with the fingerprint and its result file is found, and that a run
+        whose model has been deleted is a cache miss.
+        """
+        with self.app.app_context(), patch.object(
+            simulation_service.file_service.config.DefaultConfig, "UPLOAD_FOLDER", self.temp_dir.name
+        ), patch.object(simulation_service.model_service, "get_model", side_effect=AssertionError):
+            # Given: Completed runs of a model, an older one with its result file and a newer one without,
+            # and the newest one of a simulation whose model has been deleted
+            output_file = File(fileName="room.3dm")
+            self.db.session.add(output_file)
+            self.db.session.commit()
+            model = Model(name="room", sourceFileId=output_file.id, outputFileId=output_file.id, projectId=1)
+            self.db.session.add(model)
+            self.db.session.commit()
+            simulation_ids = []
+            for model_id in (model.id, model.id, model.id + 1):
+                simulation_run = SimulationRun(
+                    sources=[], solverSettings={}, status=Status.Completed, fingerprint="abc"
+                )
+                self.db.session.add(simulation_run)
+                self.db.session.commit()
+                simulation = Simulation(
+                    name="test", modelId=model_id, solverSettings={}, simulationRunId=simulation_run.id
+                )
+                self.db.session.add(simulation)
+                self.db.session.commit()
+                simulation_ids.append(simulation.id)
+            json_path = os.path.join(self.temp_dir.name, f"room_{simulation_ids[0]}.json")
+            with open(json_path, "w") as json_file:
+                json.dump({"results": []}, json_file)
+
+            # When: Looking up the fingerprint, and another one
+            found = simulation_service.find_completed_simulation_run("abc")
+            missing = simulation_service.find_completed_simulation_run("def")
+
+            # Then: The run with its result file is found without looking up the models one by one
+            self.assertEqual(found, json_path)
+            self.assertIsNone(missing)
+            self.assertIsNone(simulation_service.find_completed_simulation_run(None))
+
+    def test_get_simulation_runs_status(self):
+        """
+        Test that the status of the runs is filtered by ids and by the time of their last update.
+        """
+        with self.app.app_context():
+            # Given: Two simulations with a run, updated at different times
+            simulation_runs = []
+            for index, updated_at in enumerate(["2026-01-01 10:00:00.000000", "2026-01-01 12:00:00.000000"]):
+                simulation_run = SimulationRun(
+                    sources=[], solverSettings={}, status=Status.InProgress, percentage=10 * index
+                )
+                self.db.session.add(simulation_run)
+                self.db.session.commit()
+                simulation_run.updatedAt = updated_at
+                simulation = Simulation(
+                    name=f"test {index}", modelId=1, solverSettings={}, simulationRunId=simulation_run.id
+                )
+                self.db.session.add(simulation)
+                self.db.session.commit()
+                simulation_runs.append((simulation_run.id, simulation.id))
+
+            # When: Asking for all the runs, one run and the runs changed since 11:00
+            all_runs = simulation_service.get_simulation_runs_status()
+            one_run = simulation_service.get_simulation_runs_status([simulation_runs[0][0]])
+            changed_runs = simulation_service.get_simulation_runs_status(since=datetime(2026, 1, 1, 11))
+
+            # Then: Only the matching runs are returned, with their simulation
+            self.assertEqual(len(all_runs), 2)
+            self.assertEqual([(run.id, run.simulationId) for run in one_run], [simulation_runs[0]])
+            self.assertEqual([run.id for run in changed_runs], [simulation_runs[1][0]])
+            self.assertEqual(changed_runs[0].percentage, 10)
+            self.assertEqual(changed_runs[0].status, Status.InProgress)
+
+    def test_get_simulation_runs_status_since_timestamp(self):
+        """
+        Test that the status endpoint compares "since" as a datetime, with a T separator and an offset, and rejects
+        invalid values.
+        """
+        with self.app.app_context():
+            # Given: Two simulations with a run, updated at 10:00:00.5 and 12:00, local time
+            simulation_run_ids = []
+            for index, updated_at in enumerate(["2026-01-01 10:00:00.500000", "2026-01-01 12:00:00.000000"]):
+                simulation_run = SimulationRun(sources=[], solverSettings={}, status=Status.InProgress)
+                self.db.session.add(simulation_run)
+                self.db.session.commit()
+                simulation_run.updatedAt = updated_at
+                self.db.session.add(
+                    Simulation(name=f"test {index}", modelId=1, solverSettings={}, simulationRunId=simulation_run.id)
+                )
+                self.db.session.commit()
+                simulation_run_ids.append(simulation_run.id)
+
+        client = self.app.test_client()
+
+        # When: Asking for the runs changed since 11:00 and since 10:00, written with a T and the local offset
+        changed_since_11 = client.get(
+            "/simulations/run/status", query_string={"since": datetime(2026, 1, 1, 11).astimezone().isoformat()}
+        )
+        changed_since_10 = client.get(
+            "/simulations/run/status", query_string={"since": datetime(2026, 1, 1, 10).astimezone().isoformat()}
+        )
+        invalid = client.get("/simulations/run/status", query_string={"since": "yesterday"})
+
+        # Then: The timestamps are compared as datetimes and the invalid value is a bad request
+        self.assertEqual(changed_since_11.status_code, 200)
+        self.assertEqual([run["id"] for run in changed_since_11.get_json()], simulation_run_ids[1:])
+        self.assertEqual([run["id"] for run in changed_since_10.get_json()], simulation_run_ids)
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_get_simulation_run_rolls_up_task_statuses(self):
+        """
+        Test that listing the runs copies the statuses pushed to the tasks into the sources of every run.
+        """
+        with self.app.app_context():
+            # Given: Two runs whose tasks have progressed since their sources were written
+            tasks = [
+                Task(taskType=TaskType.DE, status=Status.Completed, percentage=100),
+                Task(taskType=TaskType.DE, status=Status.InProgress, percentage=40),
+            ]
+            self.db.session.add_all(tasks)
+            self.db.session.commit()
+            for index, task in enumerate(tasks):
+                simulation_run = SimulationRun(
+                    sources=[{"percentage": 0, "taskStatuses": [{"id": task.id, "status": "Queued", "percentage": 0}]}],
+                    solverSettings={},
+                    status=Status.InProgress,
+                )
+                self.db.session.add(simulation_run)
+                self.db.session.commit()
+                self.db.session.add(
+                    Simulation(name=f"test {index}", modelId=1, solverSettings={}, simulationRunId=simulation_run.id)
+                )
+                self.db.session.commit()
+
+            # When: Listing the runs
+            simulation_runs = simulation_service.get_simulation_run()
+
+            # Then: Their sources have the statuses of their tasks
+            self.assertEqual(
+                [
+                    (source["percentage"], source["taskStatuses"][0]["status"])
+                    for simulation_run in sorted(simulation_runs, key=lambda run: run.id)
+                    for source in simulation_run.sources
+                ],
+                [(100, "Completed"), (40, "InProgress")],
+            )
+
+    def test_roll_up_task_statuses(self):
+        """
+        Test that the percentages of the tasks are copied into the sources of a run and averaged per source.
+        """
+        tasks = [
+            Task(id=1, taskType=TaskType.DE, status=Status.Completed, percentage=100),
+            Task(id=2, taskType=TaskType.DG, status=Status.InProgress, percentage=50),
+        ]
+        sources = [{"percentage": 0, "taskStatuses": [{"id": 1, "percentage": 0}, {"id": 2, "percentage": 0}]}]
+
+        rolled_up = simulation_service.roll_up_task_statuses(sources, tasks)
+
+        self.assertEqual(rolled_up[0]["percentage"], 75)
+        self.assertEqual(rolled_up[0]["taskStatuses"][1]["status"], "InProgress")
+        self.assertEqual(sources[0]["percentage"], 0)
+
+    def test_cancel_solver_task_stops_dg_time_integration(self):
+        """
+        Test that cancelling a run stops a DG subtask during its time integration, which polls the json file.
+        """
+        from simulation_backend.Cancellation import is_cancel_requested
+        from simulation_backend.DGinterface import forward_time_integration_progress
+
+        # Given: A DG subtask whose time integration polls "should_cancel" in its json file, like edg_acoustics,
+        # while dg_method forwards the cancellation flag file into the json file
+        json_path = os.path.join(self.temp_dir.name, "room_1.json")
+        subtask_json_path = simulation_service.solver_subtask_json_path(json_path, 0)
+        for path in (json_path, subtask_json_path):
+            with open(path, "w") as json_file:
+                json.dump({"results": [{"resultType": "DG"}], "should_cancel": False, "task_id": "abc"}, json_file)
+
+        stopped = threading.Event()
+
+        def time_integration():
+            deadline = time.time() + 10
+            while time.time() < deadline:
+                with open(subtask_json_path, "r") as json_file:
+                    if json.load(json_file).get("should_cancel"):
+                        stopped.set()
+                        return
+                time.sleep(0.01)
+
+        stop_forwarding = threading.Event()
+        forwarder = threading.Thread(
+            target=forward_time_integration_progress, args=(subtask_json_path, stop_forwarding, 0.01)
+        )
+        solver = threading.Thread(target=time_integration)
+        forwarder.start()
+        solver.start()
+
+        # When: Cancelling the simulation
+        with patch.object(simulation_service, "get_simulation_by_id", return_value=MagicMock(modelId=1)), patch.object(
+            simulation_service.model_service, "get_model", return_value=MagicMock(outputFileId=1)
+        ), patch.object(simulation_service.file_service, "get_file_related_path", return_value=json_path):
+            simulation_service.cancel_solver_task(1)
+        solver.join(timeout=5)
+        stop_forwarding.set()
+        forwarder.join()
+
+        # Then: The time integration has stopped, and the API only created the flag files
+        self.assertTrue(stopped.is_set())
+        self.assertTrue(is_cancel_requested(json_path))
+        self.assertTrue(is_cancel_requested(subtask_json_path))
+        with open(json_path, "r") as json_file:
+            self.assertFalse(json.load(json_file)["should_cancel"])
+
+    def test_remove_solver_subtask_files(self):
+        """
+        Test that the part files of the subtasks are removed once merged, and the files of the run are kept.
+        """
+        json_path = os.path.join(self.temp_dir.name, "room_1.json")
+        kept = [json_path, json_path.replace(".json", "_edc.npy")]
+        removed = []
+        for task_index in range(2):
+            subtask_json_path = simulation_service.solver_subtask_json_path(json_path, task_index)
+            removed += [
+                subtask_json_path,
+                subtask_json_path.replace(".json", ".msh"),
+                subtask_json_path.replace(".json", "_progress.json"),
+                subtask_json_path.replace(".json", "_edc.npy"),
+            ]
+        for path in kept + removed:
+            open(path, "w").close()
+
+        simulation_service.remove_solver_subtask_files(json_path, 2)
+
+        self.assertTrue(all(os.path.exists(path) for path in kept))
+        self.assertFalse(any(os.path.exists(path) for path in removed))
+
+    def test_run_solver_subtask_pushes_dg_progress(self):
+        """
+        Test that the progress a DG subtask writes from another thread moves the percentages of its task and run.
+        """
+        from simulation_backend import DGinterface
+        from simulation_backend.Progress import write_progress
+
+        with self.app.app_context():
+            # Given: A run with two tasks, the first one being a DG subtask
+            tasks = [Task(taskType=TaskType.DG, status=Status.Queued), Task(taskType=TaskType.DG, status=Status.Queued)]
+            self.db.session.add_all(tasks)
+            self.db.session.commit()
+            simulation_run = SimulationRun(
+                sources=[{"percentage": 0, "taskStatuses": [{"id": task.id, "percentage": 0} for task in tasks]}],
+                solverSettings={},
+                status=Status.Queued,
+            )
+            self.db.session.add(simulation_run)
+            self.db.session.commit()
+            self.simulation.taskType = TaskType.DG
+            self.simulation.simulationRunId = simulation_run.id
+            self.db.session.add(self.simulation)
+            self.db.session.commit()
+
+            json_path = os.path.join(self.temp_dir.name, "room_1.json")
+            with open(simulation_service.solver_subtask_json_path(json_path, 0), "w") as json_file:
+                json.dump({"results": [{"resultType": "DG"}]}, json_file)
+
+            percentages = []
+
+            def dg_method(json_file_path=None):
+                # The time integration reports its progress from a thread, like the DG progress forwarder
+                forwarder = threading.Thread(target=write_progress, args=(json_file_path, 40, "solving"))
+                forwarder.start()
+                forwarder.join()
+                self.db.session.expire_all()
+                percentages.append(
+                    (
+                        self.db.session.get(Task, tasks[0].id).percentage,
+                        self.db.session.get(SimulationRun, simulation_run.id).percentage,
+                    )
+                )
+
+            # When: Running the subtask
+            with patch.object(DGinterface, "dg_method", dg_method):
+                subtask_status = simulation_service.run_solver_subtask(simulation_run.id, json_path, 0)
+
+            # Then: The progress is in the database while the subtask runs, and complete at its end
+            self.assertEqual(percentages, [(40, 20)])
+            self.assertEqual(subtask_status, {"taskIndex": 0, "status": Status.Completed.value})
+            self.db.session.expire_all()
+            self.assertEqual(self.db.session.get(Task, tasks[0].id).percentage, 100)
+            self.assertEqual(self.db.session.get(SimulationRun, simulation_run.id).percentage, 50)
@@ -0,0 +1,52 @@
+import unittest
+
+import numpy as np
+
+from app.utils.decimation import decimate_min_max
+
+
+class DecimationUnitTests(unittest.TestCase):
+    def test_decimate_min_max_keeps_extremes(self):
+        """
+        Test that the decimated curve fits in max_points and keeps the peaks of the curve.
+        """
+        # Given: A long noisy curve with a single peak and a single dip
+        t = np.arange(100000) / 20000
+        data = np.sin(2 * np.pi * 5 * t)
+        data[12345] = 10
+        data[67890] = -10
+
+        # When: Decimating it to 1000 points
+        t_decimated, data_decimated = decimate_min_max(t, data, max_points=1000)
+
+        # Then: The peak and the dip are kept, in time order
+        self.assertLessEqual(len(data_decimated), 1000)
+        self.assertEqual(len(t_decimated), len(data_decimated))
+        self.assertIn(10, data_decimated)
+        self.assertIn(-10, data_decimated)
+        self.assertTrue(np.all(np.diff(t_decimated) > 0))
+
+    def test_decimate_min_max_time_window(self):
+        """
+        Test that only the samples within [t_start, t_end] are returned.
+        """
+        t = np.linspace(0, 1, 1001)
+        data = t**2
+
+        t_decimated, data_decimated = decimate_min_max(t, data, t_start=0.25, t_end=0.5)
+
+        self.assertAlmostEqual(t_decimated[0], 0.25)
+        self.assertAlmostEqual(t_decimated[-1], 0.5)
+        np.testing.assert_allclose(data_decimated, t_decimated**2)
+
+    def test_decimate_min_max_short_curve_unchanged(self):
+        """
+        Test that a curve that already fits in max_points is returned unchanged.
+        """
+        t = [0.0, 0.1, 0.2]
+        data = [3.0, 1.0, 2.0]
+
+        t_decimated, data_decimated = decimate_min_max(t, data, max_points=10)
+
+        np.testing.assert_array_equal(t_decimated, t)
+        np.testing.assert_array_equal(data_decimated, data)